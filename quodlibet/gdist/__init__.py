@@ -46,7 +46,7 @@ from .appdata import build_appdata, install_appdata
 from .coverage import coverage_cmd
 from .docs import build_sphinx
 from .scripts import build_scripts
-from .tests import quality_cmd, distcheck_cmd, test_cmd
+from .tests import quality_cmd, distcheck_cmd, test_cmd, bench_cmd
 from .clean import clean
 from .zsh_completions import install_zsh_completions
 from .util import get_dist_class, Distribution
@@ -165,6 +165,7 @@ class GDistribution(Distribution):
         self.cmdclass.setdefault("quality", quality_cmd)
         self.cmdclass.setdefault("distcheck", distcheck_cmd)
         self.cmdclass.setdefault("test", test_cmd)
+        self.cmdclass.setdefault("bench", bench_cmd)
         self.cmdclass.setdefault("quality", quality_cmd)
         self.cmdclass.setdefault("clean", clean)
 
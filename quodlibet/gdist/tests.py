@@ -95,6 +95,42 @@ class quality_cmd(Command):
             raise SystemExit(status)
 
 
+class bench_cmd(Command):
+    description = "run performance benchmarks"
+    user_options = [
+        ("to-run=", None, "list of benchmarks to run (default all)"),
+        ("size=", None, "number of songs in the synthetic library"),
+        ("repeat=", None, "number of timed runs per benchmark"),
+        ("save=", None, "save the results to a JSON file"),
+        ("compare=", None, "compare the results with a saved JSON file"),
+    ]
+
+    def initialize_options(self):
+        self.to_run = []
+        self.size = 10000
+        self.repeat = 3
+        self.save = None
+        self.compare = None
+
+    def finalize_options(self):
+        if self.to_run:
+            self.to_run = self.to_run.split(",")
+        self.size = int(self.size)
+        self.repeat = int(self.repeat)
+
+    def run(self):
+        # importing sets up the test environment (temp dirs, Gtk versions)
+        import tests
+        from tests import bench
+
+        try:
+            bench.main(size=self.size, repeat=self.repeat,
+                       names=self.to_run, save=self.save,
+                       compare=self.compare)
+        finally:
+            tests.exit_test_environ()
+
+
 sdist = get_dist_class("sdist")
 
 
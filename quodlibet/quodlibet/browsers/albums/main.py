@@ -18,7 +18,7 @@ from gi.repository import Gtk, Pango, Gdk, GLib, Gio
 
 from quodlibet.util.i18n import numeric_phrase
 from .prefs import Preferences, DEFAULT_PATTERN_TEXT
-from .models import AlbumModel, AlbumFilterModel, AlbumSortModel, AlbumItem
+from .models import AlbumModel, AlbumFilterModel, AlbumItem
 
 import quodlibet
 from quodlibet import app
@@ -42,6 +42,7 @@ from quodlibet.qltk.menubutton import MenuButton
 from quodlibet.qltk import Icons
 from quodlibet.util import copool, connect_destroy
 from quodlibet.util.library import background_filter
+from quodlibet.util.thread import call_async, Cancellable
 from quodlibet.util import connect_obj, DeferredSignal
 from quodlibet.qltk.cover import get_no_cover_pixbuf
 from quodlibet.qltk.image import add_border_widget, get_surface_for_pixbuf
@@ -82,100 +83,63 @@ def cmpa(a, b):
     return cmp(a, b)
 
 
-def compare_title(a1, a2):
-    a1, a2 = a1.album, a2.album
-    # All albums should stay at the top
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    # Move albums without a title to the bottom
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
+def _key_a(value):
+    """A sort key for `value` which sorts like cmpa()"""
 
+    return (0, value) if value else (1,)
 
-def compare_artist(a1, a2):
-    a1, a2 = a1.album, a2.album
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (cmpa(a1.peoplesort, a2.peoplesort) or
-            cmpa(a1.date, a2.date) or
-            cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
 
+def _album_sort_key(func):
+    """Wraps a function returning the sort key for an album in one taking
+    an AlbumItem, which puts "All Albums" at the top and albums without
+    a title at the bottom.
+    """
 
-def compare_date(a1, a2):
-    a1, a2 = a1.album, a2.album
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (cmpa(a1.date, a2.date) or
-            cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
+    def get_key(item):
+        album = item.album
+        if album is None:
+            return (0,)
+        if not album.title:
+            return (2, album.key)
+        return (1, func(album), album.key)
 
+    return get_key
 
-def compare_genre(a1, a2):
-    a1, a2 = a1.album, a2.album
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (cmpa(a1.genre, a2.genre) or
-            cmpa(a1.peoplesort, a2.peoplesort) or
-            cmpa(a1.date, a2.date) or
-            cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
 
+get_title_key = _album_sort_key(
+    lambda a: _key_a(a.sort))
 
-def compare_rating(a1, a2):
-    a1, a2 = a1.album, a2.album
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (-cmp(a1("~#rating"), a2("~#rating")) or
-            cmpa(a1.date, a2.date) or
-            cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
+get_artist_key = _album_sort_key(
+    lambda a: (_key_a(a.peoplesort), _key_a(a.date), _key_a(a.sort)))
 
+get_date_key = _album_sort_key(
+    lambda a: (_key_a(a.date), _key_a(a.sort)))
 
-def compare_avgplaycount(a1, a2):
-    a1, a2 = a1.album, a2.album
-    if a1 is None:
-        return -1
-    if a2 is None:
-        return 1
-    if not a1.title:
-        return 1
-    if not a2.title:
-        return -1
-    return (-cmp(a1("~#playcount:avg"), a2("~#playcount:avg")) or
-            cmpa(a1.date, a2.date) or
-            cmpa(a1.sort, a2.sort) or
-            cmp(a1.key, a2.key))
+get_genre_key = _album_sort_key(
+    lambda a: (_key_a(a.genre), _key_a(a.peoplesort), _key_a(a.date),
+               _key_a(a.sort)))
+
+get_rating_key = _album_sort_key(
+    lambda a: (-a("~#rating"), _key_a(a.date), _key_a(a.sort)))
+
+get_avgplaycount_key = _album_sort_key(
+    lambda a: (-a("~#playcount:avg"), _key_a(a.date), _key_a(a.sort)))
+
+
+def _compare_by(get_key):
+
+    def compare(a1, a2):
+        return cmp(get_key(a1), get_key(a2))
+
+    return compare
+
+
+compare_title = _compare_by(get_title_key)
+compare_artist = _compare_by(get_artist_key)
+compare_date = _compare_by(get_date_key)
+compare_genre = _compare_by(get_genre_key)
+compare_rating = _compare_by(get_rating_key)
+compare_avgplaycount = _compare_by(get_avgplaycount_key)
 
 
 class PreferencesButton(Gtk.HBox):
@@ -183,12 +147,12 @@ class PreferencesButton(Gtk.HBox):
         super(PreferencesButton, self).__init__()
 
         sort_orders = [
-            (_("_Title"), self.__compare_title),
-            (_("_Artist"), self.__compare_artist),
-            (_("_Date"), self.__compare_date),
-            (_("_Genre"), self.__compare_genre),
-            (_("_Rating"), self.__compare_rating),
-            (_("_Playcount"), self.__compare_avgplaycount),
+            (_("_Title"), get_title_key),
+            (_("_Artist"), get_artist_key),
+            (_("_Date"), get_date_key),
+            (_("_Genre"), get_genre_key),
+            (_("_Rating"), get_rating_key),
+            (_("_Playcount"), get_avgplaycount_key),
         ]
 
         menu = Gtk.Menu()
@@ -200,16 +164,15 @@ class PreferencesButton(Gtk.HBox):
         active = config.getint('browsers', 'album_sort', 1)
 
         item = None
-        for i, (label, func) in enumerate(sort_orders):
+        for i, (label, get_key) in enumerate(sort_orders):
             item = RadioMenuItem(group=item, label=label,
                                  use_underline=True)
-            model.set_sort_func(100 + i, func)
             if i == active:
-                model.set_sort_column_id(100 + i, Gtk.SortType.ASCENDING)
+                model.set_sort_key(get_key)
                 item.set_active(True)
             item.connect("toggled",
                          util.DeferredSignal(self.__sort_toggled_cb),
-                         model, i)
+                         model, get_key, i)
             sort_menu.append(item)
 
         sort_item.set_submenu(sort_menu)
@@ -227,34 +190,10 @@ class PreferencesButton(Gtk.HBox):
         button.set_menu(menu)
         self.pack_start(button, True, True, 0)
 
-    def __sort_toggled_cb(self, item, model, num):
+    def __sort_toggled_cb(self, item, model, get_key, num):
         if item.get_active():
             config.set("browsers", "album_sort", str(num))
-            model.set_sort_column_id(100 + num, Gtk.SortType.ASCENDING)
-
-    def __compare_title(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_title(a1, a2)
-
-    def __compare_artist(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_artist(a1, a2)
-
-    def __compare_date(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_date(a1, a2)
-
-    def __compare_genre(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_genre(a1, a2)
-
-    def __compare_rating(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_rating(a1, a2)
-
-    def __compare_avgplaycount(self, model, i1, i2, data):
-        a1, a2 = model.get_value(i1), model.get_value(i2)
-        return compare_avgplaycount(a1, a2)
+            model.set_sort_key(get_key)
 
 
 class VisibleUpdate(object):
@@ -381,6 +320,9 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
     _PATTERN_FN = os.path.join(quodlibet.get_user_dir(), "album_pattern")
     _DEFAULT_PATTERN_TEXT = DEFAULT_PATTERN_TEXT
 
+    FILTER_THREAD_MIN = 2000
+    """Filter in a thread while typing if there are this many albums"""
+
     name = _("Album List")
     accelerated_name = _("_Album List")
     keys = ["AlbumList"]
@@ -445,11 +387,12 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         sw.set_shadow_type(Gtk.ShadowType.IN)
         self.view = view = AllTreeView()
         view.set_headers_visible(False)
-        model_sort = AlbumSortModel(model=self.__model)
-        model_filter = AlbumFilterModel(child_model=model_sort)
+        model_filter = AlbumFilterModel(child_model=self.__model)
 
         self.__bg_filter = background_filter()
         self.__filter = None
+        self.__filter_cancel = Cancellable()
+        self.__filter_results = None
         model_filter.set_visible_func(self.__parse_query)
 
         render = Gtk.CellRendererPixbuf()
@@ -531,11 +474,11 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         self.accelerators = Gtk.AccelGroup()
         search = SearchBarBox(completion=AlbumTagCompletion(),
                               accel_group=self.accelerators)
-        search.connect('query-changed', self.__update_filter)
+        search.connect('query-changed', self.__query_changed)
         connect_obj(search, 'focus-out', lambda w: w.grab_focus(), view)
         self.__search = search
 
-        prefs = PreferencesButton(self, model_sort)
+        prefs = PreferencesButton(self, self.__model)
         search.pack_start(prefs, False, True, 0)
         self.pack_start(Align(search, left=6, top=6), False, True, 0)
         self.pack_start(sw, True, True, 0)
@@ -584,10 +527,8 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         return item.album is not None and not item.scanned
 
     def _update_row(self, filter_model, iter_):
-        sort_model = filter_model.get_model()
-        model = sort_model.get_model()
+        model = filter_model.get_model()
         iter_ = filter_model.convert_iter_to_child_iter(iter_)
-        iter_ = sort_model.convert_iter_to_child_iter(iter_)
         tref = Gtk.TreeRowReference.new(model, model.get_path(iter_))
 
         def callback():
@@ -603,6 +544,7 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
 
     def __destroy(self, browser):
         self._cover_cancel.cancel()
+        self.__filter_cancel.cancel()
         self.disable_row_update()
 
         self.view.set_model(None)
@@ -611,8 +553,14 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
         if not klass.instances():
             klass._destroy_model()
 
-    def __update_filter(self, entry, text, scroll_up=True, restore=False):
-        model = self.view.get_model()
+    def __query_changed(self, entry, text):
+        self.__update_filter(entry, text, background=True)
+
+    def __update_filter(self, entry, text, scroll_up=True, restore=False,
+                        background=False):
+        self.__filter_cancel.cancel()
+        self.__filter_cancel = Cancellable()
+        self.__filter_results = None
 
         self.__filter = None
         query = self.__search.get_query(star=["~people", "album"])
@@ -620,6 +568,24 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
             self.__filter = query.search
         self.__bg_filter = background_filter()
 
+        if background and self.__filter is not None and \
+                len(self.__model) >= self.FILTER_THREAD_MIN:
+            # Evaluate the query in a thread and refilter once with the
+            # results, so typing doesn't block the main loop
+            items = [(i, i.changes, i.album.snapshot())
+                     for i in self.__model.itervalues() if i.album is not None]
+            cancel = self.__filter_cancel
+            call_async(
+                self.__filter_items, cancel,
+                lambda r: self.__filter_done(r, scroll_up),
+                args=(self.__filter, self.__bg_filter, items, cancel))
+            return
+
+        self.__refilter(scroll_up, restore)
+
+    def __refilter(self, scroll_up=True, restore=False):
+        model = self.view.get_model()
+
         self.__inhibit()
 
         # We could be smart and try to scroll to a selected album
@@ -635,16 +601,53 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate,
 
         self.__uninhibit()
 
+    @staticmethod
+    def __filter_items(filter_, bg_filter, items, cancel):
+        """Returns a dict of AlbumItem -> (changes, visible) or None if
+        cancelled or the albums changed while filtering.
+
+        Runs in a thread. The caches of Album aren't thread-safe, so the
+        queries only get to see snapshots made in the main thread. Besides
+        reading song values, the only shared state they touch is the
+        folded text cache in unisearch.shadow.
+        """
+
+        results = {}
+        try:
+            for item, changes, album in items:
+                if cancel.is_cancelled():
+                    return
+                visible = filter_(album)
+                if visible and bg_filter is not None:
+                    visible = bg_filter(album)
+                results[item] = (changes, visible)
+        except RuntimeError:
+            # the album songs changed size during iteration
+            return
+        return results
+
+    def __filter_done(self, results, scroll_up):
+        self.__filter_results = results
+        self.__refilter(scroll_up)
+
     def __parse_query(self, model, iter_, data):
         f, b = self.__filter, self.__bg_filter
 
         if f is None and b is None:
             return True
         else:
-            album = model.get_album(iter_)
+            item = model.get_value(iter_)
+            album = item.album
             if album is None:
                 return True
-            elif b is None:
+
+            results = self.__filter_results
+            if results is not None:
+                changes, visible = results.get(item, (None, None))
+                if changes == item.changes:
+                    return visible
+
+            if b is None:
                 return f(album)
             elif f is None:
                 return b(album)
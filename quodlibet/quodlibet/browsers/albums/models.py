@@ -9,7 +9,6 @@
 from quodlibet import app
 from quodlibet import config
 from quodlibet.qltk.models import ObjectStore, ObjectModelFilter
-from quodlibet.qltk.models import ObjectModelSort
 from quodlibet.compat import itervalues
 
 
@@ -18,6 +17,12 @@ class AlbumItem(object):
     cover = None
     scanned = False
 
+    sort_key = None
+    """The cached sort key for the active sort order of the model"""
+
+    changes = 0
+    """Gets increased every time the album changes"""
+
     def __init__(self, album):
         self.album = album
 
@@ -66,10 +71,19 @@ class AlbumModelMixin(object):
 
 
 class AlbumModel(ObjectStore, AlbumModelMixin):
+    """Contains all albums sorted by the key function passed to
+    set_sort_key(). The keys get computed once per album and only get
+    recomputed for changed albums.
+
+    The (persistent) row iters are kept per album, so changes and removals
+    don't have to search the model.
+    """
 
     def __init__(self, library):
         super(AlbumModel, self).__init__()
         self.__library = library
+        self.__sort_key = None
+        self.__iters = {}
 
         albums = library.albums
         self.__sigs = [
@@ -79,7 +93,7 @@ class AlbumModel(ObjectStore, AlbumModelMixin):
         ]
 
         self.append(row=[AlbumItem(None)])
-        self.append_many((AlbumItem(a) for a in itervalues(albums)))
+        self.__append_albums(itervalues(albums))
 
     def refresh_all(self):
         """Trigger redraws for all rows"""
@@ -92,44 +106,80 @@ class AlbumModel(ObjectStore, AlbumModelMixin):
         for sig in self.__sigs:
             library.albums.disconnect(sig)
         self.__library = None
+        self.__iters.clear()
         self.clear()
 
+    def set_sort_key(self, func):
+        """Sort the albums using `func`, which gets passed an AlbumItem and
+        returns the sort key for it.
+        """
+
+        self.__sort_key = func
+        for item in self.itervalues():
+            item.sort_key = None
+        self._resort()
+
+    def _get_sort_key(self, item):
+        key = item.sort_key
+        if key is None:
+            key = item.sort_key = self.__sort_key(item)
+        return key
+
+    def _resort(self):
+        """Move all rows to their sorted position in one step"""
+
+        if self.__sort_key is None:
+            return
+
+        keys = [self._get_sort_key(item) for item in self.itervalues()]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        if order != list(range(len(keys))):
+            self.reorder(order)
+
     def _update_all(self):
         if not self.is_empty():
             row = self[0]
             self.row_changed(row.path, row.iter)
 
+    def __append_albums(self, albums):
+        albums = list(albums)
+        iters = self.iter_append_many((AlbumItem(a) for a in albums))
+        self.__iters.update(zip(albums, iters))
+
     def _add_albums(self, library, added):
-        self.append_many((AlbumItem(a) for a in added))
+        self.__append_albums(added)
+        self._resort()
         self._update_all()
 
     def _remove_albums(self, library, removed):
-        removed_albums = removed.copy()
-        iters_remove = []
-        for iter_, item in self.iterrows():
-            album = item.album
-            if album is not None and album in removed_albums:
-                removed_albums.remove(album)
-                iters_remove.append(iter_)
-                if not removed_albums:
-                    break
-
-        for iter_ in iters_remove:
-            self.remove(iter_)
+        for album in removed:
+            iter_ = self.__iters.pop(album, None)
+            if iter_ is not None:
+                # remove() moves the iter to the next row
+                self.remove(iter_.copy())
 
         self._update_all()
 
     def _change_albums(self, library, changed):
-        """Trigger a row redraw for each album that changed"""
+        """Trigger a row redraw for each album that changed and move them
+        in case their sort key changed"""
+
+        resort = False
+        for album in changed:
+            iter_ = self.__iters.get(album)
+            if iter_ is None:
+                continue
+            item = self.get_value(iter_)
+            item.changes += 1
+            if item.sort_key is not None:
+                old_key = item.sort_key
+                item.sort_key = None
+                if self._get_sort_key(item) != old_key:
+                    resort = True
+            self.row_changed(self.get_path(iter_), iter_)
 
-        changed_albums = changed.copy()
-        for iter_, item in self.iterrows():
-            album = item.album
-            if album is not None and album in changed_albums:
-                changed_albums.remove(album)
-                self.row_changed(self.get_path(iter_), iter_)
-                if not changed_albums:
-                    break
+        if resort:
+            self._resort()
 
 
 class AlbumFilterModel(ObjectModelFilter, AlbumModelMixin):
@@ -137,7 +187,3 @@ class AlbumFilterModel(ObjectModelFilter, AlbumModelMixin):
     def contains_all(self, paths):
         values = (self.get_value(self.get_iter(p), 0).album for p in paths)
         return None in values
-
-
-class AlbumSortModel(ObjectModelSort, AlbumModelMixin):
-    pass
@@ -76,23 +76,40 @@ def build_tree(tags, albums, cache=None):
     return tree
 
 
+def iter_tree(tree, prefix=()):
+    """Yields (prefix, album) for every album in a tree from build_tree(),
+    where prefix is the tuple of node values leading to the album.
+    """
+
+    if isinstance(tree, list):
+        for album in tree:
+            yield prefix, album
+        return
+
+    for key, value in iteritems(tree):
+        for item in iter_tree(value, prefix + (key,)):
+            yield item
+
+
 class CollectionModelMixin(object):
 
+    def get_paths_for_album(self, album):
+        """Returns a list of paths for all rows of the album"""
+
+        paths = []
+        for child_path in self.get_model().get_paths_for_album(album):
+            path = self.convert_child_path_to_path(child_path)
+            if path is not None:
+                paths.append(path)
+        return paths
+
     def get_path_for_album(self, album):
         """Returns the path for an album or None"""
 
-        def func(model, path, iter_, result):
-            item = model.get_value(iter_)
-            if getattr(item, "album", None) is album:
-                # pygobject bug: treepath only valid in callback,
-                # so make a copy
-                result[0] = path.copy()
-                return True
-            return False
-
-        res = [None]
-        self.foreach(func, res)
-        return res[0]
+        paths = self.get_paths_for_album(album)
+        if not paths:
+            return None
+        return min(paths, key=lambda p: p.get_indices())
 
     def get_albums_for_path(self, path):
         return self.get_albums_for_iter(self.get_iter(path))
@@ -153,9 +170,26 @@ class CollectionSortModel(ObjectModelSort, CollectionModelMixin):
 
 
 class CollectionTreeStore(ObjectTreeStore, CollectionModelMixin):
+    """Tree of container nodes (one level per tag) with albums as leaves.
+
+    Keeps an index of the album rows and of the children of each container,
+    so changes only touch the rows of the affected albums.
+    """
+
     def __init__(self):
         super(CollectionTreeStore, self).__init__(object)
         self.__tags = []
+        self.__reset_index()
+
+    def __reset_index(self):
+        # album -> {prefix: iter} of all its AlbumNode rows
+        self.__albums = {}
+        # prefix -> {value: iter} of the container rows below the prefix
+        self.__children = {}
+
+    def clear(self):
+        super(CollectionTreeStore, self).clear()
+        self.__reset_index()
 
     def set_albums(self, tags, albums):
         self.clear()
@@ -166,100 +200,66 @@ class CollectionTreeStore(ObjectTreeStore, CollectionModelMixin):
     def tags(self):
         return [t[0] for t in self.__tags]
 
+    def get_paths_for_album(self, album):
+        return [self.get_path(i)
+                for i in itervalues(self.__albums.get(album, {}))]
+
+    def __get_parent(self, prefix):
+        """Returns the container iter for prefix, creates missing ones"""
+
+        parent = None
+        for i, value in enumerate(prefix):
+            children = self.__children.setdefault(prefix[:i], {})
+            iter_ = children.get(value)
+            if iter_ is None:
+                iter_ = self.append(parent=parent, row=[value])
+                children[value] = iter_
+            parent = iter_
+        return parent
+
+    def __add_album(self, prefix, album):
+        iters = self.__albums.setdefault(album, {})
+        if prefix not in iters:
+            iters[prefix] = self.append(
+                parent=self.__get_parent(prefix), row=[AlbumNode(album)])
+
+    def __remove_album(self, prefix, iter_):
+        """Removes an album row and all containers which are empty now"""
+
+        self.remove(iter_.copy())
+        while prefix:
+            parent_prefix, value = prefix[:-1], prefix[-1]
+            children = self.__children[parent_prefix]
+            parent = children[value]
+            if self.iter_has_child(parent):
+                break
+            self.remove(parent.copy())
+            del children[value]
+            self.__children.pop(prefix, None)
+            prefix = parent_prefix
+
     def add_albums(self, albums):
-        def _add(tree, iter_=None):
-            # lowest level, add albums
-            if isinstance(tree, list):
-                for album in tree:
-                    self.append(parent=iter_, row=[AlbumNode(album)])
-                return
-
-            # move into existing nodes and remove them from tree
-            child = self.iter_children(iter_)
-            while child:
-                obj = self[child][0]
-                if obj in tree:
-                    _add(tree[obj], child)
-                    del tree[obj]
-                child = self.iter_next(child)
-
-            # add missing ones
-            for key, value in iteritems(tree):
-                _add(value, self.append(parent=iter_, row=[key]))
-
-        _add(build_tree(self.__tags, albums))
+        for prefix, album in iter_tree(build_tree(self.__tags, albums)):
+            self.__add_album(prefix, album)
 
     def remove_albums(self, albums):
-        # We can't get anything from the albums (they have no songs),
-        # so we have to look through everything.
-
-        def _remove_albums(albums, iter_=None):
-            child = self.iter_children(iter_)
-            while child:
-                _remove_albums(albums, child)
-                obj = self[child][0]
-                if isinstance(obj, AlbumNode):
-                    # remove albums
-                    if obj.album in albums:
-                        if not self.remove(child):
-                            child = None
-                        continue
-                    else:
-                        child = self.iter_next(child)
-                else:
-                    # clean up empty containers
-                    if not self.iter_has_child(child):
-                        if not self.remove(child):
-                            child = None
-                        continue
-                    else:
-                        child = self.iter_next(child)
-
-        _remove_albums(set(albums))
+        for album in albums:
+            for prefix, iter_ in iteritems(self.__albums.pop(album, {})):
+                self.__remove_album(prefix, iter_)
 
     def change_albums(self, albums):
-        def _check_albums(tree, iter_=None, not_found=None):
-            if not_found is None:
-                not_found = set()
-
-            if isinstance(tree, list):
-                # save nodes that are not there anymore
-                child = self.iter_children(iter_)
-                while child:
-                    row = self[child]
-                    try:
-                        tree.remove(row[0].album)
-                    except ValueError:
-                        pass
-                    else:
-                        # it's still in the same position, trigger a redraw
-                        self.row_changed(row.path, row.iter)
-                    child = self.iter_next(child)
-                not_found.update(tree)
-                return not_found
-
-            child = self.iter_children(iter_)
-            while child:
-                obj = self[child][0]
-                if obj in tree:
-                    _check_albums(tree[obj], child, not_found)
-                    del tree[obj]
-                child = self.iter_next(child)
-
-            # everything left over changed
-            def _get_all(sub, found=None):
-                if found is None:
-                    found = set()
-                if isinstance(sub, list):
-                    found.update(sub)
-                    return found
-                for v in itervalues(sub):
-                    _get_all(v, found)
-                return found
-            not_found.update(_get_all(tree))
-
-            return not_found
-
-        not_found = _check_albums(build_tree(self.__tags, albums))
-        self.remove_albums(not_found)
-        self.add_albums(not_found)
+        placements = {}
+        for prefix, album in iter_tree(build_tree(self.__tags, albums)):
+            placements.setdefault(album, set()).add(prefix)
+
+        for album, prefixes in iteritems(placements):
+            iters = self.__albums.setdefault(album, {})
+            for prefix, iter_ in list(iteritems(iters)):
+                if prefix in prefixes:
+                    # it's still in the same position, trigger a redraw
+                    self.row_changed(self.get_path(iter_), iter_)
+                else:
+                    del iters[prefix]
+                    self.__remove_album(prefix, iter_)
+            for prefix in prefixes:
+                self.__add_album(prefix, album)
@@ -17,9 +17,10 @@ from gi.repository import Gtk, Pango, Gdk, Gio
 
 from .prefs import Preferences, DEFAULT_PATTERN_TEXT
 from quodlibet.browsers.albums.models import (AlbumModel,
-    AlbumFilterModel, AlbumSortModel)
+    AlbumFilterModel)
 from quodlibet.browsers.albums.main import (get_cover_size,
-    AlbumTagCompletion, PreferencesButton, VisibleUpdate)
+    AlbumTagCompletion, PreferencesButton, VisibleUpdate, get_title_key,
+    get_artist_key, get_date_key, get_genre_key, get_rating_key)
 
 import quodlibet
 from quodlibet import app
@@ -52,11 +53,11 @@ class PreferencesButton(PreferencesButton):
         Gtk.HBox.__init__(self)
 
         sort_orders = [
-            (_("_Title"), self.__compare_title),
-            (_("_Artist"), self.__compare_artist),
-            (_("_Date"), self.__compare_date),
-            (_("_Genre"), self.__compare_genre),
-            (_("_Rating"), self.__compare_rating),
+            (_("_Title"), get_title_key),
+            (_("_Artist"), get_artist_key),
+            (_("_Date"), get_date_key),
+            (_("_Genre"), get_genre_key),
+            (_("_Rating"), get_rating_key),
         ]
 
         menu = Gtk.Menu()
@@ -68,16 +69,15 @@ class PreferencesButton(PreferencesButton):
         active = config.getint('browsers', 'album_sort', 1)
 
         item = None
-        for i, (label, func) in enumerate(sort_orders):
+        for i, (label, get_key) in enumerate(sort_orders):
             item = RadioMenuItem(group=item, label=label,
                                  use_underline=True)
-            model.set_sort_func(100 + i, func)
             if i == active:
-                model.set_sort_column_id(100 + i, Gtk.SortType.ASCENDING)
+                model.set_sort_key(get_key)
                 item.set_active(True)
             item.connect("toggled",
                          util.DeferredSignal(self.__sort_toggled_cb),
-                         model, i)
+                         model, get_key, i)
             sort_menu.append(item)
 
         sort_item.set_submenu(sort_menu)
@@ -221,8 +221,7 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
 
         self.scrollwin = sw = ScrolledWindow()
         sw.set_shadow_type(Gtk.ShadowType.IN)
-        model_sort = AlbumSortModel(model=self.__model)
-        model_filter = AlbumFilterModel(child_model=model_sort)
+        model_filter = AlbumFilterModel(child_model=self.__model)
         self.view = view = IconView(model_filter)
         #view.set_item_width(get_cover_size() + 12)
         self.view.set_row_spacing(config.getint("browsers", "row_spacing", 6))
@@ -321,7 +320,7 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         connect_obj(search, 'focus-out', lambda w: w.grab_focus(), view)
         self.__search = search
 
-        prefs = PreferencesButton(self, model_sort)
+        prefs = PreferencesButton(self, self.__model)
         search.pack_start(prefs, False, True, 0)
         self.pack_start(Align(search, left=6, top=6), False, True, 0)
         self.pack_start(sw, True, True, 0)
@@ -370,10 +369,8 @@ class CoverGrid(Browser, util.InstanceTracker, VisibleUpdate,
         return item.album is not None and not item.scanned
 
     def _update_row(self, filter_model, iter_):
-        sort_model = filter_model.get_model()
-        model = sort_model.get_model()
+        model = filter_model.get_model()
         iter_ = filter_model.convert_iter_to_child_iter(iter_)
-        iter_ = sort_model.convert_iter_to_child_iter(iter_)
         tref = Gtk.TreeRowReference.new(model, model.get_path(iter_))
         mag = config.getfloat("browsers", "covergrid_magnification", 3.)
 
@@ -12,6 +12,8 @@
 # needs them to be there.
 
 import os
+import time
+from functools import partial
 
 from gi.repository import Gtk, Gdk
 from senf import fsn2uri, fsn2bytes, bytes2fsn
@@ -27,13 +29,102 @@ from quodlibet.qltk.filesel import MainDirectoryTree
 from quodlibet.qltk.songsmenu import SongsMenu
 from quodlibet.qltk.x import ScrolledWindow
 from quodlibet.qltk import Icons
-from quodlibet.util import copool
 from quodlibet.util.library import get_scan_dirs
 from quodlibet.util.dprint import print_d
-from quodlibet.util.path import normalize_path
+from quodlibet.util.path import normalize_path, listdir
+from quodlibet.util.thread import call_async, call_async_background, \
+    Cancellable
 from quodlibet.util import connect_obj
 
 
+CHUNK_SIZE = 64
+"""Number of files parsed by one worker task"""
+
+UPDATE_INTERVAL = 0.25
+"""Minimum time in seconds between song list updates while loading"""
+
+MAX_PREFETCH_DIRS = 8
+"""Maximum number of directories next to the selection loaded ahead"""
+
+MAX_PREFETCH_FILES = 1000
+"""Directories containing more audio files than this aren't prefetched"""
+
+
+def _list_directory(dir_):
+    """Returns the normalised paths of all files in `dir_` which look like
+    audio files, sorted by name.
+    """
+
+    try:
+        names = sorted(filter(formats.filter, os.listdir(dir_)))
+    except OSError:
+        return []
+    return [normalize_path(os.path.join(dir_, name), canonicalise=True)
+            for name in names]
+
+
+def _load_files(paths, library, cache):
+    """Returns a list of (path, song, is_new) tuples for `paths`.
+
+    Songs in `library` are used as is, songs in `cache` only if their
+    file hasn't changed since. All other files get parsed, in which case
+    `is_new` is True and `song` is the new AudioFile or None on error.
+
+    Meant to be run in a thread, the libraries only get read.
+    """
+
+    result = []
+    for path in paths:
+        song = library.get(path)
+        if song is not None:
+            result.append((path, song, False))
+            continue
+        song = cache.get(path)
+        if song is not None and song.valid():
+            result.append((path, song, False))
+            continue
+        result.append((path, formats.MusicFile(path), True))
+    return result
+
+
+def _load_directory(dir_, library, cache):
+    """Like _load_files() for all files in `dir_`, unless there are
+    more than MAX_PREFETCH_FILES.
+    """
+
+    paths = _list_directory(dir_)
+    if len(paths) > MAX_PREFETCH_FILES:
+        return []
+    return _load_files(paths, library, cache)
+
+
+def _get_prefetch_dirs(dirs):
+    """Returns the directories likely to be selected after `dirs`: their
+    siblings next to them and their sub directories.
+    """
+
+    def get_sub_dirs(dir_):
+        try:
+            return [p for p in listdir(dir_) if os.path.isdir(p)]
+        except OSError:
+            return []
+
+    next_, children, previous = [], [], []
+    for dir_ in dirs:
+        siblings = get_sub_dirs(os.path.dirname(dir_))
+        if dir_ in siblings:
+            index = siblings.index(dir_)
+            next_.extend(siblings[index + 1:index + 2])
+            previous.extend(siblings[max(index - 1, 0):index])
+        children.extend(get_sub_dirs(dir_))
+
+    result = []
+    for dir_ in next_ + children + previous:
+        if dir_ not in dirs and dir_ not in result:
+            result.append(dir_)
+    return result[:MAX_PREFETCH_DIRS]
+
+
 class FileSystem(Browser, Gtk.HBox):
 
     __library = None
@@ -90,16 +181,27 @@ class FileSystem(Browser, Gtk.HBox):
                            targets, Gdk.DragAction.COPY)
         dt.connect('drag-data-get', self.__drag_data_get)
 
+        self.__load_cancel = Cancellable()
+        self.__prefetch_cancel = Cancellable()
+        self.__results = {}
+        self.__pending = 0
+        self.__last_update = 0
+
         sel = dt.get_selection()
         sel.unselect_all()
-        connect_obj(sel, 'changed', copool.add, self.__songs_selected, dt)
+        connect_obj(sel, 'changed', self.__songs_selected, dt)
         sel.connect("changed", self._on_selection_changed)
         dt.connect('row-activated', lambda *a: self.songs_activated())
         sw.add(dt)
         self.pack_start(sw, True, True, 0)
 
+        self.connect('destroy', self.__destroy)
         self.show_all()
 
+    def __destroy(self, *args):
+        self.__load_cancel.cancel()
+        self.__prefetch_cancel.cancel()
+
     def _on_selection_changed(self, tree_selection):
         model, rows = tree_selection.get_selected_rows()
         selected_paths = [model[row][0] for row in rows]
@@ -117,8 +219,7 @@ class FileSystem(Browser, Gtk.HBox):
     def __drag_data_get(self, view, ctx, sel, tid, etime):
         model, rows = view.get_selection().get_selected_rows()
         dirs = [model[row][0] for row in rows]
-        for songs in self.__find_songs(view.get_selection()):
-            pass
+        songs = self.__find_songs(view.get_selection())
         if tid == self.TARGET_QL:
             cant_add = listfilter(lambda s: not s.can_add, songs)
             if cant_add:
@@ -192,7 +293,7 @@ class FileSystem(Browser, Gtk.HBox):
             self.get_child().scroll_to_cell(first[0], None, True, 0.5)
 
     def activate(self):
-        copool.add(self.__songs_selected, self.get_child())
+        self.__songs_selected(self.get_child())
 
     def Menu(self, songs, library, items):
 
@@ -217,43 +318,117 @@ class FileSystem(Browser, Gtk.HBox):
         songs = list(filter(self.__glibrary.__contains__, songs))
         self.__library.librarian.move(songs, self.__glibrary, self.__library)
 
-    def __find_songs(self, selection):
-        model, rows = selection.get_selected_rows()
-        dirs = [model[row][0] for row in rows]
+    def __merge(self, result):
+        """Takes a _load_files() result, puts new songs into our library
+        and returns all songs.
+        """
+
         songs = []
         to_add = []
-        for dir in dirs:
-            try:
-                for file in list(filter(formats.filter,
-                                        sorted(os.listdir(dir)))):
-                    raw_path = os.path.join(dir, file)
-                    fn = normalize_path(raw_path, canonicalise=True)
-                    if fn in self.__glibrary:
-                        songs.append(self.__glibrary[fn])
-                    elif fn not in self.__library:
-                        song = formats.MusicFile(fn)
-                        if song:
-                            to_add.append(song)
-                            songs.append(song)
-                            yield songs
-                    if fn in self.__library:
-                        song = self.__library[fn]
-                        if not song.valid():
-                            self.__library.reload(song)
-                        if song in self.__library:
-                            songs.append(song)
-            except OSError:
-                pass
+        to_remove = []
+        for path, song, is_new in result:
+            known = self.__glibrary.get(path)
+            if known is not None:
+                songs.append(known)
+                continue
+            cached = self.__library.get(path)
+            if cached is not None and cached is not song:
+                # changed on disk or loaded twice in the meantime
+                to_remove.append(cached)
+            if song is None:
+                continue
+            if cached is not song:
+                to_add.append(song)
+            songs.append(song)
+
+        self.__library.remove(to_remove)
         self.__library.add(to_add)
-        yield songs
+        return songs
+
+    def __find_songs(self, selection):
+        model, rows = selection.get_selected_rows()
+        songs = []
+        for row in rows:
+            result = _load_files(_list_directory(model[row][0]),
+                                 self.__glibrary, self.__library)
+            songs.extend(self.__merge(result))
+        return songs
 
     def __songs_selected(self, view):
+        self.__load_cancel.cancel()
+        self.__prefetch_cancel.cancel()
+        self.__load_cancel = cancel = Cancellable()
+
+        model, rows = view.get_selection().get_selected_rows()
+        dirs = [model[row][0] for row in rows]
+        self.__results = {}
+        self.__pending = len(dirs)
+        self.__last_update = time.time()
+
         if self.get_window():
             self.get_window().set_cursor(Gdk.Cursor.new(Gdk.CursorType.WATCH))
-        for songs in self.__find_songs(view.get_selection()):
-            yield True
-        if self.get_window():
-            self.get_window().set_cursor(None)
+
+        # List the directories in parallel and parse their files in
+        # chunks, so big directories get spread over the pool as well.
+        for index, dir_ in enumerate(dirs):
+            call_async(_list_directory, cancel,
+                       partial(self.__listed, cancel, dirs, index),
+                       args=(dir_,))
+        self.__update(dirs)
+
+    def __listed(self, cancel, dirs, index, paths):
+        self.__pending -= 1
+        for start in range(0, len(paths), CHUNK_SIZE):
+            self.__pending += 1
+            call_async(_load_files, cancel,
+                       partial(self.__loaded, dirs, (index, start)),
+                       args=(paths[start:start + CHUNK_SIZE],
+                             self.__glibrary, self.__library))
+        self.__update(dirs)
+
+    def __loaded(self, dirs, key, result):
+        self.__pending -= 1
+        self.__results[key] = self.__merge(result)
+        self.__update(dirs)
+
+    def __update(self, dirs):
+        """Pass the songs loaded so far to the song list, at most every
+        UPDATE_INTERVAL seconds while still loading.
+        """
+
+        done = not self.__pending
+        now = time.time()
+        if not done and now - self.__last_update < UPDATE_INTERVAL:
+            return
+        self.__last_update = now
+
+        songs = []
+        for key in sorted(self.__results):
+            songs.extend(self.__results[key])
+
+        if done:
+            if self.get_window():
+                self.get_window().set_cursor(None)
+            self.__prefetch(dirs)
         self.songs_selected(songs)
 
+    def __prefetch(self, dirs):
+        """Load the directories likely to be selected next in the
+        background, so selecting them only needs to check file mtimes.
+        """
+
+        if not dirs:
+            return
+
+        self.__prefetch_cancel = cancel = Cancellable()
+
+        def found(prefetch_dirs):
+            print_d("Prefetching %d directories" % len(prefetch_dirs))
+            for dir_ in prefetch_dirs:
+                call_async_background(
+                    _load_directory, cancel, self.__merge,
+                    args=(dir_, self.__glibrary, self.__library))
+
+        call_async_background(_get_prefetch_dirs, cancel, found, args=(dirs,))
+
 browsers = [FileSystem]
@@ -7,6 +7,7 @@
 # (at your option) any later version.
 
 import re
+import bisect
 
 from quodlibet import _
 from quodlibet import util
@@ -115,12 +116,29 @@ class AllEntry(BaseEntry):
 
 
 class PaneModel(ObjectStore):
+    """Model of pane entries.
+
+    Besides the rows, the model keeps a key -> entry map and the sort values
+    of all SongsEntry rows in model order, so entries affected by added or
+    removed songs can be located by bisection instead of walking all rows.
+    """
 
     def __init__(self, pattern_config):
         super(PaneModel, self).__init__()
         self.__sort_cache = {} # text to sort text cache
         self.__key_cache = {} # song to key cache
         self.config = pattern_config
+        self.__reset_index()
+
+    def __reset_index(self):
+        self.__entries = {} # key to entry, "" for the unknown entry
+        self.__sorts = [] # SongsEntry sort values in model order
+        self.__keys = [] # SongsEntry keys in model order
+        self.__empty = set() # keys of entries which have lost all songs
+
+    def clear(self):
+        super(PaneModel, self).clear()
+        self.__reset_index()
 
     def get_format_keys(self, song):
         try:
@@ -143,6 +161,43 @@ class PaneModel(ObjectStore):
             self.__sort_cache[text] = util.human_sort_key(text_stripped)
             return self.__sort_cache[text], text
 
+    def __get_offset(self):
+        """The row index of the first SongsEntry"""
+
+        if not self.is_empty() and isinstance(self[0][0], AllEntry):
+            return 1
+        return 0
+
+    def __get_index(self, key):
+        """The row index of the entry with the given key"""
+
+        if key == "":
+            return len(self) - 1
+
+        entry = self.__entries[key]
+        index = bisect.bisect_left(self.__sorts, entry.sort)
+        while self.__keys[index] != key:
+            index += 1
+        return index + self.__get_offset()
+
+    def __entry_changed(self, key):
+        entry = self.__entries[key]
+        entry.finalize()
+        iter_ = self.get_iter((self.__get_index(key),))
+        self.row_changed(self.get_path(iter_), iter_)
+
+    def __remove_entry(self, key):
+        iter_ = self.get_iter((self.__get_index(key),))
+        if key != "":
+            index = bisect.bisect_left(
+                self.__sorts, self.__entries[key].sort)
+            while self.__keys[index] != key:
+                index += 1
+            del self.__sorts[index]
+            del self.__keys[index]
+        del self.__entries[key]
+        self.remove(iter_)
+
     def get_songs(self, paths):
         """Get all songs for the given paths (from a selection e.g.)"""
 
@@ -169,33 +224,37 @@ class PaneModel(ObjectStore):
         If remove_if_empty == True, entries with no songs will be removed.
         """
 
-        songs = set(songs)
-
-        for song in songs:
-            if song in self.__key_cache:
-                del self.__key_cache[song]
-
-        to_remove = []
-        for iter_, entry in self.iterrows():
-            if isinstance(entry, AllEntry):
+        # only look at the entries the songs were sorted into
+        changed = set()
+        for song in set(songs):
+            items = self.__key_cache.pop(song, None)
+            if items is None:
                 continue
-            entry.songs -= songs
-            entry.finalize()
-            self.row_changed(self.get_path(iter_), iter_)
-            if not entry.songs:
-                to_remove.append(iter_)
+            keys = [key for key, sort in items] or [""]
+            for key in keys:
+                entry = self.__entries.get(key)
+                if entry is not None and song in entry.songs:
+                    entry.songs.discard(song)
+                    changed.add(key)
+
+        for key in changed:
+            self.__entry_changed(key)
+            if not self.__entries[key].songs:
+                self.__empty.add(key)
 
         if not remove_if_empty:
             return
 
         # remove from cache and the model
-        for iter_ in to_remove:
+        to_remove = [k for k in self.__empty
+                     if k in self.__entries and not self.__entries[k].songs]
+        self.__empty.clear()
+        for key in to_remove:
+            self.__remove_entry(key)
             try:
-                key = self.get_value(iter_).key
                 del(self.__sort_cache[key])
             except KeyError:
                 pass
-            self.remove(iter_)
 
         if len(self) == 1 and isinstance(self[0][0], AllEntry):
             # only All is left.. clear everything
@@ -227,58 +286,37 @@ class PaneModel(ObjectStore):
                     collection[key] = (entry, hsort, bool(sort))
                     entry.songs.add(song)
 
-        items = sorted(iteritems(collection),
-                       key=lambda s: s[1][1],
-                       reverse=True)
+        items = sorted(iteritems(collection), key=lambda s: s[1][1])
 
         # fast path
         if not len(self):
-            if unknown.songs:
-                self.insert(0, [unknown])
             entries = []
             for key, (val, sort_key, srtp) in items:
                 entries.append(val)
-            self.insert_many(0, reversed(entries))
+                self.__entries[key] = val
+                self.__sorts.append(sort_key)
+                self.__keys.append(key)
+            if unknown.songs:
+                entries.append(unknown)
+                self.__entries[""] = unknown
+            self.insert_many(0, entries)
             if len(self) > 1:
                 self.insert(0, [AllEntry()])
             return
 
-        # insert all new songs
-        key = None
-        val = None
-        sort_key = None
-
-        for iter_, entry in self.iterrows():
-            if not isinstance(entry, SongsEntry):
-                continue
-
-            if key is None:
-                if not items:
-                    break
-                key, (val, sort_key, srtp) = items.pop(-1)
-
-            if key == entry.key: # Display strings the same
-                entry.songs |= val.songs
-                entry.finalize()
-                self.row_changed(self.get_path(iter_), iter_)
-                key = None
-            elif sort_key < entry.sort:
-                self.insert_before(iter_, row=[val])
-                key = None
-
-        # the last one failed, add it again
-        if key:
-            items.append((key, (val, sort_key, srtp)))
-
-        # insert the left over songs
-        if items:
-            entries = []
-            for key, (val, srt, srtp) in items:
-                entries.append(val)
-            if isinstance(self[-1][0], UnknownEntry):
-                self.insert_many(len(self) - 1, entries)
+        # merge into existing entries or insert at the sorted position
+        offset = self.__get_offset()
+        for key, (val, sort_key, srtp) in items:
+            self.__empty.discard(key)
+            if key in self.__entries:
+                self.__entries[key].songs |= val.songs
+                self.__entry_changed(key)
             else:
-                self.append_many(entries)
+                index = bisect.bisect_right(self.__sorts, sort_key)
+                self.__sorts.insert(index, sort_key)
+                self.__keys.insert(index, key)
+                self.__entries[key] = val
+                self.insert(offset + index, [val])
 
         # check if All needs to be inserted
         if len(self) > 1 and not isinstance(self[0][0], AllEntry):
@@ -286,13 +324,12 @@ class PaneModel(ObjectStore):
 
         # check if Unknown needs to be inserted or updated
         if unknown.songs:
-            last_row = self[-1]
-            entry = last_row[0]
-            if isinstance(entry, UnknownEntry):
-                entry.songs |= unknown.songs
-                entry.finalize()
-                self.row_changed(last_row.path, last_row.iter)
+            self.__empty.discard("")
+            if "" in self.__entries:
+                self.__entries[""].songs |= unknown.songs
+                self.__entry_changed("")
             else:
+                self.__entries[""] = unknown
                 self.append(row=[unknown])
 
     def matches(self, paths, song):
@@ -314,11 +351,10 @@ class PaneModel(ObjectStore):
         if not keys and isinstance(self[paths[-1]][0], UnknownEntry):
             return True
 
-        for path in paths:
-            entry = self.get_value(self.get_iter(path))
-            for key in keys:
-                if entry.key == (key[0] if isinstance(key, tuple) else key):
-                    return True
+        selected = self.get_keys(paths)
+        for key, sort in keys:
+            if key in selected:
+                return True
 
         return False
 
@@ -328,8 +364,7 @@ class PaneModel(ObjectStore):
         # fast path, use the keys since they are unique and only depend
         # on the tag in question.
         if tag in tags and len(tags) == 1:
-            return {r.key for r in self.itervalues()
-                    if not isinstance(r, AllEntry)}
+            return set(self.__entries)
 
         # For patterns/tied tags we have to make sure that filtering for
         # that key will return only songs that all have the specified value
@@ -44,7 +44,7 @@ class PaneConfig(object):
             except ValueError:
                 pc = XMLFromPattern("")
             tags = pc.tags
-            format = pc.format_list
+            format = pc.format_list_cached
             has_markup = True
         else:
             title = util.tag(cat)
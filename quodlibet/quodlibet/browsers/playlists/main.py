@@ -37,6 +37,7 @@ from quodlibet.qltk.properties import SongProperties
 from quodlibet.util import connect_obj
 from quodlibet.util.dprint import print_d, print_w
 from quodlibet.util.collection import FileBackedPlaylist
+from quodlibet.util.savedsearches import get_saved_searches
 from quodlibet.util.urllib import urlopen
 
 from .util import parse_m3u, parse_pls, PLAYLISTS,\
@@ -84,6 +85,7 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
             except EnvironmentError:
                 print_w("Invalid Playlist '%s'" % playlist)
                 pass
+        klass.__sync_saved_searches()
 
         klass._ids = [
             library.connect('removed', klass.__removed),
@@ -94,8 +96,10 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
 
     @classmethod
     def deinit(cls, library):
+        FileBackedPlaylist.flush_all()
         model = cls.__lists.get_model()
         model.clear()
+        cls.__searches_generation = None
 
         for id_ in cls._ids:
             library.disconnect(id_)
@@ -105,6 +109,25 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
     def playlists(klass):
         return [row[0] for row in klass.__lists]
 
+    @classmethod
+    def __sync_saved_searches(klass):
+        """Show the saved searches as read-only playlists, replacing the
+        old ones if they have changed.
+        """
+
+        searches = get_saved_searches(klass.library)
+        searches.reload()
+        if searches.generation == klass.__searches_generation:
+            return
+        klass.__searches_generation = searches.generation
+
+        model = klass.__lists.get_model()
+        for iter_, playlist in list(model.iterrows()):
+            if playlist.read_only:
+                model.remove(iter_)
+        for playlist in searches.playlists():
+            model.append(row=[playlist])
+
     @classmethod
     def changed(klass, playlist, refresh=True):
         model = klass.__lists
@@ -113,11 +136,11 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
                 if refresh:
                     print_d("Refreshing playlist %s..." % row[0])
                     klass.__lists.row_changed(row.path, row.iter)
-                playlist.write()
+                playlist.write_later()
                 break
         else:
             model.get_model().append(row=[playlist])
-            playlist.write()
+            playlist.write_later()
 
     @classmethod
     def __removed(klass, library, songs):
@@ -135,10 +158,8 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
     @classmethod
     def __changed(klass, library, songs):
         for playlist in klass.playlists():
-            for song in songs:
-                if song in playlist.songs:
-                    klass.changed(playlist)
-                    break
+            if playlist.has_songs(songs)[0]:
+                klass.changed(playlist)
 
     def cell_data(self, col, cell, model, iter, data):
         playlist = model[iter][0]
@@ -154,8 +175,9 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         remove = qltk.MenuItem(_("_Remove from Playlist"), Icons.LIST_REMOVE)
         qltk.add_fake_accel(remove, "Delete")
         connect_obj(remove, 'activate', self.__remove, iters, model)
-        playlist_iter = self.__selected_playlists()[1]
-        remove.set_sensitive(bool(playlist_iter))
+        playlist_model, playlist_iter = self.__selected_playlists()
+        remove.set_sensitive(bool(playlist_iter) and
+                             not playlist_model[playlist_iter][0].read_only)
         items.append([remove])
         menu = super(PlaylistsBrowser, self).Menu(songs, library, items)
         return menu
@@ -168,6 +190,7 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
 
     __lists = ObjectModelSort(model=ObjectStore())
     __lists.set_default_sort_func(ObjectStore._sort_on_value)
+    __searches_generation = None
 
     def __init__(self, library):
         self.library = library
@@ -302,6 +325,8 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
                 return False
 
             playlist = model[iter][0]
+            if playlist.read_only:
+                return True
             dialog = ConfirmRemovePlaylistDialog(self, playlist)
             if dialog.run() == Gtk.ResponseType.YES:
                 playlist.delete()
@@ -354,6 +379,8 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         model, iter = self.__selected_playlists()
         if iter:
             playlist = model[iter][0]
+            if playlist.read_only:
+                return
             # A {iter: song} dict, exhausting `iters` once.
             removals = {iter_remove: song_at(iter_remove)
                         for iter_remove in iters}
@@ -406,6 +433,9 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
                 GLib.idle_add(self._select_playlist, playlist)
             else:
                 playlist = model[path][0]
+                if playlist.read_only:
+                    Gtk.drag_finish(ctx, False, False, etime)
+                    return
                 playlist.extend(songs)
             self.changed(playlist)
             Gtk.drag_finish(ctx, True, False, etime)
@@ -485,8 +515,11 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
                 model.get_model().remove(
                     model.convert_iter_to_child_iter(itr))
 
+        playlist = model[itr][0]
+
         rem = MenuItem(_("_Delete"), Icons.EDIT_DELETE)
         connect_obj(rem, 'activate', _remove, model, itr)
+        rem.set_sensitive(not playlist.read_only)
         menu.prepend(rem)
 
         def _rename(path):
@@ -495,14 +528,16 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         ren = qltk.MenuItem(_("_Rename"), Icons.EDIT)
         qltk.add_fake_accel(ren, "F2")
         connect_obj(ren, 'activate', _rename, model.get_path(itr))
+        ren.set_sensitive(not playlist.read_only)
         menu.prepend(ren)
 
-        playlist = model[itr][0]
         PLAYLIST_HANDLER.populate_menu(menu, library, self, [playlist])
         menu.show_all()
         return view.popup_menu(menu, 0, Gtk.get_current_event_time())
 
     def _start_rename(self, path):
+        if self.__lists[path][0].read_only:
+            return
         view = self.__view
         self.__render.set_property('editable', True)
         view.set_cursor(path, view.get_columns()[0], start_editing=True)
@@ -517,6 +552,7 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         self._sb_box.set_text(text)
 
     def activate(self, widget=None, resort=True):
+        self.__sync_saved_searches()
         songs = self._get_playlist_songs()
         query = self._sb_box.get_query(SongList.star)
         if query and query.is_parsable:
@@ -645,6 +681,10 @@ class PlaylistsBrowser(Browser, DisplayPatternMixin):
         playlist = None
         if iter:
             playlist = model[iter][0]
+            if playlist.read_only:
+                # undo the reordering
+                self.activate()
+                return
             playlist[:] = songs
         elif songs:
             playlist = FileBackedPlaylist.from_songs(PLAYLISTS, songs,
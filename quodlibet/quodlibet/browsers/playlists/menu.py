@@ -30,6 +30,8 @@ class PlaylistMenu(Gtk.Menu):
         self.set_size_request(int(i.size_request().width * 2), -1)
 
         for playlist in playlists:
+            if playlist.read_only:
+                continue
             name = playlist.name
             i = Gtk.CheckMenuItem(label=name)
             some, all = playlist.has_songs(songs)
@@ -20,6 +20,7 @@ from quodlibet.qltk.searchbar import LimitSearchBarBox
 from quodlibet.qltk.songlist import SongList
 from quodlibet.qltk.x import Align, SymbolicIconImage
 from quodlibet.qltk import Icons
+from quodlibet.util.savedsearches import get_saved_searches
 
 
 class PreferencesButton(Gtk.HBox):
@@ -101,7 +102,14 @@ class SearchBar(Browser):
 
     def _get_songs(self):
         self._query = self._sb_box.get_query(SongList.star)
-        return self._query.filter(self._library) if self._query else None
+        if not self._query:
+            return None
+        # saved searches are kept up to date, no need to search again
+        saved = get_saved_searches(self._library).lookup(
+            self._get_text(), SongList.star)
+        if saved is not None:
+            return saved.songs
+        return self._query.filter(self._library)
 
     def activate(self):
         songs = self._get_songs()
@@ -113,6 +113,8 @@ def process_arguments(argv):
         ("print-playlist", _("Print the current playlist")),
         ("print-queue", _("Print the contents of the queue")),
         ("print-query-text", _("Print the active text query")),
+        ("print-instrumentation",
+            _("Print timing statistics of hot code paths as JSON")),
         ("no-plugins", _("Start without plugins")),
         ("run", _("Start Quod Libet if it isn't running")),
         ("quit", _("Exit Quod Libet")),
@@ -249,6 +251,8 @@ def process_arguments(argv):
             queue(command, arg)
         elif command == "print-query-text":
             queue(command)
+        elif command == "print-instrumentation":
+            queue("instrumentation")
         elif command == "start-playing":
             actions.append(command)
         elif command == "start-hidden":
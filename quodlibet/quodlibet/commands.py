@@ -18,7 +18,7 @@ from quodlibet import browsers
 
 from quodlibet.compat import listfilter, text_type
 from quodlibet import util
-from quodlibet.util import print_d, print_e
+from quodlibet.util import print_d, print_e, instrument
 
 from quodlibet.qltk.browser import LibraryBrowser
 from quodlibet.qltk.properties import SongProperties
@@ -43,8 +43,10 @@ class CommandRegistry(object):
         """Register a new command function
 
         The functions gets zero or more arguments as `fsnative`
-        and should return `None` or `fsnative`. In case an error
-        occurred the command should raise `CommandError`.
+        and should return `None` or `fsnative`. Commands with large
+        results can instead return an iterable of `fsnative` lines
+        (without line endings), which can be passed on line by line.
+        In case an error occurred the command should raise `CommandError`.
 
         Args:
             name (str): the command name
@@ -59,6 +61,22 @@ class CommandRegistry(object):
             return func
         return wrap
 
+    @staticmethod
+    def parse_line(line):
+        """Splits a command line into the command name and its arguments
+
+        Args:
+            line (fsnative)
+        Returns:
+            Tuple[fsnative, List[fsnative]]
+        """
+
+        assert isinstance(line, fsnative)
+
+        # only one arg supported atm
+        parts = line.split(" ", 1)
+        return parts[0], parts[1:]
+
     def handle_line(self, app, line):
         """Parses a command line and executes the command.
 
@@ -71,12 +89,7 @@ class CommandRegistry(object):
             fsnative or None
         """
 
-        assert isinstance(line, fsnative)
-
-        # only one arg supported atm
-        parts = line.split(" ", 1)
-        command = parts[0]
-        args = parts[1:]
+        command, args = self.parse_line(line)
 
         print_d("command: %r(*%r)" % (command, args))
 
@@ -93,6 +106,44 @@ class CommandRegistry(object):
         May raise CommandError
         """
 
+        result = self._run(app, name, *args)
+        if result is None or isinstance(result, fsnative):
+            return result
+
+        try:
+            lines = [self._check_line(l) for l in result]
+        except CommandError as e:
+            raise CommandError("%s: %s" % (name, str(e)))
+        return fsnative(u"").join(l + fsnative(u"\n") for l in lines)
+
+    def run_lines(self, app, name, *args):
+        """Like run() but returns an iterator of result lines without line
+        endings, which for some commands get created while iterating.
+
+        May raise CommandError, also while iterating.
+        """
+
+        result = self._run(app, name, *args)
+        if result is None:
+            return iter([])
+        elif isinstance(result, fsnative):
+            return iter(result.splitlines())
+        return self._iter_lines(name, result)
+
+    def _iter_lines(self, name, lines):
+        try:
+            for line in lines:
+                yield self._check_line(line)
+        except CommandError as e:
+            raise CommandError("%s: %s" % (name, str(e)))
+
+    @staticmethod
+    def _check_line(line):
+        if not isinstance(line, fsnative):
+            raise CommandError("returned %r which is not fsnative" % line)
+        return line
+
+    def _run(self, app, name, *args):
         if name not in self._commands:
             raise CommandError("Unknown command %r" % name)
 
@@ -109,7 +160,8 @@ class CommandRegistry(object):
         except CommandError as e:
             raise CommandError("%s: %s" % (name, str(e)))
         else:
-            if result is not None and not isinstance(result, fsnative):
+            if result is not None and not isinstance(result, fsnative) \
+                    and not hasattr(result, "__iter__"):
                 raise CommandError(
                     "%s: returned %r which is not fsnative" % (name, result))
             return result
@@ -486,19 +538,15 @@ def _queue(app, value):
 @registry.register("dump-playlist")
 def _dump_playlist(app):
     window = app.window
-    uris = []
     for song in window.playlist.pl.get():
-        uris.append(song("~uri"))
-    return text2fsn(u"\n".join(uris) + u"\n")
+        yield text2fsn(song("~uri"))
 
 
 @registry.register("dump-queue")
 def _dump_queue(app):
     window = app.window
-    uris = []
     for song in window.playlist.q.get():
-        uris.append(song("~uri"))
-    return text2fsn(u"\n".join(uris) + u"\n")
+        yield text2fsn(song("~uri"))
 
 
 @registry.register("refresh")
@@ -513,8 +561,8 @@ def _print_query(app, query):
     """
 
     query = arg2text(query)
-    songs = app.library.query(query)
-    return "\n".join([song("~filename") for song in songs]) + "\n"
+    for song in app.library.query(query):
+        yield song("~filename")
 
 
 @registry.register("print-query-text")
@@ -523,6 +571,26 @@ def _print_query_text(app):
         return text2fsn(text_type(app.browser.get_filter_text()) + u"\n")
 
 
+@registry.register("instrumentation", optional=1)
+def _instrumentation(app, value=None):
+    """Enables, disables or resets the instrumentation, or returns the
+    recorded values as JSON if no argument is given
+    """
+
+    if value is None:
+        return text2fsn(instrument.dump_json())
+
+    value = arg2text(value)
+    if value in ["1", "on"]:
+        instrument.enable(True)
+    elif value in ["0", "off"]:
+        instrument.enable(False)
+    elif value == "reset":
+        instrument.reset()
+    else:
+        raise CommandError("Invalid value %r" % value)
+
+
 @registry.register("print-playing", optional=1)
 def _print_playing(app, fstring=None):
     from quodlibet.formats import AudioFile
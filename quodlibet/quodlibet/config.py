@@ -215,6 +215,10 @@ INITIAL = {
         # the format of the timestamps in DateColumn
         "datecolumn_timestamp_format": "",
 
+        # also accept remote commands on a Unix domain socket,
+        # see quodlibet.remote.QuodLibetSocketRemote
+        "remote_socket": "false",
+
         # scrollbar does not fade out when inactive
         "scrollbar_always_visible":
             "true" if (is_osx() or is_windows()) else "false",
@@ -298,6 +302,9 @@ add_section = _config.add_section
 has_option = _config.has_option
 remove_option = _config.remove_option
 register_upgrade_function = _config.register_upgrade_function
+register_change_callback = _config.register_change_callback
+unregister_change_callback = _config.unregister_change_callback
+cached = _config.cached
 getbytes = _config.getbytes
 setbytes = _config.setbytes
 
@@ -372,8 +379,12 @@ class RatingsPrefs(object):
     """
 
     def __init__(self):
-        self.__number = self.__default = None
-        self.__full_symbol = self.__blank_symbol = None
+        self.__number = cached("settings", "ratings", "getint")
+        self.__default = cached("settings", "default_rating", "getfloat")
+        self.__full_symbol = cached(
+            "settings", "rating_symbol_full", "gettext")
+        self.__blank_symbol = cached(
+            "settings", "rating_symbol_blank", "gettext")
 
     @property
     def precision(self):
@@ -382,47 +393,39 @@ class RatingsPrefs(object):
 
     @property
     def number(self):
-        if self.__number is None:
-            self.__number = getint("settings", "ratings")
-        return self.__number
+        return self.__number.value
 
     @number.setter
     def number(self, i):
         """The (maximum) integer number of ratings icons configured"""
-        self.__number = self.__save("ratings", int(i))
+        self.__save("ratings", int(i))
 
     @property
     def default(self):
         """The current default floating-point rating"""
-        if self.__default is None:
-            self.__default = getfloat("settings", "default_rating")
-        return self.__default
+        return self.__default.value
 
     @default.setter
     def default(self, f):
-        self.__default = self.__save("default_rating", float(f))
+        self.__save("default_rating", float(f))
 
     @property
     def full_symbol(self):
         """The symbol to use for a full (active) rating"""
-        if self.__full_symbol is None:
-            self.__full_symbol = self.__get_symbol("full")
-        return self.__full_symbol
+        return self.__full_symbol.value
 
     @full_symbol.setter
     def full_symbol(self, s):
-        self.__full_symbol = self.__save("rating_symbol_full", s)
+        self.__save("rating_symbol_full", s)
 
     @property
     def blank_symbol(self):
         """The symbol to use for a blank (inactive) rating, if needed"""
-        if self.__blank_symbol is None:
-            self.__blank_symbol = self.__get_symbol("blank")
-        return self.__blank_symbol
+        return self.__blank_symbol.value
 
     @blank_symbol.setter
     def blank_symbol(self, s):
-        self.__blank_symbol = self.__save("rating_symbol_blank", s)
+        self.__save("rating_symbol_blank", s)
 
     @property
     def all(self):
@@ -432,11 +435,6 @@ class RatingsPrefs(object):
     @staticmethod
     def __save(key, value):
         set("settings", key, value)
-        return value
-
-    @staticmethod
-    def __get_symbol(variant="full"):
-        return gettext("settings", "rating_symbol_%s" % variant)
 
 
 class HardCodedRatingsPrefs(RatingsPrefs):
@@ -460,9 +458,13 @@ class DurationFormat(str):
 
 
 class DurationFormatPref(object):
+
+    def __init__(self):
+        self.__format = cached("display", "duration_format")
+
     @property
     def format(self):
-        raw = get("display", "duration_format")
+        raw = self.__format.value
         return DurationFormat.value_of(raw, DurationFormat.STANDARD)
 
     @format.setter
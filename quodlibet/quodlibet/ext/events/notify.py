@@ -369,12 +369,14 @@ class Notify(EventPlugin):
         strip_links = lambda t: re.subn(r"\</?a.*?\>", "", t)[0]
         strip_images = lambda t: re.subn(r"\<img.*?\>", "", t)[0]
 
-        title = XMLFromPattern(pconfig.gettext("titlepattern")) % song
+        title = XMLFromPattern(
+            pconfig.gettext("titlepattern")).format_cached(song)
         title = unescape(strip_markup(strip_links(strip_images(title))))
 
         body = ""
         if "body" in caps:
-            body = XMLFromPattern(pconfig.gettext("bodypattern")) % song
+            body = XMLFromPattern(
+                pconfig.gettext("bodypattern")).format_cached(song)
 
             if "body-markup" not in caps:
                 body = strip_markup(body)
@@ -14,6 +14,7 @@
 # (at your option) any later version.
 
 import os
+import json
 import threading
 import time
 from hashlib import md5
@@ -30,8 +31,9 @@ from quodlibet.plugins import PluginConfig
 from quodlibet.qltk.entry import ValidatingEntry, UndoEntry
 from quodlibet.qltk.msg import Message
 from quodlibet.qltk import Icons
-from quodlibet.util.dprint import print_d
-from quodlibet.util.picklehelper import pickle_load, pickle_dump, PickleError
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.picklehelper import pickle_load, PickleError
 from quodlibet.compat import urlencode
 from quodlibet.util.urllib import urlopen, UrllibError
 from quodlibet.errorreport import errorhook
@@ -80,6 +82,105 @@ def config_get_artist_pattern():
     return plugin_config.get('artistpat') or DEFAULT_ARTISTPAT
 
 
+class ScrobbleJournal(object):
+    """An append-only file of scrobbles which survives crashes.
+
+    Every scrobble gets appended as a JSON line {"id": n, "song": {...}}
+    and synced to disk right away. Submitted scrobbles get marked by
+    appending {"done": n}, covering everything up to id n. The file gets
+    rewritten on load, once everything is submitted and after
+    COMPACT_AFTER submissions.
+
+    Not thread safe.
+    """
+
+    COMPACT_AFTER = 100
+
+    def __init__(self, path):
+        self.path = path
+        self._first_id = 0
+        self._next_id = 0
+        self._done_records = 0
+
+    def load(self):
+        """Returns a list of all scrobbles not marked as submitted"""
+
+        entries = {}
+        done = -1
+        try:
+            with open(self.path, "rb") as h:
+                for line in h:
+                    try:
+                        record = json.loads(line.decode("utf-8"))
+                        if "done" in record:
+                            done = max(done, int(record["done"]))
+                        else:
+                            entries[int(record["id"])] = record["song"]
+                    except (ValueError, KeyError, TypeError):
+                        # partially written line after a crash
+                        continue
+        except EnvironmentError:
+            pass
+
+        pending = [entries[i] for i in sorted(entries) if i > done]
+        self._rewrite(pending)
+        return pending
+
+    def append(self, songs):
+        """Append scrobbles and sync them to disk"""
+
+        self._write(self._new_records(songs))
+
+    def _new_records(self, songs):
+        records = []
+        for song in songs:
+            records.append({"id": self._next_id, "song": song})
+            self._next_id += 1
+        return records
+
+    def ack(self, count, pending):
+        """Mark the first `count` scrobbles as submitted. `pending` has to
+        be the list of remaining scrobbles.
+        """
+
+        self._first_id += count
+        if not pending or self._done_records >= self.COMPACT_AFTER:
+            self._rewrite(pending)
+        else:
+            self._write([{"done": self._first_id - 1}])
+            self._done_records += 1
+
+    @staticmethod
+    def _encode(records):
+        return b"".join(
+            json.dumps(r).encode("utf-8") + b"\n" for r in records)
+
+    def _write(self, records):
+        data = self._encode(records)
+        try:
+            with open(self.path, "ab") as h:
+                h.write(data)
+                h.flush()
+                os.fsync(h.fileno())
+        except EnvironmentError as e:
+            print_w("Couldn't write scrobbler journal: %s" % e)
+
+    def _rewrite(self, pending):
+        """Replace the journal with one containing only `pending`"""
+
+        self._first_id = 0
+        self._next_id = 0
+        self._done_records = 0
+        # written in one step, so a crash leaves either the old or the
+        # new journal and no scrobbles get lost
+        data = self._encode(self._new_records(pending))
+        try:
+            with atomic_save(self.path, "wb") as h:
+                h.write(data)
+        except EnvironmentError as e:
+            print_w("Couldn't write scrobbler journal: %s" % e)
+
+
 class QLSubmitQueue(object):
     """Manages the submit queue for scrobbles. Works independently of the
     QLScrobbler plugin being enabled; other plugins may use submit() to queue
@@ -89,12 +190,23 @@ class QLSubmitQueue(object):
     CLIENT = "qlb"
     CLIENT_VERSION = const.VERSION
     PROTOCOL_VERSION = "1.2"
+    # only used for importing the queue of older versions
     DUMP = os.path.join(quodlibet.get_user_dir(), "scrobbler_cache_v2")
+    JOURNAL = os.path.join(quodlibet.get_user_dir(), "scrobbler_journal")
+
+    MAX_BATCH = 50
+    """The maximum number of scrobbles per submission the protocol allows"""
+
+    MAX_SUBMIT_DELAY = 120
+    """Maximum time in seconds to wait after failed submissions"""
 
     # These objects are shared across instances, to allow other plugins to
     # queue scrobbles in future versions of QL
     queue = []
+    journal = None
     changed_event = threading.Event()
+    drained_event = threading.Event()
+    _queue_lock = threading.Lock()
 
     def set_nowplaying(self, song):
         """Send a Now Playing notification."""
@@ -118,7 +230,10 @@ class QLSubmitQueue(object):
         else:
             # TODO: Forging timestamps for submission from PMPs
             return
-        self.queue.append(formatted)
+        with self._queue_lock:
+            self.journal.append([formatted])
+            self.queue.append(formatted)
+            self.drained_event.clear()
         self.changed()
 
     def _format_song(self, song):
@@ -150,22 +265,49 @@ class QLSubmitQueue(object):
         self.titlepat = Pattern(config_get_title_pattern())
         self.artpat = Pattern(config_get_artist_pattern())
 
-        try:
-            with open(self.DUMP, 'rb') as disk_queue_file:
-                disk_queue = pickle_load(disk_queue_file)
-            os.unlink(self.DUMP)
-            self.queue += disk_queue
-        except (EnvironmentError, PickleError):
-            pass
+        self.submit_delay = 0
+        self._stopped = False
+        self._wake_event = threading.Event()
+
+        self._load_queue()
 
     @classmethod
-    def dump_queue(klass):
-        if klass.queue:
+    def _load_queue(klass):
+        """Loads the shared queue from the journal, once"""
+
+        with klass._queue_lock:
+            if klass.journal is not None:
+                return
+            klass.journal = ScrobbleJournal(klass.JOURNAL)
+            klass.queue[:] = klass.journal.load()
+
             try:
-                with open(klass.DUMP, 'wb') as disk_queue_file:
-                    pickle_dump(klass.queue, disk_queue_file)
+                with open(klass.DUMP, 'rb') as disk_queue_file:
+                    disk_queue = pickle_load(disk_queue_file)
             except (EnvironmentError, PickleError):
                 pass
+            else:
+                klass.journal.append(disk_queue)
+                klass.queue += disk_queue
+                try:
+                    os.unlink(klass.DUMP)
+                except EnvironmentError:
+                    pass
+
+            print_d("%d scrobble(s) queued" % len(klass.queue))
+            if not klass.queue:
+                klass.drained_event.set()
+
+    @classmethod
+    def dump_queue(klass):
+        """Marks the journal as up to date with the queue, which compacts
+        it if the queue is empty or enough scrobbles were submitted.
+        Everything queued is already stored.
+        """
+
+        with klass._queue_lock:
+            if klass.journal is not None:
+                klass.journal.ack(0, klass.queue)
 
     def _check_config(self):
         user = plugin_config.get('username')
@@ -206,8 +348,10 @@ class QLSubmitQueue(object):
 
         self.failures = 0
 
-        while True:
+        while not self._stopped:
             self.changed_event.wait()
+            if self._stopped:
+                break
             if not self.handshake_sent:
                 self.handshake_event.wait()
                 if self.send_handshake():
@@ -221,13 +365,17 @@ class QLSubmitQueue(object):
                                      self.handshake_event.set)
                     continue
             self.changed_event.wait()
+            if self._stopped:
+                break
             if self.queue:
                 if self.send_submission():
                     self.failures = 0
+                    self.submit_delay = 0
                 else:
                     self.failures += 1
                     if self.failures >= 3:
                         self.handshake_sent = False
+                    self._backoff()
             elif self.nowplaying_song and not self.nowplaying_sent:
                 self.send_nowplaying()
                 self.nowplaying_sent = True
@@ -235,6 +383,39 @@ class QLSubmitQueue(object):
                 # Nothing left to do; wait until something changes
                 self.changed_event.clear()
 
+    def _backoff(self):
+        """Wait after a failed submission, twice as long as the last time
+        unless the last one succeeded.
+        """
+
+        self.submit_delay = min(
+            max(self.submit_delay * 2, 1), self.MAX_SUBMIT_DELAY)
+        print_d("Submission failed, waiting %d seconds" % self.submit_delay)
+        self._wake_event.wait(self.submit_delay)
+        self._wake_event.clear()
+
+    def stop(self):
+        """Makes run() return"""
+
+        self._stopped = True
+        self._wake_event.set()
+        self.changed_event.set()
+
+    def drain(self, timeout=None):
+        """Submit all queued scrobbles without waiting between retries.
+        Needs run() active in another thread.
+
+        Returns True if the queue got empty within `timeout` seconds.
+        """
+
+        self.submit_delay = 0
+        self._wake_event.set()
+        self.changed()
+        if self.queue and not self.changed_event.is_set():
+            # offline or not configured
+            return False
+        return self.drained_event.wait(timeout)
+
     def send_handshake(self, show_dialog=False):
         # construct url
         stamp = int(time.time())
@@ -311,7 +492,7 @@ class QLSubmitQueue(object):
 
     def send_submission(self):
         data = {'s': self.session_id}
-        to_submit = self.queue[:min(len(self.queue), 50)]
+        to_submit = self.queue[:self.MAX_BATCH]
         for idx, song in enumerate(to_submit):
             for key, val in song.items():
                 data['%s[%d]' % (key, idx)] = val.encode('utf-8')
@@ -322,7 +503,11 @@ class QLSubmitQueue(object):
             ('\n\t'.join(['%s - %s' % (s['a'], s['t']) for s in to_submit])))
 
         if self._check_submit(self.submit_url, data):
-            del self.queue[:len(to_submit)]
+            with self._queue_lock:
+                del self.queue[:len(to_submit)]
+                self.journal.ack(len(to_submit), self.queue)
+                if not self.queue:
+                    self.drained_event.set()
             return True
         else:
             return False
@@ -7,15 +7,113 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-import math
 import random
+from collections import Counter
 
 from quodlibet import _
 from quodlibet.order.reorder import Reorder
 from quodlibet.plugins.playorder import ShufflePlugin
 from quodlibet.order import OrderRemembered
 from quodlibet.qltk import Icons
-from quodlibet.compat import iteritems
+
+
+def _fenwick(values):
+    """Returns a Fenwick tree (1-based) for `values`, built in O(n)"""
+
+    tree = [0] + list(values)
+    size = len(tree)
+    for i in range(1, size):
+        parent = i + (i & -i)
+        if parent < size:
+            tree[parent] += tree[i]
+    return tree
+
+
+def _fenwick_add(tree, index, delta):
+    index += 1
+    while index < len(tree):
+        tree[index] += delta
+        index += index & -index
+
+
+class PlaycountSampler(object):
+    """Picks random indices of not yet removed play counts, each with a
+    probability proportional to how much less it was played than the most
+    played remaining one. If all are equal, all are equally likely.
+
+    Picking and removing take O(log n).
+    """
+
+    def __init__(self, playcounts):
+        self._playcounts = list(playcounts)
+        self._present = [True] * len(self._playcounts)
+        self._remaining = len(self._playcounts)
+        # number of remaining entries and the sum of their play counts,
+        # the weight of a range is max_count * count - sum
+        self._counts = _fenwick([1] * len(self._playcounts))
+        self._sums = _fenwick(self._playcounts)
+        self._total = sum(self._playcounts)
+        self._histogram = Counter(self._playcounts)
+        self._max = max(self._playcounts) if self._playcounts else 0
+
+    def __len__(self):
+        """Number of remaining entries"""
+
+        return self._remaining
+
+    def remove(self, index):
+        if not self._present[index]:
+            return
+        self._present[index] = False
+        self._remaining -= 1
+        count = self._playcounts[index]
+        _fenwick_add(self._counts, index, -1)
+        _fenwick_add(self._sums, index, -count)
+        self._total -= count
+
+        self._histogram[count] -= 1
+        if not self._histogram[count]:
+            del self._histogram[count]
+            if count == self._max:
+                self._max = max(self._histogram) if self._histogram else 0
+
+    def _find(self, target, uniform):
+        """Returns the first index where the summed up weights exceed
+        `target`.
+        """
+
+        counts, sums, max_ = self._counts, self._sums, self._max
+        size = len(counts) - 1
+        pos = 0
+        step = 1 << size.bit_length()
+        while step:
+            next_ = pos + step
+            if next_ <= size:
+                weight = counts[next_]
+                if not uniform:
+                    weight = max_ * weight - sums[next_]
+                if weight <= target:
+                    pos = next_
+                    target -= weight
+            step >>= 1
+        return pos
+
+    def choose(self):
+        """Returns a random remaining index or None"""
+
+        if not self._remaining:
+            return None
+
+        total = self._max * self._remaining - self._total
+        if total > 0:
+            index = self._find(random.random() * total, False)
+        else:
+            index = self._find(random.randrange(self._remaining), True)
+
+        if index >= len(self._present) or not self._present[index]:
+            # float rounding at the upper end, shouldn't happen
+            index = self._find(random.randrange(self._remaining), True)
+        return index
 
 
 class PlaycountEqualizer(ShufflePlugin, OrderRemembered):
@@ -27,26 +125,47 @@ class PlaycountEqualizer(ShufflePlugin, OrderRemembered):
 
     priority = Reorder.priority
 
+    def __init__(self):
+        super(PlaycountEqualizer, self).__init__()
+        self._sampler = None
+        self._sampler_size = 0
+        self._sampler_played = 0
+
+    def _get_sampler(self, playlist):
+        """Returns a PlaycountSampler for `playlist` with all songs played
+        so far removed.
+        """
+
+        sampler = self._sampler
+        if sampler is None or self._sampler_size != len(playlist):
+            sampler = self._sampler = PlaycountSampler(
+                [song('~#playcount') for song in playlist.get()])
+            self._sampler_size = len(playlist)
+            self._sampler_played = 0
+
+        for i in self._played[self._sampler_played:]:
+            sampler.remove(i)
+        self._sampler_played = len(self._played)
+        return sampler
+
     # Select the next track.
     def next(self, playlist, current):
         super(PlaycountEqualizer, self).next(playlist, current)
 
-        remaining = self.remaining(playlist)
+        sampler = self._get_sampler(playlist)
 
         # Don't try to search through an empty / played playlist.
-        if len(remaining) <= 0:
+        if not sampler:
             return None
 
-        # Set-up the search information.
-        max_count = max([song('~#playcount') for song in remaining.values()])
-        weights = {i: max_count - song('~#playcount')
-                   for i, song in iteritems(remaining)}
-        choice = int(max(1, math.ceil(sum(weights) * random.random())))
-
-        # Search for a track.
-        for i, weight in iteritems(weights):
-            choice -= weight
-            if choice <= 0:
-                return playlist.get_iter([i])
-        else:  # This should only happen if all songs have equal play counts.
-            return playlist.get_iter([random.choice(list(remaining.keys()))])
+        return playlist.get_iter([sampler.choose()])
+
+    def previous(self, playlist, current):
+        # the song we go back to isn't played anymore, start over
+        self._sampler = None
+        return super(PlaycountEqualizer, self).previous(playlist, current)
+
+    def reset(self, playlist):
+        # also called when the songs or their order changed
+        super(PlaycountEqualizer, self).reset(playlist)
+        self._sampler = None
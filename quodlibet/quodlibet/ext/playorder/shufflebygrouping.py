@@ -27,6 +27,77 @@ pconfig.defaults.set("grouping_filter", "grouping")
 pconfig.defaults.set("delay", 0)
 
 
+def _tag_defined(tag_name, song):
+    if not tag_name:
+        return True
+    tag_value = song(tag_name)
+    return bool(tag_value.strip())
+
+
+class GroupIndex(object):
+    """Splits a list of songs into groups of consecutive songs sharing the
+    same `grouping` value and keeps track of the groups not played yet.
+
+    Songs without a `grouping_filter` value form a group of their own.
+    """
+
+    def __init__(self, songs, grouping, grouping_filter):
+        self.starts = []
+        """Index of the first song for each group"""
+        self.group_of = []
+        """Group number for each song"""
+
+        previous = None
+        for i, song in enumerate(songs):
+            key = song(grouping) if _tag_defined(grouping_filter, song) \
+                else None
+            if key is None or key != previous:
+                self.starts.append(i)
+            self.group_of.append(len(self.starts) - 1)
+            previous = key
+
+        # unplayed group numbers, and the position of each group in
+        # there (or -1), so groups can be removed in O(1)
+        self._unplayed = list(range(len(self.starts)))
+        self._positions = list(range(len(self.starts)))
+
+    def __len__(self):
+        return len(self.group_of)
+
+    def same_group(self, a, b):
+        """If the songs at index `a` and `b` belong to the same group"""
+
+        return self.group_of[a] == self.group_of[b]
+
+    def mark_played(self, index):
+        """Marks the group containing the song at `index` as played"""
+
+        group = self.group_of[index]
+        pos = self._positions[group]
+        if pos < 0:
+            return
+        last = self._unplayed.pop()
+        if last != group:
+            self._unplayed[pos] = last
+            self._positions[last] = pos
+        self._positions[group] = -1
+
+    @property
+    def unplayed(self):
+        """Number of groups not played yet"""
+
+        return len(self._unplayed)
+
+    def choose(self):
+        """Returns the index of the first song of a random unplayed group
+        or None.
+        """
+
+        if not self._unplayed:
+            return None
+        return self.starts[random.choice(self._unplayed)]
+
+
 class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
     PLUGIN_ID = "Shuffle by Grouping"
     PLUGIN_NAME = _("Shuffle by Grouping")
@@ -39,51 +110,60 @@ class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
     display_name = _("Shuffle by grouping")
     priority = Reorder.priority
 
+    _settings_version = 0
+    """Gets increased when the grouping settings change"""
+
+    def __init__(self):
+        super(ShuffleByGrouping, self).__init__()
+        self._index = None
+        self._index_played = 0
+
+    def _get_index(self, playlist):
+        """Returns the GroupIndex for `playlist` with all songs played
+        so far marked as played.
+        """
+
+        index = self._index
+        if index is None or len(index) != len(playlist) or \
+                index.version != self._settings_version:
+            grouping = str(pconfig.gettext("grouping")).strip()
+            grouping_filter = str(pconfig.gettext("grouping_filter")).strip()
+            index = self._index = GroupIndex(
+                playlist.get(), grouping, grouping_filter)
+            index.version = self._settings_version
+            self._index_played = 0
+
+        for i in self._played[self._index_played:]:
+            index.mark_played(i)
+        self._index_played = len(self._played)
+        return index
+
     def next(self, playlist, current_song):
         return self._next(playlist, current_song)
 
     def _next(self, playlist, current_song, delay_on=True):
-        grouping = str(pconfig.gettext("grouping")).strip()
-        grouping_filter = str(pconfig.gettext("grouping_filter")).strip()
-        delay = pconfig.getint("delay")
-
-        def same_group(song_iter_a, song_iter_b):
-            if song_iter_a is None or song_iter_b is None:
-                return False
-            song_a = playlist.get_value(song_iter_a)
-            song_b = playlist.get_value(song_iter_b)
-            if not self._tag_defined(grouping_filter, song_a):
-                return False
-            if not self._tag_defined(grouping_filter, song_b):
-                return False
-            return song_a(grouping) == song_b(grouping)
-
         # Keep track of played songs
         OrderRemembered.next(self, playlist, current_song)
-        remaining = OrderRemembered.remaining(self, playlist)
-
-        # Check if playlist is finished or empty
-        if not remaining:
-            OrderRemembered.reset(self, playlist)
-            return None
+        index = self._get_index(playlist)
 
         # Play next song in current grouping
         next_song = OrderInOrder.next(self, playlist, current_song)
-        if same_group(next_song, current_song):
-            return next_song
+        if next_song is not None and current_song is not None:
+            current_pos = playlist.get_path(current_song).get_indices()[0]
+            if index.same_group(current_pos, current_pos + 1):
+                return next_song
+
+        # Check if playlist is finished or empty
+        if not index.unplayed:
+            self.reset(playlist)
+            return None
 
         # Pause for a moment before picking new group
         if delay_on:
-            self._resume_after_delay(delay)
+            self._resume_after_delay(pconfig.getint("delay"))
 
         # Pick random song at the start of a new group
-        while True:
-            song_location = random.choice(list(remaining.keys()))
-            new_song = playlist.get_iter(song_location)
-            new_song_prev = (playlist.get_iter(song_location - 1)
-                             if song_location >= 1 else None)
-            if not same_group(new_song, new_song_prev):
-                return new_song
+        return playlist.get_iter((index.choose(),))
 
     @staticmethod
     def _resume_after_delay(delay, refresh_rate=20):
@@ -103,24 +183,25 @@ class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
             yield False
         GLib.timeout_add(1000 / refresh_rate, next, countdown())
 
-    @staticmethod
-    def _tag_defined(tag_name, song):
-        if not tag_name:
-            return True
-        tag_value = song(tag_name)
-        return bool(tag_value.strip())
-
     def next_explicit(self, playlist, current_song):
         return self._next(playlist, current_song, delay_on=False)
 
     def previous(self, playlist, current_song):
+        # the song we go back to isn't played anymore, start over
+        self._index = None
         return OrderRemembered.previous(self, playlist, current_song)
 
+    def reset(self, playlist):
+        # also called when the songs or their order changed
+        super(ShuffleByGrouping, self).reset(playlist)
+        self._index = None
+
     @classmethod
     def PluginPreferences(cls, window):
         def on_change(widget, config_entry):
             config_value = widget.get_text()
             pconfig.set(config_entry, config_value)
+            cls._settings_version += 1
 
         def on_spin(widget, config_entry):
             config_value = widget.get_value()
@@ -130,6 +211,7 @@ class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
             pconfig.reset("grouping")
             pconfig.reset("grouping_filter")
             pconfig.reset("delay")
+            cls._settings_version += 1
             grouping_entry.set_text(pconfig.gettext("grouping"))
             grouping_filter_entry.set_text(pconfig.gettext("grouping_filter"))
             delay_spin.set_value(pconfig.getint("delay"))
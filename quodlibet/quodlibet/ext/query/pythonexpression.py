@@ -33,32 +33,47 @@ class PythonQuery(QueryPlugin):
         self._reported = set()
         self._raw_body = None
 
+    def _report(self, e, data):
+        key = str(e)
+        if key not in self._reported:
+            self._reported.add(key)
+            print_w("%s(%s) in expression '%s'. "
+                    "Example failing data: %s"
+                    % (type(e).__name__, key, self._raw_body, data))
+
     def search(self, data, body):
         try:
-            self._globals['s'] = data
             # Albums can be queried too...
-            self._globals['a'] = data
-            # eval modifies the globals in place, it seems
-            ret = eval(body, dict(self._globals))
-            return ret
+            return body(data, data)
         except Exception as e:
-            key = str(e)
-            if key not in self._reported:
-                self._reported.add(key)
-                print_w("%s(%s) in expression '%s'. "
-                        "Example failing data: %s"
-                        % (type(e).__name__, key, self._raw_body,
-                           self._globals))
+            self._report(e, data)
             return False
 
+    def filter(self, songs, body):
+        result = []
+        append = result.append
+        for song in songs:
+            try:
+                if body(song, song):
+                    append(song)
+            except Exception as e:
+                self._report(e, song)
+        return result
+
     def parse_body(self, body):
         if body is None:
             raise QueryPluginError
-        self._raw_body = body.strip()
+        body = body.strip()
+        self._raw_body = body
         self._reported.clear()
         try:
-            self._globals.update(_ts=time.time())
-            return compile(body.strip(), 'query', 'eval')
+            # make sure it's a single expression before wrapping it
+            compile(body, 'query', 'eval')
+            # Compile once into a function, so each song only costs a call.
+            # The newlines keep trailing comments from swallowing the paren.
+            code = compile(u"lambda s, a: (\n%s\n)" % body, 'query', 'eval')
         except SyntaxError as e:
             print_w("Couldn't compile query (%s)" % e)
             raise QueryPluginError
+        globals_ = dict(self._globals, _ts=time.time())
+        return eval(code, globals_)
@@ -6,13 +6,12 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-import os.path
-
 from quodlibet import _
+from quodlibet import app
 from quodlibet.plugins.query import QueryPlugin, QueryPluginError
 from quodlibet.query import Query
-from quodlibet.query._match import error as QueryError
-from quodlibet import get_user_dir
+from quodlibet.util.savedsearches import get_saved_searches, \
+    get_saved_searches_path, parse_saved_searches
 
 
 class IncludeSavedSearchQuery(QueryPlugin):
@@ -29,25 +28,21 @@ class IncludeSavedSearchQuery(QueryPlugin):
         if body is None:
             raise QueryPluginError
         body = body.strip().lower()
+
+        # The results for the library are kept up to date, so matching
+        # a library song is a set lookup
+        if query_path_ is None and app.library is not None:
+            playlist = get_saved_searches(app.library).get(body)
+            if playlist is not None:
+                return playlist
+
         # Use provided query file for testing
-        if query_path_:
-            query_path = query_path_
-        else:
-            query_path = os.path.join(get_user_dir(), 'lists', 'queries.saved')
-        try:
-            with open(query_path, 'r', encoding="utf-8") as query_file:
-                for query_string in query_file:
-                    name = next(query_file).strip().lower()
-                    if name == body:
-                        try:
-                            return Query(query_string.strip())
-                        except QueryError:
-                            raise QueryPluginError
-            # We've searched the whole file and haven't found a match
-            raise QueryPluginError
-        except IOError:
-            raise QueryPluginError
-        except StopIteration:
-            # The file has an odd number of lines. This shouldn't happen unless
-            # it has been externally modified
-            raise QueryPluginError
+        query_path = query_path_ or get_saved_searches_path()
+        for name, query_string in parse_saved_searches(query_path):
+            if name.lower() == body:
+                query = Query(query_string)
+                if not query.is_parsable:
+                    raise QueryPluginError
+                return query
+        # We've searched the whole file and haven't found a match
+        raise QueryPluginError
@@ -13,6 +13,7 @@
 
 import os
 import re
+import sys
 import shutil
 import time
 from collections import OrderedDict
@@ -72,6 +73,56 @@ PEOPLE_SORT = [TAG_TO_SORT.get(k, k) for k in PEOPLE]
 VARIOUS_ARTISTS_VALUES = 'V.A.', 'various artists', 'Various Artists'
 """Values for ~people representing lots of people, most important last"""
 
+SHARED_VALUE_TAGS = {
+    "artist", "albumartist", "album", "genre", "date", "composer",
+    "performer", "conductor", "label", "organization", "language",
+    "tracknumber", "discnumber", "artistsort", "albumartistsort",
+    "albumsort", "musicbrainz_albumid", "musicbrainz_artistid",
+    "musicbrainz_albumartistid", "encodedby", "~encoding", "~mountpoint",
+    "~#bitrate", "~#length", "~#rating", "~#playcount", "~#skipcount",
+    "~#channels", "~#samplerate", "~#bitdepth"}
+"""Tags with values likely to be the same for many songs. Equal values
+of these get stored as one object for all songs to save memory"""
+
+MAX_SHARED_NUMBERS = 10000
+"""Up to how many distinct numbers get shared. Entries are never removed,
+so this keeps values which rarely repeat (like float lengths) from
+growing the table with the library"""
+
+_shared_numbers = {}
+
+_LYRIC_ROOTPATHS = config.cached(
+    "memory", "lyric_rootpaths", "getstringlist", [])
+_LYRIC_FILENAMES = config.cached(
+    "memory", "lyric_filenames", "getstringlist", [])
+
+
+def share_tag(key, value):
+    """Returns the key/value pair to store, using objects shared with
+    other songs where possible.
+
+    Keys and values of tags in SHARED_VALUE_TAGS get interned, numeric
+    values are looked up in a table of already seen values, which holds
+    at most MAX_SHARED_NUMBERS entries.
+    """
+
+    if not PY3:
+        return key, value
+
+    if type(key) is str:
+        key = sys.intern(key)
+    if key in SHARED_VALUE_TAGS:
+        if type(value) is str:
+            value = sys.intern(value)
+        elif value == value:  # no NaN
+            number_key = (type(value), value)
+            shared = _shared_numbers.get(number_key)
+            if shared is not None:
+                value = shared
+            elif len(_shared_numbers) < MAX_SHARED_NUMBERS:
+                _shared_numbers[number_key] = value
+    return key, value
+
 
 def decode_value(tag, value):
     """Returns a unicode representation of the passed value, based on
@@ -211,6 +262,7 @@ class AudioFile(dict, ImageContainer):
         else:
             value = text_type(value)
 
+        key, value = share_tag(key, value)
         dict.__setitem__(self, key, value)
 
         pop = self.__dict__.pop
@@ -580,15 +632,13 @@ class AudioFile(dict, ImageContainer):
 
         # setup defaults (user-defined take precedence)
         # root search paths
-        lyric_paths = \
-            config.getstringlist("memory", "lyric_rootpaths", [])
+        lyric_paths = list(_LYRIC_ROOTPATHS.value)
         # ensure default paths
         lyric_paths.append(os.path.join(get_home_dir(), ".lyrics"))
         lyric_paths.append(
             os.path.join(os.path.dirname(self.comma('~filename'))))
         # search pathfile names
-        lyric_filenames = \
-            config.getstringlist("memory", "lyric_filenames", [])
+        lyric_filenames = list(_LYRIC_FILENAMES.value)
         # ensure some default pathfile names
         lyric_filenames.append(
             sanitise(os.sep, [(self.comma("lyricist") or
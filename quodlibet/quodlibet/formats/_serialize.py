@@ -57,6 +57,7 @@ def _py2_to_py3(items):
                 except UnicodeEncodeError:
                     v = v.encode("utf-8", "replace").decode("utf-8")
 
+            # __setitem__ takes care of sharing the key and value
             i[k] = v
 
     return items
@@ -20,6 +20,7 @@ from quodlibet import print_d
 
 from quodlibet.library.libraries import SongFileLibrary, SongLibrary
 from quodlibet.library.librarians import SongLibrarian
+from quodlibet.pattern import format_cache
 from quodlibet.util.path import mtime
 
 
@@ -30,7 +31,16 @@ def init(cache_fn=None):
     all future SongLibraries.
     """
 
-    SongFileLibrary.librarian = SongLibrary.librarian = SongLibrarian()
+    librarian = SongLibrarian()
+    SongFileLibrary.librarian = SongLibrary.librarian = librarian
+
+    # connect first, so other handlers see the new pattern results
+    def invalidate(librarian, songs):
+        format_cache.invalidate(songs)
+
+    librarian.connect("changed", invalidate)
+    librarian.connect("removed", invalidate)
+
     library = SongFileLibrary("main")
     if cache_fn:
         library.load(cache_fn)
@@ -17,6 +17,7 @@ import itertools
 from gi.repository import GObject
 
 from quodlibet.util.dprint import print_d
+from quodlibet.util import instrument
 from quodlibet.compat import itervalues
 
 
@@ -47,6 +48,13 @@ class Librarian(GObject.GObject):
     def destroy(self):
         pass
 
+    def emit(self, signal, *args):
+        if not instrument.is_enabled():
+            return super(Librarian, self).emit(signal, *args)
+        name = "%s.%s" % (type(self).__name__, signal)
+        with instrument.measure("signal", name):
+            return super(Librarian, self).emit(signal, *args)
+
     def register(self, library, name):
         """Register a library with this librarian."""
         if name in self.libraries or name in self.__signals:
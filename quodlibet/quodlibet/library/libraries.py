@@ -19,7 +19,7 @@ import shutil
 import time
 
 from gi.repository import GObject
-from senf import fsn2text, fsnative
+from senf import fsn2text, fsnative, text2fsn
 
 from quodlibet import _
 from quodlibet.formats import MusicFile, AudioFileError, load_audio_files, \
@@ -32,10 +32,11 @@ from quodlibet.util.collections import DictMixin
 from quodlibet import util
 from quodlibet import formats
 from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util import instrument
 from quodlibet.util.path import unexpand, mkdir, normalize_path, ishidden, \
-    ismount
+    ismount, find_mount_point, escape_filename, unescape_filename
 from quodlibet.compat import iteritems, iterkeys, itervalues, listkeys, \
-    listvalues, listfilter
+    listvalues, listfilter, listitems
 
 
 class Library(GObject.GObject, DictMixin):
@@ -75,6 +76,13 @@ class Library(GObject.GObject, DictMixin):
         if self.librarian is not None and self._name is not None:
             self.librarian._unregister(self, self._name)
 
+    def emit(self, signal, *args):
+        if not instrument.is_enabled():
+            return super(Library, self).emit(signal, *args)
+        name = "%s.%s" % (type(self).__name__, signal)
+        with instrument.measure("signal", name):
+            return super(Library, self).emit(signal, *args)
+
     def changed(self, items):
         """Alert other users that these items have changed.
 
@@ -236,6 +244,41 @@ def _load_items(filename):
     return items
 
 
+def _save_items(filename, items):
+    """Save items to disk.
+
+    Returns True if successful.
+    """
+
+    try:
+        dirname = os.path.dirname(filename)
+        mkdir(dirname)
+        with atomic_save(filename, "wb") as fileobj:
+            fileobj.write(dump_audio_files(items))
+    except SerializationError:
+        # Can happen when we try to pickle while the library is being
+        # modified, like in the periodic 15min save.
+        # Ignore, as it should try again later or on program exit.
+        util.print_exc()
+    except EnvironmentError:
+        print_w("Couldn't save library to path: %r" % filename)
+    else:
+        return True
+    return False
+
+
+def _is_mounted(point):
+    if ismount(point):
+        return True
+    # In case the mount point is mounted through autofs we need to
+    # access it for it to mount
+    try:
+        os.listdir(point)
+    except EnvironmentError:
+        return False
+    return ismount(point)
+
+
 class PicklingMixin(object):
     """A mixin to provide persistence of a library by pickling to disk"""
 
@@ -266,19 +309,7 @@ class PicklingMixin(object):
 
         print_d("Saving contents to %r." % filename, self)
 
-        try:
-            dirname = os.path.dirname(filename)
-            mkdir(dirname)
-            with atomic_save(filename, "wb") as fileobj:
-                fileobj.write(dump_audio_files(self.get_content()))
-        except SerializationError:
-            # Can happen when we try to pickle while the library is being
-            # modified, like in the periodic 15min save.
-            # Ignore, as it should try again later or on program exit.
-            util.print_exc()
-        except EnvironmentError:
-            print_w("Couldn't save library to path: %r" % filename)
-        else:
+        if _save_items(filename, self.get_content()):
             self.dirty = False
 
 
@@ -522,11 +553,152 @@ class FileLibrary(PicklingLibrary):
 
     These must support the valid, exists, mounted, and reload methods,
     and have a mountpoint attribute.
+
+    Items are stored in one file per mount point: the ones on the mount
+    point of the library file in the library file itself, all others in
+    "<library file>.shards/<escaped mount point>". Shards of mount points
+    which aren't mounted only get loaded once needed.
     """
 
     def __init__(self, name=None):
         super(FileLibrary, self).__init__(name)
         self._masked = {}
+        # mount point -> path of the not yet loaded shard file
+        self._shards = {}
+
+    @staticmethod
+    def _get_shard_dir(filename):
+        return filename + fsnative(u".shards")
+
+    @staticmethod
+    def _get_shard_point(name):
+        point = unescape_filename(name)
+        if not isinstance(point, fsnative):
+            point = text2fsn(point)
+        return point
+
+    @classmethod
+    def get_files(cls, filename):
+        """Returns a list of (mount point, path) tuples for the library file
+        `filename` and all its shards. The mount point of the library file
+        itself is None.
+        """
+
+        files = [(None, filename)]
+        shard_dir = cls._get_shard_dir(filename)
+        try:
+            names = os.listdir(shard_dir)
+        except EnvironmentError:
+            names = []
+        for name in sorted(names):
+            files.append(
+                (cls._get_shard_point(name), os.path.join(shard_dir, name)))
+        return files
+
+    def load(self, filename):
+        """Load the library file and the shards of all mounted mount points.
+
+        Loading does not cause added, changed, or removed signals.
+        """
+
+        self.filename = filename
+        print_d("Loading contents of %r." % filename, self)
+
+        paths = []
+        for point, path in self.get_files(filename):
+            if point is None or _is_mounted(point):
+                paths.append(path)
+            else:
+                print_d("Not loading shard for %r." % point, self)
+                self._shards[point] = path
+
+        # this loads all items without checking their validity, but makes
+        # sure that non-mounted items are masked
+        for path in paths:
+            self._load_init(_load_items(path))
+
+        print_d("Done loading contents of %r." % filename, self)
+
+    def _load_shard(self, point):
+        """Load the shard of a mount point into the masked items, if it
+        hasn't been loaded yet.
+        """
+
+        path = self._shards.pop(point, None)
+        if path is None:
+            return
+        print_d("Loading shard for %r." % point, self)
+        masked = self._masked.setdefault(point, {})
+        for item in _load_items(path):
+            if item.key not in self._contents:
+                masked[item.key] = item
+        if not masked:
+            del self._masked[point]
+
+    def save(self, filename=None):
+        """Save the library to the given filename and the shards next to
+        it, or the default if `None`
+        """
+
+        if filename is None:
+            filename = self.filename
+
+        print_d("Saving contents to %r." % filename, self)
+
+        # items may have been added to mount points whose shards haven't
+        # been loaded, load them so the old items get saved as well
+        points = {item.mountpoint for item in itervalues(self._contents)}
+        for point in points & set(self._shards):
+            self._load_shard(point)
+
+        base_point = find_mount_point(os.path.abspath(filename))
+        base_items = []
+        shards = {}
+        for item in self.get_content():
+            point = item.mountpoint
+            if point == base_point:
+                base_items.append(item)
+            else:
+                shards.setdefault(point, []).append(item)
+
+        shard_dir = self._get_shard_dir(filename)
+        ok = True
+        for point, items in listitems(shards):
+            try:
+                name = escape_filename(point)
+            except UnicodeError:
+                # not representable, keep it in the main file
+                base_items.extend(shards.pop(point))
+                continue
+            ok = _save_items(os.path.join(shard_dir, name), items) and ok
+        ok = _save_items(filename, base_items) and ok
+
+        # shards of mount points we haven't loaded stay as they are
+        for point, path in iteritems(self._shards):
+            new_path = os.path.join(shard_dir, escape_filename(point))
+            if path != new_path:
+                try:
+                    mkdir(shard_dir)
+                    shutil.copy(path, new_path)
+                except EnvironmentError:
+                    print_w("Couldn't save library to path: %r" % new_path)
+                    ok = False
+
+        # remove shards of mount points without items
+        keep = set(shards) | set(self._shards)
+        try:
+            names = os.listdir(shard_dir)
+        except EnvironmentError:
+            names = []
+        for name in names:
+            if self._get_shard_point(name) not in keep:
+                try:
+                    os.unlink(os.path.join(shard_dir, name))
+                except EnvironmentError:
+                    pass
+
+        if ok:
+            self.dirty = False
 
     def _load_init(self, items):
         """Add many items to the library, check if the
@@ -651,6 +823,10 @@ class FileLibrary(PicklingLibrary):
 
         print_d("Rebuilding, force is %s." % force, self)
 
+        for point in listkeys(self._shards):
+            if _is_mounted(point):
+                self._load_shard(point)
+
         task = Task(_("Library"), _("Checking mount points"))
         if cofuncid:
             task.copool(cofuncid)
@@ -708,10 +884,13 @@ class FileLibrary(PicklingLibrary):
 
     def scan(self, paths, exclude=[], cofuncid=None):
 
-        def need_yield(last_yield=[0]):
+        # copool takes care of not blocking the main loop, so yield
+        # often, but don't update the progress for each file
+
+        def need_pulse(last_pulse=[0]):
             current = time.time()
-            if abs(current - last_yield[0]) > 0.015:
-                last_yield[0] = current
+            if abs(current - last_pulse[0]) > 0.015:
+                last_pulse[0] = current
                 return True
             return False
 
@@ -732,9 +911,9 @@ class FileLibrary(PicklingLibrary):
                     task.copool(cofuncid)
 
                 for real_path in iter_paths(scan_path, exclude=exclude):
-                    if need_yield():
+                    if need_pulse():
                         task.pulse()
-                        yield
+                    yield
                     # skip unknown file extensions
                     if not formats.filter(real_path):
                         continue
@@ -758,9 +937,7 @@ class FileLibrary(PicklingLibrary):
                     if len(added) > 100 or need_added():
                         self.add(added)
                         added = []
-                        yield
-                if added and need_yield():
-                    yield
+                yield
             if added:
                 self.add(added)
                 added = []
@@ -786,15 +963,20 @@ class FileLibrary(PicklingLibrary):
             point = item.mountpoint
         except AttributeError:
             # Checking a key.
+            for point in listkeys(self._shards):
+                if item.startswith(os.path.join(point, "")):
+                    self._load_shard(point)
             for point in itervalues(self._masked):
                 if item in point:
                     return True
         else:
             # Checking a full item.
+            self._load_shard(point)
             return item in itervalues(self._masked.get(point, {}))
 
     def unmask(self, point):
         print_d("Unmasking %r." % point, self)
+        self._load_shard(point)
         items = self._masked.pop(point, {})
         if items:
             self.add(items.values())
@@ -813,17 +995,22 @@ class FileLibrary(PicklingLibrary):
     def masked_mount_points(self):
         """List of mount points that contain masked items"""
 
-        return listkeys(self._masked)
+        points = listkeys(self._masked)
+        points.extend(p for p in self._shards if p not in self._masked)
+        return points
 
     def get_masked(self, mount_point):
         """List of items for a mount point"""
 
+        self._load_shard(mount_point)
         return listvalues(self._masked.get(mount_point, {}))
 
     def remove_masked(self, mount_point):
         """Remove all songs for a masked point"""
 
+        self._shards.pop(mount_point, None)
         self._masked.pop(mount_point, {})
+        self.dirty = True
 
 
 class SongFileLibrary(SongLibrary, FileLibrary):
@@ -15,7 +15,7 @@ from senf import environ, argv as sys_argv
 
 from quodlibet import _
 from quodlibet.cli import process_arguments, exit_
-from quodlibet.util.dprint import print_d, print_, print_exc
+from quodlibet.util.dprint import print_d, print_, print_exc, print_w
 
 
 def main(argv=None):
@@ -148,7 +148,7 @@ def main(argv=None):
     pm.register_handler(UserInterfacePluginHandler())
 
     from quodlibet.mmkeys import MMKeysHandler
-    from quodlibet.remote import Remote, RemoteError
+    from quodlibet.remote import Remote, RemoteError, SocketRemote
     from quodlibet.commands import registry as cmd_registry, CommandError
     from quodlibet.qltk.tracker import SongTracker, FSInterface
     try:
@@ -167,6 +167,16 @@ def main(argv=None):
     except RemoteError:
         exit_(1, True)
 
+    socket_remote = None
+    if SocketRemote is not None and \
+            config.getboolean("settings", "remote_socket"):
+        socket_remote = SocketRemote(app, cmd_registry)
+        try:
+            socket_remote.start()
+        except RemoteError as e:
+            print_w("Couldn't start the socket remote: %s" % e)
+            socket_remote = None
+
     DBusHandler(player, library)
     tracker = SongTracker(library.librarian, player, window.playlist)
 
@@ -202,9 +212,13 @@ def main(argv=None):
     quodlibet.finish_first_session("quodlibet")
     mmkeys_handler.quit()
     remote.stop()
+    if socket_remote is not None:
+        socket_remote.stop()
     fsiface.destroy()
 
     tracker.destroy()
+    from quodlibet.util.collection import FileBackedPlaylist
+    FileBackedPlaylist.flush_all()
     quodlibet.library.save()
 
     config.save()
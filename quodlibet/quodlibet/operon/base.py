@@ -29,6 +29,11 @@ class Command(object):
     USAGE = ""
     COMMANDS = []
 
+    BATCH = False
+    """If the command can be run by 'query' for many files in parallel.
+    It must not print to stdout or ask for input.
+    """
+
     @classmethod
     def register(cls, cmd_cls):
         cls.COMMANDS.append(cmd_cls)
@@ -15,6 +15,11 @@ import re
 import shutil
 import subprocess
 import tempfile
+import threading
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import quodlibet
 
 from senf import fsn2text
 
@@ -23,13 +28,14 @@ from quodlibet import util
 from quodlibet.formats import EmbeddedImage, AudioFileError
 from quodlibet.util.path import mtime
 from quodlibet.pattern import Pattern, error as PatternError
+from quodlibet.query import Query
 from quodlibet.util.tags import USER_TAGS, sortkey, MACHINE_TAGS
 from quodlibet.util.tagsfrompath import TagsFromPattern
 from quodlibet.compat import text_type, iteritems
 
 from .base import Command, CommandError
 from .util import print_terse_table, copy_mtime, list_tags, print_table, \
-    get_editor_args
+    get_editor_args, load_library, song_to_json
 
 
 @Command.register
@@ -116,6 +122,7 @@ class TagsCommand(Command):
 @Command.register
 class CopyCommand(Command):
     NAME = "copy"
+    BATCH = True
     DESCRIPTION = _("Copy tags from one file to another")
     USAGE = "[--dry-run] [--ignore-errors] <source> <dest>"
 
@@ -282,6 +289,7 @@ class EditCommand(Command):
 @Command.register
 class SetCommand(Command):
     NAME = "set"
+    BATCH = True
     DESCRIPTION = _("Set a tag and remove existing values")
     USAGE = "[--dry-run] <tag> <value> <file> [<files>]"
 
@@ -317,6 +325,7 @@ class SetCommand(Command):
 @Command.register
 class ClearCommand(Command):
     NAME = "clear"
+    BATCH = True
     DESCRIPTION = _("Remove tags")
     USAGE = "[--dry-run] [-a | -e <pattern> | <tag>] <file> [<files>]"
 
@@ -377,6 +386,7 @@ class ClearCommand(Command):
 @Command.register
 class RemoveCommand(Command):
     NAME = "remove"
+    BATCH = True
     DESCRIPTION = _("Remove a tag value")
     USAGE = "[--dry-run] <tag> [-e <pattern> | <value>] <file> [<files>]"
 
@@ -426,6 +436,7 @@ class RemoveCommand(Command):
 @Command.register
 class AddCommand(Command):
     NAME = "add"
+    BATCH = True
     DESCRIPTION = _("Add a tag value")
     USAGE = "<tag> <value> <file> [<files>]"
 
@@ -500,6 +511,7 @@ class InfoCommand(Command):
 @Command.register
 class ImageSetCommand(Command):
     NAME = "image-set"
+    BATCH = True
     DESCRIPTION = _("Set the provided image as primary embedded image and "
                     "remove all other embedded images")
     USAGE = "<image-file> <file> [<files>]"
@@ -536,6 +548,7 @@ class ImageSetCommand(Command):
 @Command.register
 class ImageClearCommand(Command):
     NAME = "image-clear"
+    BATCH = True
     DESCRIPTION = _("Remove all embedded images")
     USAGE = "<file> [<files>]"
 
@@ -565,6 +578,7 @@ class ImageClearCommand(Command):
 @Command.register
 class ImageExtractCommand(Command):
     NAME = "image-extract"
+    BATCH = True
     DESCRIPTION = (
         _("Extract embedded images to %(filepath)s") % {
             "filepath": "<destination>/<filename>-<index>.(jpeg|png|..)"
@@ -763,6 +777,104 @@ class PrintCommand(Command):
             raise CommandError("One or more files failed to load.")
 
 
+@Command.register
+class QueryCommand(Command):
+    NAME = "query"
+    DESCRIPTION = _("Search the library and print or process the results")
+    USAGE = ("[-l <library>] [-j <jobs>] [-k <k1>,<k2>...] [-p <pattern>] "
+             "<query> [<command> [<args>]]")
+
+    def _add_options(self, p):
+        p.disable_interspersed_args()
+        p.add_option("-l", "--library", action="store", type="string",
+                     help=_("Path to the library file (defaults to the "
+                            "Quod Libet library)"))
+        p.add_option("-j", "--jobs", action="store", type="int", default=4,
+                     help=_("Number of files to process in parallel"))
+        p.add_option("-k", "--keys", action="store", type="string",
+                     help=_("Tags to include in the output"))
+        p.add_option("-p", "--pattern", action="store", type="string",
+                     help="use a custom pattern")
+
+    def _execute(self, options, args):
+        if len(args) < 1:
+            raise CommandError(_("Not enough arguments"))
+        if options.jobs < 1:
+            raise CommandError(_("Invalid number of jobs: %r") % options.jobs)
+
+        query = Query(fsn2text(args[0]))
+        if not query.is_parsable:
+            raise CommandError(_("Invalid query: %r") % query.string)
+
+        path = options.library
+        if path is None:
+            path = os.path.join(quodlibet.get_user_dir(), "songs")
+        self.log("Using library: %r" % path)
+
+        songs = query.filter(load_library(path))
+        self.log("%d songs match" % len(songs))
+
+        if len(args) > 1:
+            self.__run_command(options, args[1], args[2:], songs)
+        else:
+            self.__print_songs(options, songs)
+
+    def __print_songs(self, options, songs):
+        if options.pattern is not None:
+            try:
+                pattern = Pattern(options.pattern)
+            except PatternError:
+                raise CommandError("Invalid pattern: %r" % options.pattern)
+            for song in songs:
+                util.print_(pattern % song)
+            return
+
+        keys = None
+        if options.keys:
+            keys = [k.strip() for k in options.keys.split(",") if k.strip()]
+        for song in songs:
+            util.print_(song_to_json(song, keys))
+
+    def __run_command(self, options, name, cmd_args, songs):
+        for cmd_cls in Command.COMMANDS:
+            if cmd_cls.NAME == name:
+                break
+        else:
+            raise CommandError(_("Unknown command: %r") % name)
+
+        # Commands run in parallel and stdout is reserved for the results
+        if not cmd_cls.BATCH:
+            raise CommandError(
+                _("Command can't be used with query: %r") % name)
+
+        lock = threading.Lock()
+        failed = []
+
+        def process(song):
+            filename = song("~filename")
+            cmd = cmd_cls(self._main_cmd)
+            cmd.verbose = self.verbose
+            try:
+                cmd.execute(cmd_args + [filename])
+            except CommandError as e:
+                result = {"~filename": fsn2text(filename), "error": str(e)}
+            else:
+                result = {"~filename": fsn2text(filename)}
+            with lock:
+                if "error" in result:
+                    failed.append(filename)
+                util.print_(json.dumps(result, ensure_ascii=False))
+
+        # the per-file work is mostly IO in mutagen, so threads are enough
+        with ThreadPoolExecutor(max_workers=options.jobs) as pool:
+            for future in [pool.submit(process, s) for s in songs]:
+                future.result()
+
+        if failed:
+            raise CommandError(
+                _("%d files failed to process.") % len(failed))
+
+
 @Command.register
 class HelpCommand(Command):
     NAME = "help"
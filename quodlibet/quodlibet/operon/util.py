@@ -9,13 +9,16 @@
 import os
 import stat
 import shlex
+import json
 
-from senf import environ
+from senf import environ, fsn2text
 
 from quodlibet import _
+from quodlibet.formats import load_audio_files, SerializationError
 from quodlibet.util.tags import MACHINE_TAGS, sortkey
 from quodlibet.util.dprint import print_, Colorise
 from quodlibet import util
+from quodlibet.compat import text_type, number_types
 
 from .base import CommandError
 
@@ -142,3 +145,60 @@ def get_editor_args(fallback_command="nano"):
         editor_args = [fallback_command]
 
     return editor_args
+
+
+def load_library(path):
+    """Returns a list of songs stored in the library cache file at `path`,
+    including the ones in the shards of other mount points next to it.
+
+    Doesn't touch the audio files themselves.
+    Raises CommandError in case one of the files can't be read.
+    """
+
+    # libraries imports Gtk, which isn't initialized in operon
+    from quodlibet.library.libraries import FileLibrary
+
+    songs = []
+    for point, filename in FileLibrary.get_files(path):
+        try:
+            with open(filename, "rb") as h:
+                data = h.read()
+        except EnvironmentError:
+            raise CommandError(
+                _("Failed to load library file: %r") % filename)
+
+        try:
+            songs.extend(load_audio_files(data))
+        except SerializationError:
+            raise CommandError(
+                _("Failed to load library file: %r") % filename)
+    return songs
+
+
+def song_to_json(song, keys=None):
+    """Returns a JSON string (one line) for the song.
+
+    If `keys` is None all real tags are included, otherwise only the given
+    (possibly computed) ones. Multi-value tags are written as lists.
+    """
+
+    if keys is None:
+        keys = sorted(song.realkeys(), key=sortkey)
+
+    data = {"~filename": fsn2text(song("~filename"))}
+    for key in keys:
+        if key.startswith("~#"):
+            data[key] = song(key)
+            continue
+
+        values = []
+        for value in song.list(key):
+            if not isinstance(value, (text_type,) + number_types):
+                value = fsn2text(value)
+            values.append(value)
+
+        if not values:
+            continue
+        data[key] = values[0] if len(values) == 1 else values
+
+    return json.dumps(data, sort_keys=True, ensure_ascii=False)
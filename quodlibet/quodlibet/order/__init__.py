@@ -39,6 +39,12 @@ class Order(object):
     """The priority relative to other orders of its type.
     Larger numbers typically appear lower in lists."""
 
+    deterministic = False
+    """True if `next_implicit` only depends on the playlist and the passed
+    iter, so the next song can be looked up in advance using
+    `peek_implicit`. Orders setting this have to implement
+    `peek_implicit`."""
+
     def __init__(self):
         """Must have a zero-arg constructor"""
         pass
@@ -68,6 +74,15 @@ class Order(object):
         """Called when a song ends passively, e.g. it plays through."""
         return self.next(playlist, iter)
 
+    def peek_implicit(self, playlist, iter):
+        """Returns what `next_implicit` would return, without changing any
+        state. Only called if `deterministic` is True.
+
+        `next_implicit` might change state, so by default this returns
+        None (no next song known) and orders have to opt in by
+        overriding it."""
+        return None
+
     def previous_explicit(self, playlist, iter):
         """Called when the user presses a "Previous" button."""
         return self.previous(playlist, iter)
@@ -144,6 +159,7 @@ class OrderInOrder(Order):
     accelerated_name = _("_In Order")
     replaygain_profiles = ["album", "track"]
     priority = 0
+    deterministic = True
 
     def next(self, playlist, iter):
         if iter is None:
@@ -151,6 +167,9 @@ class OrderInOrder(Order):
         else:
             return playlist.iter_next(iter)
 
+    def peek_implicit(self, playlist, iter):
+        return OrderInOrder.next(self, playlist, iter)
+
     def previous(self, playlist, iter):
         if len(playlist) == 0:
             return None
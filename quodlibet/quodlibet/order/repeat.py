@@ -31,6 +31,10 @@ class Repeat(Order):
     def reset(self, playlist):
         return self.wrapped.reset(playlist)
 
+    @property
+    def deterministic(self):
+        return self.wrapped.deterministic
+
     def __str__(self):
         return "<%s ∘ %s>" % (self.display_name, self.wrapped.display_name)
 
@@ -43,10 +47,14 @@ class RepeatSongForever(Repeat):
     name = "repeat_song"
     display_name = _("Repeat this track")
     accelerated_name = _("Repeat this track")
+    deterministic = True
 
     def next(self, playlist, iter):
         return iter
 
+    def peek_implicit(self, playlist, iter):
+        return iter
+
     def next_explicit(self, playlist, iter):
         return self.wrapped.next_explicit(playlist, iter)
 
@@ -66,6 +74,10 @@ class RepeatListForever(Repeat):
         print_d("Restarting songlist")
         return playlist.get_iter_first()
 
+    def peek_implicit(self, playlist, iter):
+        next = self.wrapped.peek_implicit(playlist, iter)
+        return next or playlist.get_iter_first()
+
 
 class OneSong(Repeat):
     """Stops after the current song"""
@@ -74,6 +86,7 @@ class OneSong(Repeat):
     display_name = _("One Song")
     accelerated_name = _("One Song")
     priority = 400
+    deterministic = True
 
     def next(self, playlist, iter):
         print_d("Ending songlist.")
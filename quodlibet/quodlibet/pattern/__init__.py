@@ -6,7 +6,7 @@
 
 from ._pattern import (Pattern, FileFromPattern, XMLFromPattern,
     XMLFromMarkupPattern, error,
-    ArbitraryExtensionFileFromPattern, URLFromPattern)
+    ArbitraryExtensionFileFromPattern, URLFromPattern, format_cache)
 
 
 URLFromPattern
@@ -16,3 +16,4 @@ Pattern
 XMLFromMarkupPattern
 XMLFromPattern
 error
+format_cache
@@ -15,6 +15,7 @@
 import os
 import re
 from re import Scanner  # type: ignore
+from collections import OrderedDict
 
 from senf import sep, fsnative, expanduser
 
@@ -183,6 +184,78 @@ class PatternParser(object):
             self.lookahead = PatternLexeme(EOF, "")
 
 
+class FormatCache(object):
+    """A bounded LRU cache of pattern results per song.
+
+    The owner of the songs has to call invalidate() for songs which
+    have changed, see quodlibet.library.init()
+    """
+
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset the statistics"""
+
+        self._cache = OrderedDict()
+        self._songs = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, func, song):
+        """Returns func(song) and caches the result"""
+
+        key = (func, song)
+        try:
+            value = self._cache[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = func(song)
+        self._cache[key] = value
+        self._songs.setdefault(song, set()).add(key)
+        while len(self._cache) > self.max_size:
+            old_key = self._cache.popitem(last=False)[0]
+            self.__forget(old_key)
+        return value
+
+    def __forget(self, key):
+        song = key[1]
+        keys = self._songs[song]
+        keys.discard(key)
+        if not keys:
+            del self._songs[song]
+
+    def invalidate(self, songs):
+        """Remove all cached results for the given songs"""
+
+        for song in songs:
+            for key in self._songs.pop(song, ()):
+                del self._cache[key]
+
+    def get_stats(self):
+        """Returns a dict with usage statistics"""
+
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": float(self.hits) / total if total else 0.0,
+        }
+
+
+format_cache = FormatCache()
+"""The cache used by PatternFormatter.format_cached()"""
+
+
 class PatternFormatter(object):
     _format = None
     _post = None
@@ -269,6 +342,16 @@ class PatternFormatter(object):
                     for v in vals)
         return set(vals)
 
+    def format_cached(self, song):
+        """Like format(), but cached until the song changes"""
+
+        return format_cache.get(self.format, song)
+
+    def format_list_cached(self, song):
+        """Like format_list(), but cached until the song changes"""
+
+        return format_cache.get(self.format_list, song)
+
     __mod__ = format
 
 
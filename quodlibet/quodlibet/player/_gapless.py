@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import threading
+
+
+class GaplessState(object):
+    """Keeps track of gapless transitions.
+
+    The next song gets looked up in advance in the main loop, so the
+    about-to-finish signal, which is emitted in a streaming thread, can
+    start the transition without waiting for the main loop.
+
+    All methods can be called from any thread. The lock is only held
+    while changing the state.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (current song, next song, next uri) or None if not known
+        self._lookahead = None
+        # the song passed to the pipeline for the running transition
+        self._song = None
+        self.in_transition = False
+        """True if the next song was passed to the pipeline, but its stream
+        hasn't started yet"""
+
+    def set_lookahead(self, song, next_song=None, uri=None):
+        """Set the next song and its uri for the current `song`.
+        If `song` is None the lookahead gets cleared.
+        """
+
+        if song is None:
+            lookahead = None
+        else:
+            lookahead = (song, next_song, uri)
+        with self._lock:
+            self._lookahead = lookahead
+
+    def take_lookahead(self, song):
+        """Starts a transition using the lookahead for the current `song`.
+
+        Returns None if there is no lookahead for `song`, or a
+        (next song, uri) tuple. If no next song is known or a transition
+        is running already, uri is None.
+        """
+
+        with self._lock:
+            lookahead = self._lookahead
+            if lookahead is None or lookahead[0] is not song:
+                return None
+
+            # this can trigger twice, see issue 987
+            if self.in_transition:
+                return (None, None)
+
+            next_song, uri = lookahead[1:]
+            if uri is None:
+                return (None, None)
+
+            self._lookahead = None
+            self._song = next_song
+            self.in_transition = True
+            return (next_song, uri)
+
+    def start(self):
+        """Starts a transition without lookahead.
+
+        Returns False if one is running already.
+        """
+
+        with self._lock:
+            # this can trigger twice, see issue 987
+            if self.in_transition:
+                return False
+            self.in_transition = True
+            return True
+
+    def is_pending(self, song):
+        """True if a transition to `song` started from the lookahead is
+        still running.
+        """
+
+        with self._lock:
+            return self.in_transition and self._song is song
+
+    def end(self, current):
+        """Call when the stream of the next song starts, with the current
+        song of the source.
+
+        Returns True if the started stream is the one of `current`. If the
+        source changed after the transition started, it has to be started
+        from scratch.
+        """
+
+        with self._lock:
+            if self.in_transition and self._song is not None and \
+                    current is not self._song:
+                self.in_transition = False
+            self._song = None
+            return self.in_transition
+
+    def reset(self):
+        """Forget about any running transition"""
+
+        with self._lock:
+            self.in_transition = False
+            self._song = None
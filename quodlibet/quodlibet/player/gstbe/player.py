@@ -27,6 +27,7 @@ from quodlibet.util import fver, sanitize_tags, MainRunner, MainRunnerError, \
     print_e, print_
 from quodlibet.player import PlayerError
 from quodlibet.player._base import BasePlayer
+from quodlibet.player._gapless import GaplessState
 from quodlibet.qltk.notif import Task
 from quodlibet.compat import iteritems
 from quodlibet.formats.mod import ModFile
@@ -329,7 +330,6 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         self._paused = True
         self._mute = False
 
-        self._in_gapless_transition = False
         self._active_error = False
 
         self.bin = None
@@ -346,6 +346,16 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         self.__bus_id = None
         self._runner = MainRunner()
 
+        # changed from the streaming thread in about-to-finish
+        self.__gapless = GaplessState()
+        self.__lookahead_id = None
+        self.__watched_source = None
+        self.__source_handlers = []
+
+    @property
+    def _in_gapless_transition(self):
+        return self.__gapless.in_transition
+
     def __songs_changed(self, librarian, songs):
         # replaygain values might have changed, recalc volume
         if self.song and self.song in songs:
@@ -354,8 +364,57 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
     def _destroy(self):
         self._librarian.disconnect(self._lib_id)
         self._runner.abort()
+        self.__unwatch_source()
+        if self.__lookahead_id is not None:
+            GLib.source_remove(self.__lookahead_id)
+            self.__lookahead_id = None
         self.__destroy_pipeline()
 
+    def setup(self, source, song, seek_pos):
+        self.__unwatch_source()
+        self.__watched_source = source
+        self.__source_handlers = source.connect_changed(self.__source_changed)
+        super(GStreamerPlayer, self).setup(source, song, seek_pos)
+
+    def __unwatch_source(self):
+        if self.__watched_source is not None:
+            self.__watched_source.disconnect_changed(self.__source_handlers)
+            self.__watched_source = None
+            self.__source_handlers = []
+
+    def __source_changed(self):
+        # Don't use an outdated lookahead until it's updated. The source
+        # can change many times in a row, so update only once.
+        self.__gapless.set_lookahead(None)
+        if self.__lookahead_id is None:
+            self.__lookahead_id = GLib.idle_add(
+                self.__update_lookahead, priority=GLib.PRIORITY_HIGH)
+
+    def __update_lookahead(self):
+        """Looks up the next song in advance, so about-to-finish can be
+        handled without waiting for the main loop
+        """
+
+        if self.__lookahead_id is not None:
+            GLib.source_remove(self.__lookahead_id)
+            self.__lookahead_id = None
+
+        song = self.song
+        if song is None or self._source is None:
+            self.__gapless.set_lookahead(None)
+        elif not self.__can_gapless(song):
+            self.__gapless.set_lookahead(song)
+        else:
+            try:
+                next_song = self._source.peek_next_ended()
+            except ValueError:
+                # the play order can't tell, ask in about-to-finish
+                self.__gapless.set_lookahead(None)
+            else:
+                uri = next_song("~uri") if next_song is not None else None
+                self.__gapless.set_lookahead(song, next_song, uri)
+        return False
+
     @property
     def name(self):
         name = "GStreamer"
@@ -561,7 +620,7 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
             self.bin.destroy()
             self.bin = None
 
-        self._in_gapless_transition = False
+        self.__gapless.reset()
 
         self._ext_vol_element = None
         self._int_vol_element = None
@@ -687,33 +746,34 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
                 GstPbutils.InstallPluginsReturn.INTERNAL_FAILURE):
             self._error(PlayerError(title, error_details))
 
-    def __about_to_finish_sync(self):
-        """Returns the next song uri to play or None"""
-
-        print_d("About to finish (sync)")
-
+    def __can_gapless(self, song):
         # Chained oggs falsely trigger a gapless transition.
         # At least for radio streams we can safely ignore it because
         # transitions don't occur there.
         # https://github.com/quodlibet/quodlibet/issues/1454
         # https://bugzilla.gnome.org/show_bug.cgi?id=695474
-        if self.song.multisong:
-            print_d("multisong: ignore about to finish")
-            return
+        if song.multisong:
+            return False
 
         # mod + gapless deadlocks
         # https://github.com/quodlibet/quodlibet/issues/2780
-        if isinstance(self.song, ModFile):
-            return
+        if isinstance(song, ModFile):
+            return False
 
-        if config.getboolean("player", "gst_disable_gapless"):
-            print_d("Gapless disabled")
+        return not config.getboolean("player", "gst_disable_gapless")
+
+    def __about_to_finish_sync(self):
+        """Returns the next song uri to play or None"""
+
+        print_d("About to finish (sync)")
+
+        if not self.__can_gapless(self.song):
+            print_d("Gapless not possible or disabled")
             return
 
         # this can trigger twice, see issue 987
-        if self._in_gapless_transition:
+        if not self.__gapless.start():
             return
-        self._in_gapless_transition = True
 
         print_d("Select next song in mainloop..")
         self._source.next_ended()
@@ -723,9 +783,34 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         if song is not None:
             return song("~uri")
 
+    def __lookahead_next_ended(self, song):
+        # the pipeline might have been reset in the meantime
+        if not self.__gapless.is_pending(song):
+            return False
+
+        print_d("Select next song in mainloop..")
+        self._source.next_ended()
+        print_d("..done.")
+        return False
+
     def __about_to_finish(self, playbin):
         print_d("About to finish (async)")
 
+        # Use the precomputed next song and update the source in the main
+        # loop later. If the source changes until the new stream starts,
+        # _end() falls back to a non-gapless transition.
+        next_ = self.__gapless.take_lookahead(self.song)
+        if next_ is not None:
+            song, uri = next_
+            if uri is None:
+                print_d("About to finish (async): no next song")
+                return
+            GLib.idle_add(self.__lookahead_next_ended, song,
+                          priority=GLib.PRIORITY_HIGH)
+            print_d("About to finish (async): setting uri (lookahead)")
+            playbin.set_property('uri', uri)
+            return
+
         try:
             uri = self._runner.call(self.__about_to_finish_sync,
                                     priority=GLib.PRIORITY_HIGH,
@@ -893,6 +978,12 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         print_d("End song")
         song, info = self.song, self.info
 
+        # If the source changed after the next song was passed to the
+        # pipeline, start the song the source wants from scratch.
+        if self._in_gapless_transition and \
+                not self.__gapless.end(self._source.current):
+            print_d("Gapless lookahead outdated, restarting")
+
         # set the new volume before the signals to avoid delays
         if self._in_gapless_transition:
             self.song = self._source.current
@@ -930,13 +1021,14 @@ class GStreamerPlayer(BasePlayer, GStreamerPluginHandler):
         else:
             self.__destroy_pipeline()
 
-        self._in_gapless_transition = False
+        self.__gapless.reset()
 
         if self._seeker is not None:
             # we could have a gapless transition to a non-seekable -> update
             self._seeker.reset()
 
         self.emit('song-started', self.song)
+        self.__update_lookahead()
 
         if self.song is None:
             self.paused = True
@@ -15,7 +15,7 @@ from quodlibet.plugins import PluginHandler
 
 from quodlibet.util.songwrapper import SongWrapper, ListWrapper
 from quodlibet.util.songwrapper import check_wrapper_changed
-from quodlibet.util import connect_obj
+from quodlibet.util import connect_obj, instrument
 from quodlibet.compat import listvalues
 from quodlibet.errorreport import errorhook
 
@@ -138,8 +138,10 @@ class EventPluginHandler(PluginHandler):
                 return name in type(obj).__dict__
 
             if overridden(plugin, method_name):
+                name = "%s.%s" % (type(plugin).__name__, method_name)
                 try:
-                    handler(*args)
+                    with instrument.measure("event-plugin", name):
+                        handler(*args)
                 except Exception:
                     print_e("Error during %s on %s" %
                             (method_name, type(plugin)))
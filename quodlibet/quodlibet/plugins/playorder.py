@@ -36,6 +36,10 @@ class PlayOrderPlugin(quodlibet.qltk.playorder.Order):
     priority = 200
     """Plugins default to lower priority than built-ins"""
 
+    deterministic = False
+    """Plugins have to opt in to having their next song looked up
+    in advance, even if based on a deterministic order"""
+
 
 class RepeatPlugin(PlayOrderPlugin, quodlibet.qltk.playorder.Repeat):
     """Repeat plugins add new ways to repeat an existing,
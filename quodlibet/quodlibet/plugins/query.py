@@ -42,11 +42,21 @@ class QueryPlugin(object):
     to indicate that all matches should fail. In this case search will not be
     called.
 
+    The plugin may optionally provide the filter method:
+
+        self.filter(songs, body)
+
+    This method is passed an iterable of songs and the (parsed) query body
+    and should return a list of the matching songs, in the same order. If
+    provided, it is used instead of calling search for each song when the
+    query gets applied to many songs at once, e.g. the whole library.
+
     By default, the name used in the '@(name)' query to use the plugin is
     the PLUGIN_NAME attribute. However, this can be changed by overriding
     the 'key' attribute to a different string to be used.
     """
     search = None
+    filter = None
     key = None
     PLUGIN_ICON = Icons.EDIT_FIND
 
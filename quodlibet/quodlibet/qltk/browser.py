@@ -21,6 +21,7 @@ from quodlibet.qltk.x import ScrolledWindow, Action
 from quodlibet.qltk import Icons
 from quodlibet.qltk.window import Window, PersistentWindowMixin
 from quodlibet.util.library import background_filter
+from quodlibet.util.numcolumns import get_sum
 
 
 class FilterMenu(object):
@@ -351,7 +352,7 @@ class LibraryBrowser(Window, util.InstanceTracker, PersistentWindowMixin):
 
     def __set_totals(self, info, songs):
         i = len(songs)
-        length = sum(song.get("~#length", 0) for song in songs)
+        length = get_sum("~#length", songs)
         t = self.browser.status_text(count=i,
                                      time=util.format_time_preferred(length))
         self.__statusbar.set_text(t)
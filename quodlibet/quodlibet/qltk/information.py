@@ -27,6 +27,7 @@ from quodlibet.qltk.window import Window, PersistentWindowMixin
 from quodlibet.qltk.x import Align
 from quodlibet.util import tag, connect_destroy
 from quodlibet.util.i18n import numeric_phrase
+from quodlibet.util.numcolumns import get_sum
 from quodlibet.util.tags import readable
 from quodlibet.util.path import filesize, unexpand
 from quodlibet.compat import text_type
@@ -373,7 +374,7 @@ class OneAlbum(qltk.Notebook):
                     song("~#track", discs.get(song("~#disc"), 0))])
         tracks = sum(discs.values())
         discs = len(discs)
-        length = sum([song.get("~#length", 0) for song in songs])
+        length = get_sum("~#length", songs)
 
         if tracks == 0 or tracks < len(songs):
             tracks = len(songs)
@@ -600,12 +601,12 @@ class ManySongs(qltk.Notebook):
             label), False, False, 0)
 
     def _file(self, songs, box):
-        length = 0
+        length = get_sum("~#length", songs)
         size = 0
         for song in songs:
-            length += song.get("~#length", 0)
             try:
-                size += filesize(song["~filename"])
+                size += (
+                    song.get("~#filesize") or filesize(song["~filename"]))
             except EnvironmentError:
                 pass
         table = Table(2)
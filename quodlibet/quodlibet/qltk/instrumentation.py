@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from gi.repository import Gtk, GLib
+
+from quodlibet import _
+from quodlibet.qltk.window import UniqueWindow
+from quodlibet.qltk.x import Button, ScrolledWindow
+from quodlibet.qltk import Icons
+from quodlibet.util import instrument
+from quodlibet.compat import iteritems
+
+
+class InstrumentationWindow(UniqueWindow):
+    """Shows the call counts and latencies recorded by util.instrument"""
+
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, parent):
+        if self.is_not_unique():
+            return
+        super(InstrumentationWindow, self).__init__()
+
+        self.set_title(_("Instrumentation"))
+        self.set_border_width(12)
+        self.set_transient_for(parent)
+        self.set_default_size(720, 400)
+
+        # category, name, count, total, mean, max, histogram
+        self._model = model = Gtk.ListStore(
+            str, str, int, float, float, float, str)
+        model.set_sort_column_id(3, Gtk.SortType.DESCENDING)
+        view = Gtk.TreeView(model=model)
+
+        def ms_cdf(column, cell, model, iter_, index):
+            cell.set_property("text", "%.2f" % (model[iter_][index] * 1000))
+
+        for index, title in enumerate([
+                _("Category"), _("Name"), _("Calls"), _("Total (ms)"),
+                _("Mean (ms)"), _("Max (ms)"), _("Histogram")]):
+            render = Gtk.CellRendererText()
+            column = Gtk.TreeViewColumn(title, render)
+            if index in (3, 4, 5):
+                column.set_cell_data_func(render, ms_cdf, index)
+            else:
+                column.add_attribute(render, "text", index)
+            column.set_sort_column_id(index)
+            column.set_resizable(True)
+            view.append_column(column)
+
+        sw = ScrolledWindow()
+        sw.set_shadow_type(Gtk.ShadowType.IN)
+        sw.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        sw.add(view)
+
+        record = Gtk.CheckButton(label=_("_Record"), use_underline=True)
+        record.set_active(instrument.is_enabled())
+        record.connect("toggled", lambda b: instrument.enable(b.get_active()))
+
+        reset = Button(_("_Reset"), Icons.EDIT_CLEAR)
+        reset.connect("clicked", self.__reset)
+
+        close = Button(_("_Close"), Icons.WINDOW_CLOSE)
+        close.connect("clicked", lambda *x: self.destroy())
+
+        buttons = Gtk.HBox(spacing=6)
+        buttons.pack_start(record, False, True, 0)
+        buttons.pack_end(close, False, True, 0)
+        buttons.pack_end(reset, False, True, 0)
+
+        vbox = Gtk.VBox(spacing=12)
+        vbox.pack_start(sw, True, True, 0)
+        vbox.pack_start(buttons, False, True, 0)
+        self.add(vbox)
+
+        self.__refresh()
+        self._timeout_id = GLib.timeout_add(
+            self.REFRESH_INTERVAL, self.__refresh)
+        self.connect("destroy", self.__destroy)
+        self.get_child().show_all()
+
+    def __destroy(self, *args):
+        GLib.source_remove(self._timeout_id)
+
+    def __reset(self, *args):
+        instrument.reset()
+        self.__refresh()
+
+    def __refresh(self):
+        rows = {}
+        for category, stats in iteritems(instrument.get_stats()):
+            for name, values in iteritems(stats):
+                histogram = u" ".join(
+                    u"%s:%d" % (label, values["histogram"][label])
+                    for label in instrument.BUCKET_LABELS
+                    if values["histogram"][label])
+                rows[(category, name)] = [
+                    category, name, values["count"], values["total"],
+                    values["mean"], values["max"], histogram]
+
+        model = self._model
+        for row in list(model):
+            key = (row[0], row[1])
+            if key in rows:
+                model.set_row(row.iter, rows.pop(key))
+            else:
+                model.remove(row.iter)
+        for values in rows.values():
+            model.append(row=values)
+
+        return True
@@ -60,6 +60,7 @@ from quodlibet.util.library import get_scan_dirs
 from quodlibet.util import connect_obj, print_d
 from quodlibet.util.library import background_filter, scan_library
 from quodlibet.util.path import uri_is_valid
+from quodlibet.util.numcolumns import get_sum
 from quodlibet.qltk.window import PersistentWindowMixin, Window, on_first_map
 from quodlibet.qltk.songlistcolumns import SongListColumn
 
@@ -583,6 +584,7 @@ MENU = """
       <menuitem action='OnlineHelp' always-show-image='true'/>
       <menuitem action='Shortcuts' always-show-image='true'/>
       <menuitem action='SearchHelp' always-show-image='true'/>
+      %(debug)s
       <separator/>
       <menuitem action='CheckUpdates' always-show-image='true'/>
       <menuitem action='About' always-show-image='true'/>
@@ -1122,6 +1124,15 @@ class QuodLibetWindow(Window, PersistentWindowMixin, AppWindow):
         act.connect('activate', search_help_handler)
         ag.add_action_with_accel(act, None)
 
+        act = Action(name="Instrumentation", label=_("_Instrumentation"))
+
+        def instrumentation_handler(*args):
+            from quodlibet.qltk.instrumentation import InstrumentationWindow
+            InstrumentationWindow(self).show()
+
+        act.connect('activate', instrumentation_handler)
+        ag.add_action_with_accel(act, None)
+
         act = Action(name="CheckUpdates", label=_("_Check for Updates…"),
                      icon_name=Icons.NETWORK_SERVER)
 
@@ -1187,7 +1198,9 @@ class QuodLibetWindow(Window, PersistentWindowMixin, AppWindow):
         menustr = MENU % {
             "views": browser_menu_items(),
             "browsers": secondary_browser_menu_items(),
-            "filters_menu": FilterMenu.MENU
+            "filters_menu": FilterMenu.MENU,
+            "debug": ("<menuitem action='Instrumentation'/>"
+                      if const.DEBUG else ""),
         }
         ui.add_ui_from_string(menustr)
         self._filter_menu = FilterMenu(library, player, ui)
@@ -1495,7 +1508,7 @@ class QuodLibetWindow(Window, PersistentWindowMixin, AppWindow):
             self.browser.activate()
 
     def __set_totals(self, info, songs):
-        length = sum(song.get("~#length", 0) for song in songs)
+        length = get_sum("~#length", songs)
         t = self.browser.status_text(count=len(songs),
                                      time=util.format_time_preferred(length))
         self.statusbar.set_default_text(t)
@@ -10,6 +10,8 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import time
+
 from gi.repository import Gtk, GLib, Gdk, GObject
 from senf import uri2fsn
 
@@ -19,6 +21,7 @@ from quodlibet import const
 from quodlibet import qltk
 from quodlibet import util
 from quodlibet import _
+from quodlibet import print_d
 
 from quodlibet.query import Query
 from quodlibet.pattern import Pattern
@@ -39,6 +42,89 @@ from quodlibet.compat import xrange, string_types, iteritems, listfilter
 DND_QL, DND_URI_LIST = range(2)
 
 
+class _RowCost(object):
+    """Decaying average of the time per row some model change takes.
+
+    Starts out with `seconds` per row, weighted as if measured for `rows`
+    rows, so single measurements don't change it much.
+    """
+
+    DECAY = 0.9
+
+    def __init__(self, seconds, rows=1000):
+        self._time = seconds * rows
+        self._rows = float(rows)
+
+    def add(self, seconds, rows):
+        """Add a measurement: `rows` rows took `seconds`"""
+
+        if rows:
+            self._time = self._time * self.DECAY + seconds
+            self._rows = self._rows * self.DECAY + rows
+
+    def estimate(self, rows):
+        """Returns the expected time in seconds for `rows` rows"""
+
+        return self._time / self._rows * rows
+
+
+_UPDATE_COST = _RowCost(1e-4)
+"""Time per inserted or removed row when set_songs() changes the model
+in place, with the view attached"""
+
+_REFILL_COST = _RowCost(5e-6)
+"""Time per row when set_songs() sorts all songs and refills the model
+without the view"""
+
+
+def _get_default_sort_key(song):
+    return song.sort_key
+
+
+def _merge_sorted(songs, new_songs, passes):
+    """Merges the list `new_songs` into `songs`, both sorted using the
+    sort passes returned by SongList._get_sort_passes().
+
+    Returns the merged list and the positions of the new songs in it.
+    """
+
+    # the last pass is the most important one
+    keys = [(key, reverse, {}) for key, reverse in reversed(passes)]
+
+    def before(a, b):
+        for key, reverse, cache in keys:
+            try:
+                value_a = cache[a]
+            except KeyError:
+                value_a = cache[a] = key(a)
+            try:
+                value_b = cache[b]
+            except KeyError:
+                value_b = cache[b] = key(b)
+            if value_a != value_b:
+                return value_b < value_a if reverse else value_a < value_b
+        return False
+
+    merged = []
+    positions = []
+    lo = 0
+    for song in new_songs:
+        # find the position after all songs sorting before or equal
+        start = lo
+        hi = len(songs)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if before(song, songs[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        merged.extend(songs[start:lo])
+        positions.append(len(merged))
+        merged.append(song)
+    merged.extend(songs[lo:])
+    return merged, positions
+
+
 class SongSelectionInfo(GObject.Object):
     """
     Songs which get included in the status bar summary.
@@ -321,6 +407,9 @@ class SongListDnDMixin(object):
             path = max(0, len(model) - 1)
             position = Gtk.TreeViewDropPosition.AFTER
 
+        # the rows won't be sorted anymore
+        self._filled_sort_orders = None
+
         if move and Gtk.drag_get_source_widget(ctx) == view:
             iter = model.get_iter(path) # model can't be empty, we're moving
             if position in (Gtk.TreeViewDropPosition.BEFORE,
@@ -407,6 +496,8 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         # A priority list of how to apply the sort keys.
         # might contain column header names not present...
         self._sort_sequence = []
+        # The sort orders the model content was sorted with or None
+        self._filled_sort_orders = None
         self.set_column_headers(self.headers)
         librarian = library.librarian or library
 
@@ -737,6 +828,7 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         model = self.get_model()
         if model:
             model.clear()
+        self._filled_sort_orders = None
 
     def get_songs(self):
         """Get all songs currently in the song list"""
@@ -746,9 +838,12 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             return []
         return model.get()
 
-    def _sort_songs(self, songs):
-        """Sort passed songs in place based on the column sort orders"""
+    def _get_sort_passes(self):
+        """Returns a list of (key function, reverse) tuples, sorting with
+        each of them in turn gives the order of the column sort orders.
+        """
 
+        passes = []
         last_tag = None
         last_order = None
         first = True
@@ -758,7 +853,7 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             # always sort using the default sort key first
             if first:
                 first = False
-                songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+                passes.append((_get_default_sort_key, reverse))
                 last_order = reverse
                 last_tag = ""
 
@@ -769,10 +864,60 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
             last_tag = tag
 
             if tag == "":
-                songs.sort(key=lambda s: s.sort_key, reverse=reverse)
+                passes.append((_get_default_sort_key, reverse))
             else:
-                sort_func = AudioFile.sort_by_func(tag)
-                songs.sort(key=sort_func, reverse=reverse)
+                passes.append((AudioFile.sort_by_func(tag), reverse))
+        return passes
+
+    def _sort_songs(self, songs):
+        """Sort passed songs in place based on the column sort orders"""
+
+        for key, reverse in self._get_sort_passes():
+            songs.sort(key=key, reverse=reverse)
+
+    def __update_songs(self, songs):
+        """Sorts `songs` in place and changes the model content to them by
+        only removing and inserting the rows which differ.
+
+        Returns False without doing anything if the model content isn't
+        sorted the same way or if it differs too much, in which case
+        refilling the model is faster.
+        """
+
+        model = self.get_model()
+        orders = self.get_sort_orders()
+        if not len(model) or self._filled_sort_orders != orders:
+            return False
+
+        old_songs = model.get()
+        old = set(old_songs)
+        new = set(songs)
+        if len(old) != len(old_songs) or len(new) != len(songs):
+            # duplicates
+            return False
+
+        removed = old - new
+        added = [s for s in songs if s not in old]
+        changes = len(removed) + len(added)
+        if _UPDATE_COST.estimate(changes) > _REFILL_COST.estimate(len(songs)):
+            return False
+
+        start = time.time()
+        kept = [s for s in old_songs if s in new]
+        self._sort_songs(added)
+        merged, positions = _merge_sorted(
+            kept, added, self._get_sort_passes())
+
+        print_d("Updating view model: %d removed, %d added" % (
+            len(removed), len(added)))
+        for iter_ in model.find_all(removed):
+            model.remove(iter_)
+        for index, song in zip(positions, added):
+            model.insert(index, row=[song])
+
+        songs[:] = merged
+        _UPDATE_COST.add(time.time() - start, changes)
+        return True
 
     def add_songs(self, songs):
         """Add songs to the list in the right order and position"""
@@ -813,22 +958,31 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         model = self.get_model()
         assert model is not None
 
+        restore_song = None
+        if scroll_select:
+            restore_song = self.get_first_selected_song()
+
         if not sorted:
             # make sure some sorting is set and visible
             if not self.is_sorted():
                 default = self.find_default_sort_column()
                 if default:
                     self.toggle_column_sort(default, refresh=False)
-            self._sort_songs(songs)
+
+            # in case the new songs are mostly the same (like when refining
+            # a search) only insert and remove the different ones
+            if not self.__update_songs(songs):
+                start = time.time()
+                self._sort_songs(songs)
+                with self.without_model() as model:
+                    model.set(songs)
+                _REFILL_COST.add(time.time() - start, len(songs))
+            self._filled_sort_orders = self.get_sort_orders()
         else:
             self.clear_sort()
-
-        restore_song = None
-        if scroll_select:
-            restore_song = self.get_first_selected_song()
-
-        with self.without_model() as model:
-            model.set(songs)
+            with self.without_model() as model:
+                model.set(songs)
+            self._filled_sort_orders = None
 
         # scroll to the first selected or current song and restore
         # selection for the first selected item if there was one
@@ -902,11 +1056,16 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll,
         Warning: This makes the row-changed signal useless.
         """
 
+        model = self.get_model()
+        if self._filled_sort_orders is not None and \
+                any(song in model for song in songs):
+            # the rows don't get moved, so they might not be sorted anymore
+            self._filled_sort_orders = None
+
         vrange = self.get_visible_range()
         if vrange is None:
             return
         (start,), (end,) = vrange
-        model = self.get_model()
         for path in xrange(start, end + 1):
             row = model[path]
             if row[0] in songs:
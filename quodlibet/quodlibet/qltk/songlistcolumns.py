@@ -18,6 +18,7 @@ from senf import fsnative, fsn2text
 from quodlibet import _
 from quodlibet import util
 from quodlibet import config
+from quodlibet.util import instrument
 from quodlibet.pattern import Pattern
 from quodlibet.qltk.views import TreeViewColumnButton
 from quodlibet.qltk import add_css
@@ -193,6 +194,13 @@ class TextColumn(SongListColumn):
             super(TextColumn, self)._needs_update(value)
 
     def _cdf(self, column, cell, model, iter_, user_data):
+        if instrument.is_enabled():
+            with instrument.measure("cell-data", self.header_name):
+                self._update_cell(model, iter_, cell)
+        else:
+            self._update_cell(model, iter_, cell)
+
+    def _update_cell(self, model, iter_, cell):
         self._deferred_width_check()
         if self._force_update:
             min_width = self._get_min_width()
@@ -268,6 +276,9 @@ class WideTextColumn(TextColumn):
 class DateColumn(WideTextColumn):
     """The '~#' keys that are dates."""
 
+    _format_setting = config.cached(
+        "settings", "datecolumn_timestamp_format", "gettext")
+
     def _fetch_value(self, model, iter_):
         return model.get_value(iter_)(self.header_name)
 
@@ -280,8 +291,7 @@ class DateColumn(WideTextColumn):
             except (OverflowError, ValueError, OSError):
                 text = u""
             else:
-                format_setting = config.gettext("settings",
-                                      "datecolumn_timestamp_format")
+                format_setting = self._format_setting.value
 
                 # use format configured in Advanced Preferences
                 if format_setting:
@@ -347,7 +357,7 @@ class PatternColumn(WideTextColumn):
     def _fetch_value(self, model, iter_):
         song = model.get_value(iter_)
         if self._pattern is not None:
-            return self._pattern % song
+            return self._pattern.format_cached(song)
         return u""
 
     def _apply_value(self, model, iter_, cell, value):
@@ -7,7 +7,7 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GObject
 
 from quodlibet.qltk.playorder import OrderInOrder
 from quodlibet.qltk.models import ObjectStore
@@ -74,6 +74,26 @@ class PlaylistMux(object):
             self.q.next_ended()
         self._check_sourced()
 
+    def peek_next_ended(self):
+        """Returns the song `next_ended` would switch to without switching.
+
+        Raises ValueError if the play order can't tell in advance.
+        """
+
+        if self.q.is_empty():
+            return self.pl.peek_next_ended()
+        else:
+            return self.q.peek_next_ended()
+
+    def connect_changed(self, func):
+        """Like `PlaylistModel.connect_changed` for both models"""
+
+        return self.q.connect_changed(func) + self.pl.connect_changed(func)
+
+    def disconnect_changed(self, handlers):
+        self.q.disconnect_changed(handlers)
+        self.pl.disconnect_changed(handlers)
+
     def previous(self):
         """Go to the previous song"""
 
@@ -120,14 +140,73 @@ class PlaylistMux(object):
 
 
 class TrackCurrentModel(ObjectStore):
+    """An ObjectStore keeping track of the current song.
+
+    `find()`, `find_all()` and `in` use an index mapping each song to its
+    rows. Rows are identified by their iters, which stay valid in a
+    Gtk.ListStore until the row is removed, so the index only needs
+    updating for the rows which get added, changed or removed.
+    """
 
     def __init__(self, *args, **kwargs):
         super(TrackCurrentModel, self).__init__(*args, **kwargs)
         self.__iter = None
 
+        # song -> {row id: iter} and row id -> song, None if it needs to
+        # be rebuilt
+        self.__index = None
+        self.__rows = None
+        self.__removing = False
+        self.__index_sigs = [
+            self.connect('row-inserted', self.__row_inserted),
+            self.connect('row-changed', self.__row_changed),
+            self.connect('row-deleted', self.__row_deleted),
+        ]
+
     last_current = None
     """The last valid current song"""
 
+    def __add_row(self, iter_, song):
+        row_id = iter_.user_data
+        self.__rows[row_id] = song
+        self.__index.setdefault(song, {})[row_id] = iter_
+
+    def __forget_row(self, row_id):
+        song = self.__rows.pop(row_id)
+        rows = self.__index[song]
+        del rows[row_id]
+        if not rows:
+            del self.__index[song]
+
+    def __row_inserted(self, model, path, iter_):
+        if self.__index is not None:
+            self.__add_row(iter_.copy(), self.get_value(iter_))
+
+    def __row_changed(self, model, path, iter_):
+        if self.__index is None:
+            return
+        row_id = iter_.user_data
+        song = self.get_value(iter_)
+        if row_id in self.__rows:
+            if self.__rows[row_id] is song:
+                return
+            self.__forget_row(row_id)
+        self.__add_row(iter_.copy(), song)
+
+    def __row_deleted(self, model, path):
+        # We don't know which row it was if it wasn't removed
+        # through remove(), start over
+        if not self.__removing:
+            self.__index = self.__rows = None
+
+    def __get_index(self):
+        if self.__index is None:
+            self.__index = {}
+            self.__rows = {}
+            for iter_, song in self.iterrows():
+                self.__add_row(iter_, song)
+        return self.__index
+
     def set(self, songs):
         """Clear the model and add the passed songs"""
 
@@ -135,10 +214,20 @@ class TrackCurrentModel(ObjectStore):
         self.clear()
         self.__iter = None
 
+        for signal_id in self.__index_sigs:
+            self.handler_block(signal_id)
+        self.__index = {}
+        self.__rows = {}
+        add_row = self.__add_row
         oldsong = self.last_current
-        for iter_, song in izip(self.iter_append_many(songs), songs):
-            if song is oldsong:
-                self.__iter = iter_
+        try:
+            for iter_, song in izip(self.iter_append_many(songs), songs):
+                add_row(iter_, song)
+                if song is oldsong:
+                    self.__iter = iter_
+        finally:
+            for signal_id in self.__index_sigs:
+                self.handler_unblock(signal_id)
 
     def get(self):
         """A list of all contained songs"""
@@ -174,6 +263,9 @@ class TrackCurrentModel(ObjectStore):
         self.__iter = iter_
         self.last_current = self.current
 
+    def __get_position(self, iter_):
+        return self.get_path(iter_).get_indices()[0]
+
     def find(self, song):
         """Returns the iter to the first occurrence of song in the model
         or None if it wasn't found.
@@ -183,49 +275,67 @@ class TrackCurrentModel(ObjectStore):
         if self.current == song:
             return self.current_iter
 
-        # search the rest
-        for iter_, value in self.iterrows():
-            if value == song:
-                return iter_
-        return
+        rows = self.__get_index().get(song)
+        if not rows:
+            return
+        if len(rows) == 1:
+            iter_ = next(iter(rows.values()))
+        else:
+            iter_ = min(rows.values(), key=self.__get_position)
+        return iter_.copy()
 
     def find_all(self, songs):
         """Returns a list of iters for all occurrences of all songs.
         (since a song can be in the model multiple times)
         """
 
-        songs = set(songs)
+        index = self.__get_index()
         found = []
-        append = found.append
-        for iter_, value in self.iterrows():
-            if value in songs:
-                append(iter_)
-        return found
+        for song in set(songs):
+            rows = index.get(song)
+            if rows:
+                found.extend(rows.values())
+        if len(found) > 1:
+            found.sort(key=self.__get_position)
+        return [iter_.copy() for iter_ in found]
 
     def remove(self, iter_):
         if self.__iter and self[iter_].path == self[self.__iter].path:
             self.__iter = None
-        super(TrackCurrentModel, self).remove(iter_)
+        if self.__index is not None and iter_.user_data in self.__rows:
+            self.__forget_row(iter_.user_data)
+        self.__removing = True
+        try:
+            super(TrackCurrentModel, self).remove(iter_)
+        finally:
+            self.__removing = False
 
     def clear(self):
         self.__iter = None
+        self.__index = self.__rows = None
         super(TrackCurrentModel, self).clear()
 
     def __contains__(self, song):
-        return bool(self.find(song))
+        if self.current == song:
+            return True
+        return song in self.__get_index()
 
 
 class PlaylistModel(TrackCurrentModel):
     """A play list model for song lists"""
 
-    order = None
-    """The active `PlayOrder`"""
+    __gsignals__ = {
+        # the play order was replaced or all songs were replaced by set()
+        'changed': (GObject.SignalFlags.RUN_LAST, None, ()),
+    }
 
     sourced = False
     """True in case this model is the source of the currently playing song"""
 
     def __init__(self, order_cls=OrderInOrder):
         super(PlaylistModel, self).__init__(object)
+        self.__order = None
+        self.__changed_sigs = []
         self.order = order_cls()
 
         # The playorder plugins use paths atm to remember songs so
@@ -235,6 +345,49 @@ class PlaylistModel(TrackCurrentModel):
             s = self.connect(sig, lambda pl, *x: self.order.reset(pl))
             self.__sigs.append(s)
 
+    @property
+    def order(self):
+        """The active `PlayOrder`"""
+
+        return self.__order
+
+    @order.setter
+    def order(self, order):
+        self.__order = order
+        self.emit("changed")
+
+    def connect_changed(self, func):
+        """Calls func without arguments whenever the song `next_ended`
+        would switch to might have changed.
+
+        Returns a list of handlers to pass to `disconnect_changed`.
+        """
+
+        handlers = []
+        for sig in ['changed', 'row-changed', 'row-deleted', 'row-inserted',
+                    'rows-reordered']:
+            id_ = self.connect(sig, lambda pl, *x: func())
+            self.__changed_sigs.append(id_)
+            handlers.append((self, id_))
+        return handlers
+
+    def disconnect_changed(self, handlers):
+        for model, id_ in handlers:
+            if model is self:
+                self.__changed_sigs.remove(id_)
+                self.disconnect(id_)
+
+    def peek_next_ended(self):
+        """Returns the song `next_ended` would switch to without switching.
+
+        Raises ValueError if the play order can't tell in advance.
+        """
+
+        if not self.order.deterministic:
+            raise ValueError("%s can't look ahead" % self.order)
+        iter_ = self.order.peek_implicit(self, self.current_iter)
+        return iter_ and self.get_value(iter_)
+
     def next(self):
         """Switch to the next song"""
 
@@ -289,11 +442,13 @@ class PlaylistModel(TrackCurrentModel):
         """Clear the model and add the passed songs"""
 
         self.order.reset(self)
-        for signal_id in self.__sigs:
+        signal_ids = self.__sigs + self.__changed_sigs
+        for signal_id in signal_ids:
             self.handler_block(signal_id)
         super(PlaylistModel, self).set(songs)
-        for signal_id in self.__sigs:
+        for signal_id in signal_ids:
             self.handler_unblock(signal_id)
+        self.emit("changed")
 
     def reset(self):
         """Switch to the first song"""
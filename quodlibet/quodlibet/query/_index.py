@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Sorted indexes of numeric song values for answering range queries.
+
+A NumericIndex keeps all library songs sorted by one numeric value,
+updated through the library signals. Numeric comparisons in queries can
+then find all matching library songs by bisection instead of evaluating
+the comparison for every song.
+"""
+
+from bisect import bisect_left
+
+from quodlibet.compat import integer_types, iteritems
+from quodlibet.util.dprint import print_d
+
+
+MAX_INCREMENTAL = 100
+"""Up to how many changed songs the sorted list gets updated in place,
+for more it gets rebuilt on the next access"""
+
+_NUMBER_TYPES = integer_types + (float,)
+
+
+def bisect_first(keys, predicate, lo=0):
+    """Returns the index of the first entry in the sorted list of
+    (value, id) `keys` at or after `lo` for which `predicate(value)` is
+    True, or len(keys). `predicate` has to be False for all values before
+    that and True for all values after it.
+    """
+
+    hi = len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(keys[mid][0]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class NumericIndex(object):
+    """Keeps the songs in `library` sorted by the value `get_value(song)`
+    returns.
+
+    `values` maps all indexed songs to their value or None if they don't
+    have one. Songs for which `get_value` returns something that isn't a
+    number aren't indexed at all.
+
+    If no longer needed, call destroy().
+    """
+
+    def __init__(self, library, get_value):
+        self.library = library
+        self._get_value = get_value
+        self.values = {}
+        self._keys = None
+        self._songs = None
+        self.__sigs = [
+            library.connect("added", self.__changed),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+        self.__changed(library, list(library.values()))
+
+    def destroy(self):
+        for id_ in self.__sigs:
+            self.library.disconnect(id_)
+        self.__sigs = []
+        self.values.clear()
+        self._keys = self._songs = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __get_value(self, song):
+        value = self._get_value(song)
+        if value is None or (isinstance(value, _NUMBER_TYPES) and
+                             value == value):
+            return value
+        # NaN or not a number, can't be sorted
+        raise ValueError
+
+    def __discard(self, song, value):
+        key = (value, id(song))
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            del self._songs[i]
+
+    def __insert(self, song, value):
+        key = (value, id(song))
+        i = bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._songs.insert(i, song)
+
+    def __changed(self, library, songs):
+        values = self.values
+        incremental = self._keys is not None and len(songs) <= MAX_INCREMENTAL
+        if not incremental:
+            self._keys = self._songs = None
+
+        for song in songs:
+            old = values.pop(song, None)
+            try:
+                value = self.__get_value(song)
+            except ValueError:
+                value = None
+            else:
+                values[song] = value
+            if incremental and old != value:
+                if old is not None:
+                    self.__discard(song, old)
+                if value is not None:
+                    self.__insert(song, value)
+
+    def __removed(self, library, songs):
+        values = self.values
+        incremental = self._keys is not None and len(songs) <= MAX_INCREMENTAL
+        if not incremental:
+            self._keys = self._songs = None
+
+        for song in songs:
+            value = values.pop(song, None)
+            if incremental and value is not None:
+                self.__discard(song, value)
+
+    def get_sorted(self):
+        """Returns a sorted list of (value, id(song)) tuples and a list
+        of the corresponding songs, excluding songs without a value.
+
+        Both must not be modified.
+        """
+
+        if self._keys is None:
+            items = sorted(
+                ((v, id(s)), s) for s, v in iteritems(self.values)
+                if v is not None)
+            self._keys = [k for k, s in items]
+            self._songs = [s for k, s in items]
+            print_d("Sorted %d songs" % len(items))
+        return self._keys, self._songs
+
+
+_indexes = {}
+
+
+def get_numeric_index(library, name, get_value):
+    """Returns the shared NumericIndex for `library` with the given name,
+    creating it using `get_value` if needed.
+    """
+
+    index = _indexes.get(name)
+    if index is None or index.library is not library:
+        if index is not None:
+            index.destroy()
+        index = _indexes[name] = NumericIndex(library, get_value)
+    return index
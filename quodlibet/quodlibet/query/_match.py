@@ -14,10 +14,13 @@ import operator
 
 from senf import fsn2text, fsnative
 
+from quodlibet import app
+from quodlibet import config
 from quodlibet.unisearch import compile
 from quodlibet.compat import floordiv, text_type
 from quodlibet.util import parse_date
 from quodlibet.formats import FILESYSTEM_TAGS, TIME_TAGS
+from ._index import get_numeric_index, bisect_first
 
 
 class error(ValueError):
@@ -39,6 +42,18 @@ class Node(object):
     def _unpack(self):
         return self
 
+    def _is_indexed(self):
+        """If filter() doesn't have to look at every song"""
+
+        return False
+
+    def _is_dynamic(self):
+        """If the result can change without the songs changing, like for
+        comparisons with the current time
+        """
+
+        return False
+
     def __or__(self, other):
         return NotImplemented
 
@@ -120,6 +135,9 @@ class Union(Node):
                 return True
         return False
 
+    def _is_dynamic(self):
+        return any(re._is_dynamic() for re in self.res)
+
     def __repr__(self):
         return "<Union %r>" % self.res
 
@@ -156,12 +174,21 @@ class Inter(Node):
 
     def filter(self, sequence):
         current = sequence
-        for re in self.res:
-            current = filter(re.search, current)
+        # Comparisons answered by an index first, they are the cheapest
+        # and the others then only have to look at the matching songs
+        res = sorted(self.res, key=lambda re: not re._is_indexed())
+        for re in res:
+            current = re.filter(current)
         if not isinstance(current, list):
             current = list(current)
         return current
 
+    def _is_indexed(self):
+        return any(re._is_indexed() for re in self.res)
+
+    def _is_dynamic(self):
+        return any(re._is_dynamic() for re in self.res)
+
     def __repr__(self):
         return "<Inter %r>" % self.res
 
@@ -192,6 +219,9 @@ class Neg(Node):
     def search(self, data):
         return not self.res.search(data)
 
+    def _is_dynamic(self):
+        return self.res._is_dynamic()
+
     def __repr__(self):
         return "<Neg %r>" % self.res
 
@@ -224,11 +254,30 @@ class Numcmp(Node):
         "!=": operator.ne,
     }
 
+    swapped = {
+        operator.lt: operator.gt,
+        operator.le: operator.ge,
+        operator.gt: operator.lt,
+        operator.ge: operator.le,
+        operator.eq: operator.eq,
+        operator.ne: operator.ne,
+    }
+
     def __init__(self, expr, op, expr2):
         self._expr = expr
         self._op = self.operators[op]
         self._expr2 = expr2
 
+        # For comparing a tag with a constant, like "added < 2 weeks ago",
+        # the tag, the operator with the tag on the left and the constant
+        self._indexed = None
+        if isinstance(expr, NumexprTag) and expr.is_indexable() and \
+                expr2.is_constant():
+            self._indexed = (expr, self._op, expr2)
+        elif isinstance(expr2, NumexprTag) and expr2.is_indexable() and \
+                expr.is_constant():
+            self._indexed = (expr2, self.swapped[self._op], expr)
+
     def search(self, data):
         time_ = time.time()
         use_date = self._expr.use_date() or self._expr2.use_date()
@@ -238,6 +287,82 @@ class Numcmp(Node):
             return self._op(val, val2)
         return False
 
+    def _is_indexed(self):
+        return self._indexed is not None and app.library is not None
+
+    def _is_dynamic(self):
+        return self._expr.is_dynamic() or self._expr2.is_dynamic()
+
+    def filter(self, sequence):
+        if not self._is_indexed():
+            return super(Numcmp, self).filter(sequence)
+
+        tag, op, const = self._indexed
+        index = tag.get_index(app.library)
+        if not isinstance(sequence, (list, tuple)):
+            sequence = list(sequence)
+        if len(sequence) * 4 < len(index):
+            # not worth it for a small part of the library
+            return super(Numcmp, self).filter(sequence)
+
+        time_ = time.time()
+        use_date = self._expr.use_date() or self._expr2.use_date()
+        value = const.evaluate(None, time_, use_date)
+        matches = self.__get_matches(index, tag, op, value, time_)
+
+        # Library songs without a value only match if the default does
+        default = tag.get_default()
+        default_matches = default is not None and \
+            op(tag.adjust(default, time_), value)
+
+        values = index.values
+        search = self.search
+        result = []
+        for song in sequence:
+            if song in matches:
+                result.append(song)
+            elif song not in values:
+                # not in the library, or not indexable
+                if search(song):
+                    result.append(song)
+            elif default_matches and values[song] is None:
+                result.append(song)
+        return result
+
+    @staticmethod
+    def __get_matches(index, tag, op, value, time_):
+        """Returns a set of all songs in `index` with a value for which
+        `op(value of the tag, value)` is True.
+        """
+
+        keys, songs = index.get_sorted()
+        adjust = tag.adjust
+        # The adjusted values are sorted as well, but in reverse for
+        # time tags (seconds since then)
+        if tag.is_reversed():
+            lo = bisect_first(keys, lambda v: adjust(v, time_) <= value)
+            hi = bisect_first(keys, lambda v: adjust(v, time_) < value, lo)
+            above, below = songs[:lo], songs[hi:]
+        else:
+            lo = bisect_first(keys, lambda v: adjust(v, time_) >= value)
+            hi = bisect_first(keys, lambda v: adjust(v, time_) > value, lo)
+            below, above = songs[:lo], songs[hi:]
+        equal = songs[lo:hi]
+
+        parts = {
+            operator.lt: [below],
+            operator.le: [below, equal],
+            operator.gt: [above],
+            operator.ge: [equal, above],
+            operator.eq: [equal],
+            operator.ne: [below, above],
+        }[op]
+
+        matches = set()
+        for part in parts:
+            matches.update(part)
+        return matches
+
     def __repr__(self):
         return "<Numcmp expr=%r, op=%r, expr2=%r>" % (
             self._expr, self._op.__name__, self._expr2)
@@ -270,34 +395,98 @@ class Numexpr(object):
         values instead of the number values."""
         return False
 
+    def is_constant(self):
+        """Returns whether the value doesn't depend on the audiofile"""
+        return False
+
+    def is_dynamic(self):
+        """Returns whether the value depends on the current time"""
+        return False
+
 
 class NumexprTag(Numexpr):
     """Numeric tag"""
 
+    INDEXED_TAGS = frozenset([
+        "added", "lastplayed", "laststarted", "mtime", "playcount",
+        "skipcount", "rating", "length", "filesize", "bitrate", "year",
+        "date"])
+    """Tags for which comparisons with constants use a sorted index"""
+
     def __init__(self, tag):
         self._tag = tag
         self._ftag = "~#" + self._tag
+        # Strip aggregate function from tag
+        func_start = self._ftag.find(":")
+        self._time_tag = \
+            (self._ftag[:func_start] if func_start >= 0 else self._ftag) \
+            in TIME_TAGS
+
+    def get_value(self, data):
+        """Returns the number for the audiofile before adjusting it or
+        None
+        """
 
-    def evaluate(self, data, time, use_date):
         if self._tag == 'date':
             date = data('date')
             if not date:
                 return None
             try:
-                num = parse_date(date)
+                return parse_date(date)
             except ValueError:
                 return None
-        else:
-            num = data(self._ftag, None)
+        return data(self._ftag, None)
+
+    def adjust(self, num, time):
+        """Returns the value for comparisons for a number returned by
+        get_value()
+        """
+
+        if self._time_tag:
+            num = time - num
+        return round(num, 2)
+
+    def evaluate(self, data, time, use_date):
+        num = self.get_value(data)
         if num is not None:
-            # Strip aggregate function from tag
-            func_start = self._ftag.find(":")
-            tag = self._ftag[:func_start] if func_start >= 0 else self._ftag
-            if tag in TIME_TAGS:
-                num = time - num
-            return round(num, 2)
+            return self.adjust(num, time)
+        return None
+
+    def is_indexable(self):
+        return self._tag in self.INDEXED_TAGS
+
+    def is_reversed(self):
+        """Whether adjust() decreases with increasing numbers"""
+
+        return self._time_tag
+
+    def is_dynamic(self):
+        # time tags are compared as the time passed since then
+        return self._time_tag
+
+    def get_default(self):
+        """Returns the number for indexed audiofiles without a value or
+        None if they have none
+        """
+
+        if self._tag == "rating":
+            return config.RATINGS.default
         return None
 
+    def __get_index_value(self, song):
+        if self._tag == "rating":
+            # the default rating can change, so only index set ones
+            return song.get(self._ftag)
+        return self.get_value(song)
+
+    def get_index(self, library):
+        """Returns a NumericIndex of get_value() for the songs in
+        `library`
+        """
+
+        return get_numeric_index(
+            library, self._ftag, self.__get_index_value)
+
     def __repr__(self):
         return "<NumexprTag tag=%r>" % self._tag
 
@@ -328,6 +517,12 @@ class NumexprUnary(Numexpr):
     def use_date(self):
         return self.__expr.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant()
+
+    def is_dynamic(self):
+        return self.__expr.is_dynamic()
+
 
 class NumexprBinary(Numexpr):
     """Binary numeric operation (like + or *)"""
@@ -378,6 +573,12 @@ class NumexprBinary(Numexpr):
     def use_date(self):
         return self.__expr.use_date() or self.__expr2.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant() and self.__expr2.is_constant()
+
+    def is_dynamic(self):
+        return self.__expr.is_dynamic() or self.__expr2.is_dynamic()
+
 
 class NumexprGroup(Numexpr):
     """Parenthesized group in numeric expression"""
@@ -394,6 +595,12 @@ class NumexprGroup(Numexpr):
     def use_date(self):
         return self.__expr.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant()
+
+    def is_dynamic(self):
+        return self.__expr.is_dynamic()
+
 
 class NumexprNumber(Numexpr):
     """Number in numeric expression"""
@@ -407,6 +614,9 @@ class NumexprNumber(Numexpr):
     def __repr__(self):
         return "<NumexprNumber value=%.2f>" % (self._value)
 
+    def is_constant(self):
+        return True
+
 
 class NumexprNow(Numexpr):
     """Current time, with optional offset"""
@@ -420,6 +630,12 @@ class NumexprNow(Numexpr):
     def __repr__(self):
         return "<NumexprNow offset=%r>" % (self.__offset)
 
+    def is_constant(self):
+        return True
+
+    def is_dynamic(self):
+        return True
+
 
 class NumexprNumberOrDate(Numexpr):
     """An ambiguous value like 2015-09-25 than can be interpreted as either
@@ -444,6 +660,9 @@ class NumexprNumberOrDate(Numexpr):
         return ('<NumexprNumberOrDate number=%r date=%r>' %
             (self.number, self.date))
 
+    def is_constant(self):
+        return True
+
 
 def numexprUnit(value, unit):
     """Process numeric units and return NumexprNumber"""
@@ -593,6 +812,17 @@ class Extension(Node):
     def search(self, data):
         return self.__valid and self.__plugin.search(data, self.__body)
 
+    def _is_dynamic(self):
+        # plugins can do anything
+        return True
+
+    def filter(self, sequence):
+        if not self.__valid:
+            return []
+        if self.__plugin.filter is None:
+            return super(Extension, self).filter(sequence)
+        return self.__plugin.filter(sequence, self.__body)
+
     def __repr__(self):
         return ('<Extension name=%r valid=%r body=%r>'
                 % (self.__name, self.__valid, self.__body))
@@ -127,6 +127,13 @@ class Query(Node):
         """Whether the text can be parsed at all"""
         return self.type is not QueryType.INVALID
 
+    @property
+    def is_dynamic(self):
+        """Whether the result can change without the songs changing, like
+        for comparisons with the current time or query plugins
+        """
+        return self._match._is_dynamic()
+
     def _unpack(self):
         # so that other classes can see the wrapped one and optimize
         # the result using the type information
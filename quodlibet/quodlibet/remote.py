@@ -7,15 +7,21 @@
 # (at your option) any later version.
 
 import os
+import socket
+from collections import deque
 
 from senf import path2fsn, fsn2bytes, bytes2fsn, fsnative
 
-from quodlibet.util import fifo, print_w
+from quodlibet.util import fifo, print_w, print_exc
 from quodlibet import get_user_dir
 try:
     from quodlibet.util import winpipe
 except ImportError:
     winpipe = None
+if hasattr(socket, "AF_UNIX"):
+    from quodlibet.util import unixsocket
+else:
+    unixsocket = None
 
 
 class RemoteError(Exception):
@@ -160,7 +166,210 @@ class QuodLibetUnixRemote(RemoteBase):
                         h.write(fsn2bytes(response, None))
 
 
+class _SocketClient(object):
+    """State of one connection to QuodLibetSocketRemote"""
+
+    CHUNK_LINES = 200
+    """Max lines to write at once, so long responses don't block the UI"""
+
+    def __init__(self, remote, sock):
+        self._remote = remote
+        self._commands = deque()
+        self._events = deque()
+        self._response = None
+        self.subscribed = False
+        self.conn = unixsocket.LineConnection(
+            sock, self._on_line, self._produce, self._on_close)
+
+    def send_event(self, line):
+        self._events.append(line)
+        self.conn.resume()
+
+    def _on_line(self, conn, line):
+        if line:
+            self._commands.append(line)
+            conn.resume()
+
+    def _on_close(self, conn):
+        self._remote._client_closed(self)
+
+    def _produce(self, conn):
+        lines = []
+        while len(lines) < self.CHUNK_LINES:
+            if self._response is None:
+                # events only between responses
+                while self._events:
+                    lines.append(self._events.popleft())
+                if not self._commands:
+                    break
+                self._response = self._remote._respond(
+                    self, self._commands.popleft())
+            try:
+                lines.append(next(self._response))
+            except StopIteration:
+                self._response = None
+        conn.write(b"".join(lines))
+        return bool(self._response or self._commands or self._events)
+
+
+class QuodLibetSocketRemote(RemoteBase):
+    """An optional remote using a Unix domain socket.
+
+    Clients can keep the connection open and send any number of
+    newline-terminated commands without waiting for the responses in
+    between. The responses are sent in the same order, each consisting of
+    zero or more data lines followed by a status line:
+
+        D <line of output>
+        OK
+        ERR <message>
+
+    Output lines are sent while the command produces them, so large
+    results (e.g. print-query) don't have to be built in memory first.
+
+    After "subscribe" player events get sent between responses until
+    "unsubscribe":
+
+        EVENT song-started <uri>
+        EVENT song-ended
+        EVENT paused
+        EVENT unpaused
+        EVENT seek <position in ms>
+        EVENT volume <0.0 - 1.0>
+    """
+
+    _SOCKET_NAME = "control.sock"
+    _PATH = os.path.join(get_user_dir(), _SOCKET_NAME)
+
+    def __init__(self, app, cmd_registry):
+        self._app = app
+        self._cmd_registry = cmd_registry
+        self._server = unixsocket.UnixSocketServer(self._PATH, self._accept)
+        self._clients = []
+        self._player_ids = []
+
+    @classmethod
+    def remote_exists(cls):
+        return unixsocket.socket_exists(cls._PATH)
+
+    @classmethod
+    def send_message(cls, message):
+        assert isinstance(message, fsnative)
+
+        try:
+            client = unixsocket.UnixSocketClient(cls._PATH)
+            try:
+                client.send_line(fsn2bytes(message, None))
+                lines = []
+                while True:
+                    line = client.read_line()
+                    if line.startswith(b"D "):
+                        lines.append(line[2:] + b"\n")
+                    elif line == b"OK":
+                        break
+                    elif line.startswith(b"ERR "):
+                        raise RemoteError(line[4:].decode("utf-8", "replace"))
+            finally:
+                client.close()
+        except EnvironmentError as e:
+            raise RemoteError(e)
+
+        if lines:
+            return bytes2fsn(b"".join(lines), None)
+
+    def start(self):
+        try:
+            self._server.start()
+        except unixsocket.UnixSocketError as e:
+            raise RemoteError(e)
+
+    def stop(self):
+        self._server.stop()
+        for client in list(self._clients):
+            client.conn.close()
+
+    def _accept(self, sock):
+        self._clients.append(_SocketClient(self, sock))
+
+    def _client_closed(self, client):
+        self._clients.remove(client)
+        self._set_subscribed(client, False)
+
+    def _respond(self, client, line):
+        """Runs the command and yields the response lines"""
+
+        from quodlibet.commands import CommandError
+
+        command = bytes2fsn(line, None)
+        name, args = self._cmd_registry.parse_line(command)
+
+        if name in ("subscribe", "unsubscribe") and not args:
+            self._set_subscribed(client, name == "subscribe")
+            yield b"OK\n"
+            return
+
+        try:
+            for output in self._cmd_registry.run_lines(
+                    self._app, name, *args):
+                yield b"D " + fsn2bytes(output, None) + b"\n"
+        except Exception as e:
+            if not isinstance(e, CommandError):
+                print_exc()
+            message = str(e).replace("\n", " ").encode("utf-8", "replace")
+            yield b"ERR " + message + b"\n"
+        else:
+            yield b"OK\n"
+
+    def _set_subscribed(self, client, value):
+        client.subscribed = value
+        subscribed = any(c.subscribed for c in self._clients)
+        player = self._app.player
+
+        if subscribed and not self._player_ids:
+            self._player_ids = [
+                player.connect("song-started", self._on_song_started),
+                player.connect("song-ended", self._on_event, "song-ended"),
+                player.connect("paused", self._on_event, "paused"),
+                player.connect("unpaused", self._on_event, "unpaused"),
+                player.connect("seek", self._on_seek),
+                player.connect("notify::volume", self._on_volume),
+            ]
+        elif not subscribed and self._player_ids:
+            for id_ in self._player_ids:
+                player.disconnect(id_)
+            del self._player_ids[:]
+
+    def _send_event(self, *args):
+        line = b" ".join((b"EVENT",) + args) + b"\n"
+        for client in self._clients:
+            if client.subscribed:
+                client.send_event(line)
+
+    def _on_song_started(self, player, song):
+        if song is None:
+            self._send_event(b"song-started")
+        else:
+            self._send_event(
+                b"song-started", song("~uri").encode("utf-8"))
+
+    def _on_event(self, player, *args):
+        name = args[-1]
+        self._send_event(name.encode("ascii"))
+
+    def _on_seek(self, player, song, ms):
+        self._send_event(b"seek", str(ms).encode("ascii"))
+
+    def _on_volume(self, player, *args):
+        self._send_event(
+            b"volume", ("%0.3f" % player.volume).encode("ascii"))
+
+
 if os.name == "nt":
     Remote = QuodLibetWinRemote
 else:
     Remote = QuodLibetUnixRemote
+
+if unixsocket is not None:
+    SocketRemote = QuodLibetSocketRemote
+else:
+    SocketRemote = None
@@ -15,6 +15,7 @@ from quodlibet.util import re_escape
 from quodlibet.compat import text_type, xrange, unichr
 
 from .db import get_replacement_mapping
+from .shadow import get_shadow
 
 
 def _fixup_literal(literal, in_seq, mapping):
@@ -264,6 +265,24 @@ def re_add_variants(text):
     return re_replace_literals(text, get_replacement_mapping())
 
 
+def _get_literal(pattern):
+    """Returns the text matched by the regex if it only consists of
+    literals, otherwise None
+    """
+
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+
+    literals = []
+    for op, av in parsed:
+        if str(op).lower() != "literal":
+            return None
+        literals.append(unichr(av))
+    return u"".join(literals)
+
+
 def compile(pattern, ignore_case=True, dot_all=False, asym=False):
     """
     Args:
@@ -283,6 +302,13 @@ def compile(pattern, ignore_case=True, dot_all=False, asym=False):
     pattern = unicodedata.normalize("NFC", pattern)
 
     if asym:
+        # plain text can be searched in the folded text directly
+        literal = _get_literal(pattern)
+        if literal is not None:
+            search = get_shadow(ignore_case).get_search(literal)
+            if search is not None:
+                return search
+
         try:
             pattern = re_add_variants(pattern)
         except NotImplementedError:
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""
+Folded "shadow" versions of texts for fast asymmetric search.
+
+Instead of expanding each ASCII character of the pattern into a character
+class containing all its variants (see re_add_variants) we map all
+variants in the searched text to their ASCII character and search the
+pattern as a plain substring:
+
+    get_shadow(True).fold(u"Föhn") => u"fohn"
+
+The folded texts are cached, so each tag value only gets folded once and
+changed values simply get a new entry.
+
+This only works if the result is the same as with the expanded regex,
+which is the case for ASCII-only literal patterns which don't contain any
+multi character sequence with variants (e.g. "ae" -> "æ") and no
+character of which a variant is also a variant of another character.
+Otherwise get_search() returns None and the regex has to be used.
+"""
+
+import re
+import unicodedata
+
+from quodlibet.util import cached_func, re_escape
+from quodlibet.compat import iteritems, text_type, unichr, xrange
+
+from .db import get_replacement_mapping
+
+
+SHADOW_CACHE_SIZE = 250000
+"""Number of folded texts to keep before starting over"""
+
+
+class Shadow(object):
+    """Maps text to a folded version in which all variants of ASCII
+    characters are replaced by the ASCII character.
+    """
+
+    def __init__(self, ignore_case):
+        self.ignore_case = ignore_case
+        self._cache = {}
+
+        mapping = get_replacement_mapping()
+        ascii_ = [unichr(i) for i in xrange(0x20, 0x7f)]
+
+        # everything that could possibly match one of the ascii chars
+        members = set(ascii_)
+        for key, values in iteritems(mapping):
+            if len(key) == 1:
+                members.add(key)
+                members.update(values)
+        candidates = set(members)
+        if ignore_case:
+            for i in xrange(0x10000):
+                u = unichr(i)
+                if u.lower() in members or u.upper() in members:
+                    candidates.add(u)
+        candidates = u"".join(sorted(candidates))
+
+        # let the regex engine decide what matches each ascii char, so we
+        # get the same results as with the expanded regex
+        flags = re.UNICODE
+        if ignore_case:
+            flags |= re.IGNORECASE
+        matches = {}
+        matched_by = {}
+        for c in ascii_:
+            reg = re.compile(
+                u"[%s]" % re_escape(c + u"".join(mapping.get(c, []))), flags)
+            target = c.lower() if ignore_case else c
+            found = matched_by[c] = set(reg.findall(candidates))
+            for u in found:
+                matches.setdefault(u, set()).add(target)
+
+        self.table = {}
+        ambiguous = set()
+        for u, targets in iteritems(matches):
+            if len(targets) == 1:
+                target = targets.pop()
+                if target != u:
+                    self.table[ord(u)] = target
+            else:
+                ambiguous.update(targets)
+
+        safe = set()
+        for c in ascii_:
+            if ignore_case:
+                # Both cases get folded to the lower case char, so this
+                # is only correct if c matches everything the other case
+                # matches (e.g. "h" matches "ẖ" but "H" doesn't)
+                if c.lower() in ambiguous or \
+                        matched_by[c] != matched_by[c.swapcase()] | \
+                        matched_by[c]:
+                    continue
+            elif c in ambiguous:
+                continue
+            safe.add(c)
+        self.safe = frozenset(safe)
+
+        # Replace ligatures and the like with the sequence they stand for,
+        # e.g. "ﬆ" -> "st". In contrast to the regex this also allows
+        # "s" to match "ﬆ", which is fine for searching.
+        expansions = {}
+        for key, values in iteritems(mapping):
+            if len(key) == 1 or not self.safe.issuperset(key):
+                continue
+            target = key.lower() if ignore_case else key
+            variants = set(values)
+            if ignore_case:
+                for v in values:
+                    variants.update(
+                        u for u in (v.lower(), v.upper()) if len(u) == 1)
+            for u in variants:
+                expansions.setdefault(u, set()).add(target)
+
+        self.sequences = []
+        for key, values in iteritems(mapping):
+            if len(key) == 1:
+                continue
+            usable = self.safe.issuperset(key) and all(
+                v not in matches and len(expansions[v]) == 1 for v in values)
+            if not usable:
+                # the text won't contain it, use the regex
+                self.sequences.append(key)
+
+        for u, targets in iteritems(expansions):
+            if u not in matches and len(targets) == 1:
+                self.table[ord(u)] = targets.pop()
+
+    def fold(self, text):
+        """Returns the folded version of text.
+
+        Can be used from multiple threads, every cache access is a single
+        dict operation and the entries only depend on their key.
+        """
+
+        cache = self._cache
+        try:
+            return cache[text]
+        except KeyError:
+            if len(cache) >= SHADOW_CACHE_SIZE:
+                cache.clear()
+            folded = cache[text] = unicodedata.normalize(
+                "NFC", text).translate(self.table)
+            return folded
+
+    def get_search(self, literal):
+        """Returns a callable which returns True if the literal text is
+        contained in the passed text, or None if it can't be searched
+        using the shadow.
+        """
+
+        assert isinstance(literal, text_type)
+
+        for sequence in self.sequences:
+            if sequence in literal:
+                return None
+
+        if not self.safe.issuperset(literal):
+            return None
+
+        if self.ignore_case:
+            literal = literal.lower()
+
+        cache = self._cache
+        fold = self.fold
+
+        def search(text):
+            try:
+                return literal in cache[text]
+            except KeyError:
+                return literal in fold(text)
+
+        return search
+
+    def clear(self):
+        """Forget all folded texts"""
+
+        self._cache.clear()
+
+
+@cached_func
+def _get_shadow_ignore_case():
+    return Shadow(True)
+
+
+@cached_func
+def _get_shadow_case():
+    return Shadow(False)
+
+
+def get_shadow(ignore_case):
+    """Returns the shared Shadow instance"""
+
+    if ignore_case:
+        return _get_shadow_ignore_case()
+    return _get_shadow_case()
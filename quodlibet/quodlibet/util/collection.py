@@ -12,7 +12,9 @@ from __future__ import absolute_import
 
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 
+from gi.repository import GLib
 from senf import fsnative, fsn2bytes, bytes2fsn
 
 from quodlibet import ngettext, _
@@ -24,7 +26,8 @@ from quodlibet.compat import xrange, text_type, number_types, string_types, \
     swap_to_string, listmap
 from collections import Iterable
 from quodlibet.util.path import escape_filename, unescape_filename
-from quodlibet.util.dprint import print_d
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.util.atomic import atomic_save
 from quodlibet.util.misc import total_ordering, hashable
 from .collections import HashedList
 
@@ -310,6 +313,19 @@ class Album(Collection):
         self.__dict__.pop("peoplesort", None)
         self.__dict__.pop("genre", None)
 
+    def snapshot(self):
+        """Returns a new Album containing the current songs. It has its own
+        caches, so it can be searched in another thread while this one
+        gets changed or used.
+        """
+
+        album = Album.__new__(Album)
+        Collection.__init__(album)
+        album.songs = set(self.songs)
+        album.sort = self.sort
+        album.key = self.key
+        return album
+
     def __repr__(self):
         return "Album(%s)" % repr(self.key)
 
@@ -324,13 +340,16 @@ class Playlist(Collection, Iterable):
 
     __instances = []
 
+    read_only = False
+    """Whether the songs can't be changed by the user"""
+
     @classmethod
     def playlists_featuring(cls, song):
         """Returns the list of playlists in which this song appears"""
 
         playlists = []
         for instance in cls.__instances:
-            if song in instance._list:
+            if instance.has_songs([song])[0]:
                 playlists.append(instance)
         return playlists
 
@@ -497,6 +516,9 @@ class Playlist(Collection, Iterable):
 
     def delete(self):
         self.clear()
+        self._unregister()
+
+    def _unregister(self):
         if self in self.__instances:
             self.__instances.remove(self)
 
@@ -534,12 +556,41 @@ class Playlist(Collection, Iterable):
         return u"\"%s\" (%s)" % (self.name, songs_text)
 
 
+_writer = None
+
+
+def _get_writer():
+    """Returns the (shared) executor used for writing playlist files.
+    A single worker makes sure writes happen in order.
+    """
+
+    global _writer
+
+    if _writer is None:
+        _writer = ThreadPoolExecutor(1)
+    return _writer
+
+
+def _write_playlist_file(filename, data):
+    with atomic_save(filename, "wb") as f:
+        f.write(data)
+
+
 class FileBackedPlaylist(Playlist):
-    """A `Playlist` that is stored as a file on disk"""
+    """A `Playlist` that is stored as a file on disk.
+
+    The file gets read and its entries get resolved against the library
+    when created, the list itself only gets built on first access.
+    """
 
     quote = staticmethod(escape_filename)
     unquote = staticmethod(unescape_filename)
 
+    WRITE_DELAY = 1000
+    """Time in ms write_later() waits for more changes before writing"""
+
+    __pending = set()
+
     def __init__(self, dir, name, library=None, validate=False):
         assert isinstance(dir, fsnative)
         super(FileBackedPlaylist, self).__init__(name, library)
@@ -548,28 +599,103 @@ class FileBackedPlaylist(Playlist):
         if validate:
             self.name = self._validated_name(name)
         self._last_fn = self.filename
-        self.__populate_from_file()
+        self.__list = None
+        self.__entries = []
+        self.__entry_set = None
+        self.__write_id = None
+        self.__future = None
+        self.__read_file()
 
-    def __populate_from_file(self):
-        library = self.library
+    @property
+    def _list(self):
+        if self.__list is None:
+            self.__list = HashedList()
+            self.__populate()
+        return self.__list
+
+    @_list.setter
+    def _list(self, value):
+        self.__list = value
+
+    @property
+    def is_loaded(self):
+        """If the entries have been resolved against the library"""
+
+        return self.__list is not None
+
+    def __read_file(self):
         try:
             with open(self.filename, "rb") as h:
-                for line in h:
-                    assert library is not None
-                    try:
-                        line = bytes2fsn(line.rstrip(), "utf-8")
-                    except ValueError:
-                        # decoding failed
-                        continue
-                    if line in library:
-                        self._list.append(library[line])
-                    elif library and library.masked(line):
-                        self._list.append(line)
+                lines = h.read().splitlines()
         except IOError:
             if self.name:
                 util.print_d(
                     "Playlist '%s' not found, creating new." % self.name)
+                self.__list = HashedList()
                 self.write()
+        else:
+            self.__entries = self.__resolve(lines)
+
+    def __resolve(self, lines):
+        """Returns the library songs for all lines, or the file name in
+        case it is masked.
+
+        This is done right away and not on first access, so songs
+        renamed in the meantime are still found.
+        """
+
+        library = self.library
+        entries = []
+        for line in lines:
+            assert library is not None
+            try:
+                line = bytes2fsn(line.rstrip(), "utf-8")
+            except ValueError:
+                # decoding failed
+                continue
+            if line in library:
+                entries.append(library[line])
+            elif library and library.masked(line):
+                entries.append(line)
+        return entries
+
+    def __populate(self):
+        library = self.library
+        entries, self.__entries = self.__entries, []
+        self.__entry_set = None
+        for entry in entries:
+            if isinstance(entry, string_types) and entry in library:
+                # unmasked in the meantime
+                entry = library[entry]
+            self.__list.append(entry)
+
+    def __may_contain(self, songs):
+        """False if none of the songs is in the not yet loaded file"""
+
+        if self.__entry_set is None:
+            self.__entry_set = set(self.__entries)
+        entries = self.__entry_set
+        for song in songs:
+            if song in entries:
+                return True
+        return False
+
+    def add_songs(self, filenames, library):
+        if not self.is_loaded:
+            # masked entries get resolved when loading
+            return False
+        return super(FileBackedPlaylist, self).add_songs(filenames, library)
+
+    def remove_songs(self, songs, leave_dupes=False):
+        if not self.is_loaded and not self.__may_contain(songs):
+            return False
+        return super(FileBackedPlaylist, self).remove_songs(
+            songs, leave_dupes)
+
+    def has_songs(self, songs):
+        if not self.is_loaded and not self.__may_contain(songs):
+            return False, False
+        return super(FileBackedPlaylist, self).has_songs(songs)
 
     @classmethod
     def new(cls, dir_, base=_("New Playlist"), library=None):
@@ -610,6 +736,8 @@ class FileBackedPlaylist(Playlist):
 
     def delete(self):
         super(FileBackedPlaylist, self).delete()
+        self.__cancel_write()
+        self.__wait()
         self.__delete_file(self.filename)
 
     @classmethod
@@ -619,14 +747,92 @@ class FileBackedPlaylist(Playlist):
         except EnvironmentError:
             pass
 
+    def __dump(self):
+        lines = []
+        for song in self._list:
+            if isinstance(song, string_types):
+                lines.append(fsn2bytes(song, "utf-8"))
+            else:
+                lines.append(fsn2bytes(song("~filename"), "utf-8"))
+        lines.append(b"")
+        return b"\n".join(lines)
+
+    def __cancel_write(self):
+        if self.__write_id is not None:
+            GLib.source_remove(self.__write_id)
+            self.__write_id = None
+        self.__pending.discard(self)
+
+    def __wait(self):
+        """Wait until a background write has finished"""
+
+        if self.__future is not None:
+            self.__future.exception()
+            self.__future = None
+
+    def write_later(self):
+        """Write the playlist in the background once it hasn't changed
+        for WRITE_DELAY ms. Use flush() to write it right away.
+        """
+
+        if self.__write_id is not None:
+            GLib.source_remove(self.__write_id)
+        self.__write_id = GLib.timeout_add(
+            self.WRITE_DELAY, self.__write_timeout)
+        self.__pending.add(self)
+
+    def __write_timeout(self):
+        self.__write_id = None
+        self.__pending.discard(self)
+
+        if self._last_fn != self.filename:
+            # renamed in the meantime, write() has to clean up
+            self.write()
+            return False
+
+        fn = self.filename
+        name = self.name
+
+        def done(future):
+            if future.exception() is not None:
+                print_w("Couldn't save playlist %r: %s" % (
+                    name, future.exception()))
+
+        print_d("Writing playlist %r in the background" % name)
+        self.__future = _get_writer().submit(
+            _write_playlist_file, fn, self.__dump())
+        self.__future.add_done_callback(done)
+        return False
+
+    def flush(self):
+        """Write pending changes now"""
+
+        if self.__write_id is not None:
+            self.write()
+        else:
+            self.__wait()
+
+    @classmethod
+    def flush_all(cls):
+        """Write all pending changes and wait for background writes"""
+
+        for playlist in list(cls.__pending):
+            playlist.flush()
+        if _writer is not None:
+            _writer.submit(lambda: None).result()
+
     def write(self):
+        """Write the playlist right away.
+
+        Raises:
+            EnvironmentError
+        """
+
+        self.__cancel_write()
+        self.__wait()
+
         fn = self.filename
-        with open(fn, "wb") as f:
-            for song in self._list:
-                if isinstance(song, string_types):
-                    f.write(fsn2bytes(song, "utf-8") + b"\n")
-                else:
-                    f.write(fsn2bytes(song("~filename"), "utf-8") + b"\n")
+        _write_playlist_file(fn, self.__dump())
         if self._last_fn != fn:
             self.__delete_file(self._last_fn)
             self._last_fn = fn
@@ -23,6 +23,7 @@ from __future__ import absolute_import
 
 import os
 import csv
+import weakref
 import collections
 
 try:
@@ -69,13 +70,67 @@ class Config(object):
         """
 
         self._config = ConfigParser(dict_type=_sorted_dict)
+        self._change_callbacks = []
+        self._cached = {}
         self.defaults = None
         if _defaults:
             self.defaults = Config(_defaults=False)
+            self.defaults.register_change_callback(self._changed)
         self._version = version
         self._loaded_version = None
         self._upgrade_funcs = []
 
+    def _changed(self, section, option):
+        """Invalidates cached values and notifies listeners. If section and
+        option are None everything might have changed.
+        """
+
+        if section is None:
+            for values in list(self._cached.values()):
+                for value in list(values):
+                    value._invalidate()
+        else:
+            values = self._cached.get((section, option))
+            if values:
+                for value in list(values):
+                    value._invalidate()
+
+        for func in list(self._change_callbacks):
+            func(section, option)
+
+    def register_change_callback(self, function):
+        """Register a function that gets called after an option has been
+        changed, removed or reset, or after its default has changed.
+
+        function(section: str or None, option: str or None) -> None
+
+        If both are None (after read() and clear()) any option might have
+        changed.
+        """
+
+        self._change_callbacks.append(function)
+        return function
+
+    def unregister_change_callback(self, function):
+        """Remove a function registered with register_change_callback()"""
+
+        self._change_callbacks.remove(function)
+
+    def cached(self, section, option, getter="get", default=_DEFAULT):
+        """Returns a `CachedValue` for the option.
+
+        getter is the name of the method used for reading the value,
+        e.g. "getboolean", "gettext" or "getstringlist".
+        """
+
+        value = CachedValue(self, section, option, getter, default)
+        key = (section, option)
+        values = self._cached.get(key)
+        if values is None:
+            values = self._cached[key] = weakref.WeakSet()
+        values.add(value)
+        return value
+
     def _do_upgrade(self, func):
         assert self._loaded_version is not None
         assert self._version is not None
@@ -128,6 +183,8 @@ class Config(object):
             self._config.remove_option(section, option)
         except NoSectionError:
             pass
+        else:
+            self._changed(section, option)
 
     def options(self, section):
         """Returns a list of options available in the specified section."""
@@ -334,6 +391,7 @@ class Config(object):
                 self._config.set(section, option, value)
             else:
                 raise
+        self._changed(section, option)
 
     def settext(self, section, option, value):
         value = text_type(value)
@@ -386,6 +444,7 @@ class Config(object):
 
         for section in self._config.sections():
             self._config.remove_section(section)
+        self._changed(None, None)
 
     def is_empty(self):
         """Whether the config has any sections"""
@@ -408,6 +467,8 @@ class Config(object):
         except (IOError, OSError):
             return
 
+        self._changed(None, None)
+
         # don't upgrade if we just created a new config
         if self._version is not None:
             self._loaded_version = self.getint("__config__", "version", -1)
@@ -432,7 +493,10 @@ class Config(object):
         Can raise Error.
         """
 
-        return self._config.remove_option(section, option)
+        removed = self._config.remove_option(section, option)
+        if removed:
+            self._changed(section, option)
+        return removed
 
     def add_section(self, section):
         """Add a section named section to the instance if it not already
@@ -442,6 +506,48 @@ class Config(object):
             self._config.add_section(section)
 
 
+class CachedValue(object):
+    """The value of a config option, read on first access and kept until
+    the option (or its default) changes.
+
+    Use Config.cached() to create one. Meant for code paths where the
+    option is read for every song or row, e.g.
+
+        FORMAT = config.cached("settings", "format", "gettext")
+        ...
+        text = FORMAT.value
+
+    Mutable values (lists) are shared and must not be modified.
+    """
+
+    __slots__ = ("section", "option", "_get", "_default", "_value", "_valid",
+                 "__weakref__")
+
+    def __init__(self, config, section, option, getter, default):
+        self.section = section
+        self.option = option
+        self._get = getattr(config, getter)
+        self._default = default
+        self._value = None
+        self._valid = False
+
+    @property
+    def value(self):
+        """The current value, raises Error like the getter in case there
+        is no default"""
+
+        if not self._valid:
+            value = self._get(self.section, self.option, self._default)
+            self._value = value
+            self._valid = True
+            return value
+        return self._value
+
+    def _invalidate(self):
+        # Keep the old value, so a concurrent reader never sees None
+        self._valid = False
+
+
 class ConfigProxy(object):
     """Provides a Config object with a fixed section and a possibility to
     prefix option names in that section.
@@ -477,7 +583,8 @@ class ConfigProxy(object):
 
         # methods starting with a section arg
         for name in ["get", "set", "getboolean", "getint", "getfloat",
-                     "reset", "settext", "gettext", "getbytes", "setbytes"]:
+                     "reset", "settext", "gettext", "getbytes", "setbytes",
+                     "cached"]:
             setattr(cls, name, get_func(name))
 
 ConfigProxy._init_wrappers()
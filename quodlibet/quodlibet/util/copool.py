@@ -8,19 +8,59 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-"""Manage a pool of routines using Python iterators."""
+"""Manage a pool of routines using Python iterators.
+
+Routines without a timeout don't get their own idle source but are run by
+a shared scheduler: In each main loop iteration it steps the routines with
+the highest priority, the one which used the least time first, until
+FRAME_BUDGET is used up. Routines can therefore yield often without extra
+overhead and many concurrent routines together can't block the UI for
+longer than one (slow) step.
+"""
+
+import time
+from collections import namedtuple
 
 from gi.repository import GLib
 
-from quodlibet.compat import PY2, listkeys
+from quodlibet.compat import PY2, listkeys, iteritems
+from quodlibet.util.dprint import print_d, print_exc
+from quodlibet.util import instrument
+
+
+FRAME_BUDGET = 0.008
+"""Time in seconds the scheduler can use per main loop iteration, leaving
+half of a frame at 60 FPS for input handling and drawing"""
+
+_timer = getattr(time, "perf_counter", time.time)
+
+
+RoutineStats = namedtuple("RoutineStats", ["time", "steps", "longest_step"])
+"""Time in seconds a routine spent running, the number of steps taken and
+the time of the longest step"""
+
+
+def _get_name(funcid):
+    return getattr(funcid, "__qualname__", None) or \
+        getattr(funcid, "__name__", None) or str(funcid)
 
 
 class _Routine(object):
 
     def __init__(self, pool, func, funcid, priority, timeout, args, kwargs):
+        self.funcid = funcid
+        self.name = _get_name(funcid)
         self.priority = priority
         self.timeout = timeout
+        self._pool = pool
         self._source_id = None
+        self._scheduled = False
+
+        self.time = 0.0
+        self.steps = 0
+        self.longest_step = 0.0
+        # the time used compared to the other scheduled routines
+        self.vtime = 0.0
 
         def wrap(func, funcid, args, kwargs):
             for value in func(*args, **kwargs):
@@ -35,12 +75,29 @@ class _Routine(object):
     def paused(self):
         """If the routine is currently running"""
 
-        return self._source_id is None
+        return self._source_id is None and not self._scheduled
+
+    @property
+    def stats(self):
+        return RoutineStats(self.time, self.steps, self.longest_step)
 
     def step(self):
         """Raises StopIteration if the routine has nothing more to do"""
 
-        return self.source_func()
+        start = _timer()
+        try:
+            return self.source_func()
+        finally:
+            took = _timer() - start
+            self.time += took
+            self.vtime += took
+            self.steps += 1
+            instrument.record("copool", self.name, took)
+            if took > self.longest_step:
+                self.longest_step = took
+                if took > FRAME_BUDGET * 4:
+                    print_d("%r blocked the main loop for %d ms" % (
+                        self.funcid, took * 1000))
 
     def resume(self):
         """Resume, if already running do nothing"""
@@ -50,10 +107,10 @@ class _Routine(object):
 
         if self.timeout:
             self._source_id = GLib.timeout_add(
-                self.timeout, self.source_func, priority=self.priority)
+                self.timeout, self.step, priority=self.priority)
         else:
-            self._source_id = GLib.idle_add(
-                self.source_func, priority=self.priority)
+            self._scheduled = True
+            self._pool._scheduler.add(self)
 
     def pause(self):
         """Pause, if already paused, do nothing"""
@@ -61,14 +118,98 @@ class _Routine(object):
         if self.paused:
             return
 
-        GLib.source_remove(self._source_id)
+        if self._scheduled:
+            self._scheduled = False
+            self._pool._scheduler.remove(self)
+        else:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+
+
+class _Scheduler(object):
+    """Runs routines in one idle source, using at most FRAME_BUDGET
+    per main loop iteration.
+
+    Only routines with the highest priority get run, between them the
+    one with the least used time (since being scheduled) goes first.
+    """
+
+    def __init__(self):
+        self._routines = []
+        self._source_id = None
+        self._priority = None
+        self._running = False
+
+    def add(self, routine):
+        # start where the others are, so a new or resumed routine
+        # doesn't get to catch up on time it wasn't running
+        others = [r.vtime for r in self._routines
+                  if r.priority == routine.priority]
+        if others:
+            routine.vtime = max(routine.vtime, min(others))
+        self._routines.append(routine)
+        self._update_source()
+
+    def remove(self, routine):
+        self._routines.remove(routine)
+        self._update_source()
+
+    def _get_priority(self):
+        if not self._routines:
+            return None
+        return min(r.priority for r in self._routines)
+
+    def _update_source(self):
+        if self._running:
+            # _run takes care of it
+            return
+
+        priority = self._get_priority()
+        if priority == self._priority:
+            return
+
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+        self._priority = priority
+        if priority is not None:
+            self._source_id = GLib.idle_add(self._run, priority=priority)
+
+    def _run(self):
+        self._running = True
+        try:
+            deadline = _timer() + FRAME_BUDGET
+            priority = self._priority
+            while self._get_priority() == priority:
+                routine = min(
+                    (r for r in self._routines if r.priority == priority),
+                    key=lambda r: r.vtime)
+                try:
+                    routine.step()
+                except Exception:
+                    print_exc()
+                    if routine in self._routines:
+                        routine._pool.remove(routine.funcid)
+                if _timer() >= deadline:
+                    break
+        finally:
+            self._running = False
+
+        if self._get_priority() == self._priority:
+            return True
+
+        # priority changed or nothing left, replace this source
         self._source_id = None
+        self._priority = None
+        self._update_source()
+        return False
 
 
 class CoPool(object):
 
     def __init__(self):
         self.__routines = {}
+        self._scheduler = _Scheduler()
 
     def add(self, func, *args, **kwargs):
         """Register a routine to run in GLib main loop.
@@ -90,7 +231,7 @@ class CoPool(object):
 
         funcid = kwargs.pop("funcid", func)
         if funcid in self.__routines:
-            remove(funcid)
+            self.remove(funcid)
 
         priority = kwargs.pop("priority", GLib.PRIORITY_LOW)
         timeout = kwargs.pop("timeout", None)
@@ -141,6 +282,18 @@ class CoPool(object):
         routine = self._get(funcid)
         return routine.step()
 
+    def get_stats(self, funcid):
+        """Returns the `RoutineStats` of a registered routine"""
+
+        return self._get(funcid).stats
+
+    def get_all_stats(self):
+        """Returns a dict of funcid -> `RoutineStats` for all registered
+        routines
+        """
+
+        return dict((k, r.stats) for k, r in iteritems(self.__routines))
+
 
 # global instance
 
@@ -153,3 +306,5 @@ remove = _copool.remove
 remove_all = _copool.remove_all
 resume = _copool.resume
 step = _copool.step
+get_stats = _copool.get_stats
+get_all_stats = _copool.get_all_stats
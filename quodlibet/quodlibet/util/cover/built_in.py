@@ -20,12 +20,18 @@ from quodlibet.util.dprint import print_w
 from quodlibet import config
 
 
+_PREFER_EMBEDDED = config.cached(
+    "albumart", "prefer_embedded", "getboolean", False)
+_FORCE_FILENAME = config.cached("albumart", "force_filename", "getboolean")
+_FILENAME = config.cached("albumart", "filename")
+
+
 def get_ext(s):
     return os.path.splitext(s)[1].lstrip('.')
 
 
 def prefer_embedded():
-    return config.getboolean("albumart", "prefer_embedded", False)
+    return _PREFER_EMBEDDED.value
 
 
 class EmbeddedCover(CoverSourcePlugin):
@@ -95,15 +101,14 @@ class FilesystemCover(CoverSourcePlugin):
         images = []
 
         # Issue 374: Specify artwork filename
-        if config.getboolean("albumart", "force_filename"):
-            escaped_path = os.path.join(glob.escape(base),
-                                        config.get("albumart", "filename"))
+        if _FORCE_FILENAME.value:
+            escaped_path = os.path.join(glob.escape(base), _FILENAME.value)
             try:
                 for path in glob.glob(escaped_path):
                     images.append((100, path))
             except sre_constants.error:
                 # Use literal filename if globbing causes errors
-                path = os.path.join(base, config.get("albumart", "filename"))
+                path = os.path.join(base, _FILENAME.value)
                 images = [(100, path)]
         else:
             entries = []
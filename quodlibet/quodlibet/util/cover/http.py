@@ -10,22 +10,17 @@
 from gi.repository import Gio, GLib, Soup
 
 from quodlibet.plugins.cover import CoverSourcePlugin
-from quodlibet.util.http import HTTPRequest, download_json
-from quodlibet.util import print_w
+from quodlibet.util.http import fetch, download_json
 
 
 class HTTPDownloadMixin(object):
     def download(self, message):
-        request = HTTPRequest(message, self.cancellable)
-        request.connect('sent', self._download_sent)
-        request.connect('received', self._download_received)
-        request.connect('failure', self._download_failure)
-        request.send()
+        fetch(message, self.cancellable, self._download_received,
+              self._download_failure)
 
-    def _download_sent(self, request, message):
+    def _download_received(self, message, data):
         status = message.get_property('status-code')
         if not 200 <= status < 400:
-            request.cancel()
             return self.fail('Bad HTTP code {0}'.format(status))
 
         target = Gio.file_new_for_path(self.cover_path)
@@ -33,31 +28,17 @@ class HTTPDownloadMixin(object):
 
         def replaced(cover_file, task, data):
             try:
-                ostr = cover_file.replace_finish(task)
-                request.provide_target(ostr)
-                request.connect('receive-failure', self._receive_fail, target)
-                request.receive()
+                cover_file.replace_contents_finish(task)
             except GLib.GError:
-                request.cancel()
-                return self.fail('Cannot open cover file')
-        target.replace_async(None, True, flags, GLib.PRIORITY_DEFAULT,
-                             self.cancellable, replaced, None)
+                return self.fail('Cannot save cover file')
+            self.emit('fetch-success', self.cover)
 
-    def _download_received(self, request, ostream):
-        ostream.close(None)
-        self.emit('fetch-success', self.cover)
+        # replaces the file atomically, so nothing to clean up on failure
+        target.replace_contents_bytes_async(
+            GLib.Bytes.new(data), None, False, flags, self.cancellable,
+            replaced, None)
 
-    def _receive_fail(self, request, exception, gfile):
-        def deleted(gfile, task, data):
-            try:
-                gfile.delete_finish(task)
-            except GLib.GError:
-                print_w('Could not clean up cover which failed to download')
-        ostream = request.ostream
-        ostream.close(None)
-        gfile.delete_async(GLib.PRIORITY_DEFAULT, None, deleted, None)
-
-    def _download_failure(self, request, exception):
+    def _download_failure(self, message, exception):
         try:
             self.fail(exception.message or ' '.join(exception.args))
         except AttributeError:
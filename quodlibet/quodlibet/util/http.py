@@ -7,13 +7,17 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import os
 import json
 
 from gi.repository import Soup, Gio, GLib, GObject
 from gi.repository.GObject import ParamFlags, SignalFlags
 
+from quodlibet import get_cache_dir
 from quodlibet.const import VERSION, WEBSITE
 from quodlibet.util import print_d, print_w
+from quodlibet.util.httpcache import HTTPCache
+from quodlibet.util.httpfetch import HTTPFetcher, Request
 
 
 PARAM_READWRITECONSTRUCT = \
@@ -157,17 +161,130 @@ class HTTPRequest(GObject.Object):
                                   self.cancellable, spliced, None)
 
 
-def download(message, cancellable, callback, data, try_decode=False):
-    def received(request, ostream):
+MAX_CONNS_PER_HOST = 4
+"""Limit for concurrent connections to a single host"""
+
+_cache = None
+_fetcher = None
+
+
+def get_cache():
+    """Returns the shared HTTPCache used for GET requests"""
+
+    global _cache
+
+    if _cache is None:
+        _cache = HTTPCache(os.path.join(get_cache_dir(), "http"))
+    return _cache
+
+
+def _get_headers(message):
+    """Returns a dict of lower case names to values of the response
+    headers of `message`
+    """
+
+    headers = {}
+
+    def add(name, value, data):
+        headers[name.lower()] = value
+
+    message.get_property('response-headers').foreach(add, None)
+    return headers
+
+
+def _set_response(message, status, headers, data):
+    """Make `message` look like it received the passed response"""
+
+    message.set_status(status)
+    response_headers = message.get_property('response-headers')
+    response_headers.clear()
+    for name, value in headers.items():
+        response_headers.append(name, value)
+    response_headers.replace('Content-Length', str(len(data)))
+
+
+class _SoupRequest(Request):
+    """A Request sent using a Soup.Message"""
+
+    def __init__(self, method, url, headers=None, body=None, message=None):
+        super(_SoupRequest, self).__init__(method, url, headers, body)
+        if message is None:
+            message = Soup.Message.new(method, url)
+            request_headers = message.get_property('request-headers')
+            for name, value in self.headers.items():
+                request_headers.replace(name, value)
+        self.message = message
+
+    @classmethod
+    def from_message(cls, message):
+        headers = {}
+        message.get_property('request-headers').foreach(
+            lambda name, value, data: headers.__setitem__(name, value), None)
+        return cls(message.method, message.get_uri().to_string(False),
+                   headers, message=message)
+
+
+def _send_soup(request, cancellable, callback, failure_callback):
+    """HTTPFetcher transport using the shared Soup session"""
+
+    message = request.message
+
+    def received(http_request, ostream):
         ostream.close(None)
-        bs = ostream.steal_as_bytes().get_data()
+        callback(int(message.get_property('status-code')),
+                 _get_headers(message), ostream.steal_as_bytes().get_data())
+
+    http_request = HTTPRequest(message, cancellable)
+    http_request.provide_target(Gio.MemoryOutputStream.new_resizable())
+    http_request.connect('sent', lambda r, m: r.receive())
+    http_request.connect('received', received)
+    http_request.connect('failure', lambda r, e: failure_callback(e))
+    http_request.send()
+
+
+def get_fetcher():
+    """Returns the shared HTTPFetcher"""
+
+    global _fetcher
+
+    if _fetcher is None:
+        _fetcher = HTTPFetcher(_send_soup, get_cache(), _SoupRequest,
+                               MAX_CONNS_PER_HOST)
+    return _fetcher
+
+
+def fetch(message, cancellable, callback, failure_callback=None):
+    """Send `message` and pass the response body as bytes to
+    callback(message, data), or the error to
+    failure_callback(message, exception).
+
+    See HTTPFetcher.fetch() for how responses get cached and shared.
+    The status and response headers of `message` get filled in, also
+    if the response came from the cache or another request.
+    """
+
+    def done(status, headers, data):
+        _set_response(message, status, headers, data)
+        callback(message, data)
+
+    def failed(exception):
+        if failure_callback is not None:
+            failure_callback(message, exception)
+
+    get_fetcher().fetch(
+        _SoupRequest.from_message(message), cancellable, done, failed)
+
+
+def download(message, cancellable, callback, data, try_decode=False):
+    def received(message, bs):
         if not try_decode:
             callback(message, bs, data)
             return
         # Otherwise try to decode data
         code = int(message.get_property('status-code'))
         if code >= 400:
-            print_w("HTTP %d error received on %s" % (code, request._uri))
+            print_w("HTTP %d error received on %s" % (
+                code, message.get_uri().to_string(False)))
             return
         ctype = message.get_property('response-headers').get_content_type()
         encoding = ctype[1].get('charset', 'utf-8')
@@ -176,11 +293,7 @@ def download(message, cancellable, callback, data, try_decode=False):
         except UnicodeDecodeError:
             callback(message, bs, data)
 
-    request = HTTPRequest(message, cancellable)
-    request.provide_target(Gio.MemoryOutputStream.new_resizable())
-    request.connect('received', received)
-    request.connect('sent', lambda r, m: r.receive())
-    request.send()
+    fetch(message, cancellable, received)
 
 
 def download_json(message, cancellable, callback, data):
@@ -194,4 +307,5 @@ def download_json(message, cancellable, callback, data):
 
 session = Soup.Session()
 ua_string = "Quodlibet/{0} (+{1})".format(VERSION, WEBSITE)
-session.set_properties(user_agent=ua_string, timeout=15)
+session.set_properties(user_agent=ua_string, timeout=15,
+                       max_conns_per_host=MAX_CONNS_PER_HOST)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""A bounded on-disk cache for HTTP responses.
+
+Each URL gets a JSON file with the status, headers and expiry time and a
+file containing the body. How long a response stays fresh follows
+Cache-Control (no-store, no-cache, max-age) and Expires. Without those,
+responses with a Last-Modified header stay fresh for 10% of their age,
+at most a day. Stale responses which have an ETag or Last-Modified
+header can be revalidated with a conditional request.
+
+Once the bodies take up more than `max_size` bytes, the least recently
+used entries get removed.
+"""
+
+import os
+import json
+import time
+import hashlib
+import email.utils
+
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.path import mkdir
+from quodlibet.util.dprint import print_d, print_w
+from quodlibet.compat import text_type
+
+
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+"""Default size limit for all cached bodies in bytes"""
+
+MAX_HEURISTIC_LIFETIME = 24 * 60 * 60
+
+STORED_HEADERS = frozenset([
+    "content-type", "etag", "last-modified", "cache-control", "expires",
+    "date"])
+"""Response headers which are kept, all lower case"""
+
+
+def parse_cache_control(value):
+    """Returns a dict of lower case directive names to their value, or
+    True for directives without a value.
+    """
+
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, sep, arg = part.strip().partition("=")
+        name = name.strip().lower()
+        if name:
+            directives[name] = arg.strip().strip('"') if sep else True
+    return directives
+
+
+def parse_http_date(value):
+    """Returns a timestamp for a HTTP date or None if it's invalid"""
+
+    if not value:
+        return None
+    try:
+        parsed = email.utils.parsedate_tz(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed is None:
+        return None
+    return email.utils.mktime_tz(parsed)
+
+
+def get_expiry(headers, now):
+    """Returns the time until which a response with the given headers
+    (dict with lower case names) is fresh, or None if it shouldn't be
+    stored at all.
+    """
+
+    cc = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in cc:
+        return None
+
+    has_validator = "etag" in headers or "last-modified" in headers
+
+    if "no-cache" in cc:
+        expires = now
+    elif "max-age" in cc:
+        try:
+            expires = now + max(int(cc["max-age"]), 0)
+        except (TypeError, ValueError):
+            expires = now
+    elif "expires" in headers:
+        # invalid dates mean "already expired"
+        expires = parse_http_date(headers["expires"]) or now
+        date = parse_http_date(headers.get("date"))
+        if date is not None:
+            # don't depend on our clock being in sync with the server
+            expires = now + (expires - date)
+    else:
+        last_modified = parse_http_date(headers.get("last-modified"))
+        if last_modified is not None and last_modified < now:
+            expires = now + min(
+                (now - last_modified) / 10, MAX_HEURISTIC_LIFETIME)
+        else:
+            expires = now
+
+    if expires <= now and not has_validator:
+        return None
+    return expires
+
+
+class CacheEntry(object):
+    """A cached response"""
+
+    def __init__(self, url, status, headers, expires, data_path):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.expires = expires
+        self._data_path = data_path
+
+    @property
+    def fresh(self):
+        """If it can be used without asking the server"""
+
+        return time.time() < self.expires
+
+    def get_validators(self):
+        """Returns a dict of request headers for revalidating"""
+
+        validators = {}
+        if "etag" in self.headers:
+            validators["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            validators["If-Modified-Since"] = self.headers["last-modified"]
+        return validators
+
+    def read(self):
+        """Returns the body or None if it's gone"""
+
+        try:
+            with open(self._data_path, "rb") as h:
+                return h.read()
+        except EnvironmentError:
+            return None
+
+    def to_dict(self):
+        return {"url": self.url, "status": self.status,
+                "headers": self.headers, "expires": self.expires}
+
+
+class HTTPCache(object):
+    """Stores responses for URLs in the directory `path`"""
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._size = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        """Responses served from the cache without a request"""
+        self.revalidated = 0
+        """Stale responses confirmed by the server (HTTP 304)"""
+        self.misses = 0
+        """Responses which had to be downloaded"""
+        self.coalesced = 0
+        """Requests which joined an identical running request"""
+
+    def get_stats(self):
+        """Returns a dict containing the counters and the hit rate"""
+
+        total = self.hits + self.revalidated + self.misses + self.coalesced
+        saved = self.hits + self.revalidated + self.coalesced
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": float(saved) / total if total else 0.0,
+        }
+
+    def _get_paths(self, url):
+        if isinstance(url, text_type):
+            url = url.encode("utf-8")
+        key = hashlib.sha1(url).hexdigest()
+        base = os.path.join(self.path, key)
+        return base + ".json", base + ".data"
+
+    def lookup(self, url):
+        """Returns a CacheEntry or None"""
+
+        meta_path, data_path = self._get_paths(url)
+        try:
+            with open(meta_path, "rb") as h:
+                meta = json.loads(h.read().decode("utf-8"))
+            # the data file mtime is used for finding unused entries
+            os.utime(data_path, None)
+        except (EnvironmentError, ValueError):
+            return None
+
+        if meta.get("url") != url:
+            return None
+
+        return CacheEntry(url, meta["status"], meta["headers"],
+                          meta["expires"], data_path)
+
+    def _write_meta(self, meta_path, entry):
+        with atomic_save(meta_path, "wb") as h:
+            h.write(json.dumps(entry.to_dict()).encode("utf-8"))
+
+    def store(self, url, status, headers, data):
+        """Store a response. `headers` is a dict with lower case names.
+
+        Returns a CacheEntry or None if it can't be stored.
+        """
+
+        if status != 200 or len(data) > self.max_size:
+            return None
+
+        expires = get_expiry(headers, time.time())
+        if expires is None:
+            self.remove(url)
+            return None
+
+        headers = dict((k, v) for k, v in headers.items()
+                       if k in STORED_HEADERS)
+        meta_path, data_path = self._get_paths(url)
+        entry = CacheEntry(url, status, headers, expires, data_path)
+
+        self._trim(len(data))
+        old_size = self._get_file_size(data_path)
+        try:
+            mkdir(self.path)
+            with atomic_save(data_path, "wb") as h:
+                h.write(data)
+            self._write_meta(meta_path, entry)
+        except EnvironmentError as e:
+            print_w("Couldn't cache %r: %s" % (url, e))
+            self._size = None
+            return None
+
+        if self._size is not None:
+            self._size += len(data) - old_size
+        return entry
+
+    def refresh(self, entry, headers):
+        """Update the expiry time of `entry` after the server confirmed
+        it is still valid (HTTP 304). Returns the new CacheEntry or None.
+        """
+
+        new_headers = dict(entry.headers)
+        new_headers.update(
+            (k, v) for k, v in headers.items() if k in STORED_HEADERS)
+
+        expires = get_expiry(new_headers, time.time())
+        if expires is None:
+            self.remove(entry.url)
+            return None
+
+        meta_path, data_path = self._get_paths(entry.url)
+        entry = CacheEntry(
+            entry.url, entry.status, new_headers, expires, data_path)
+        try:
+            self._write_meta(meta_path, entry)
+        except EnvironmentError:
+            pass
+        return entry
+
+    def remove(self, url):
+        meta_path, data_path = self._get_paths(url)
+        size = self._get_file_size(data_path)
+        for path in (meta_path, data_path):
+            try:
+                os.remove(path)
+            except EnvironmentError:
+                pass
+        if self._size is not None:
+            self._size -= size
+
+    def clear(self):
+        """Remove all entries"""
+
+        for name in self._list_dir():
+            try:
+                os.remove(os.path.join(self.path, name))
+            except EnvironmentError:
+                pass
+        self._size = 0
+
+    def _list_dir(self):
+        try:
+            return os.listdir(self.path)
+        except EnvironmentError:
+            return []
+
+    @staticmethod
+    def _get_file_size(path):
+        try:
+            return os.path.getsize(path)
+        except EnvironmentError:
+            return 0
+
+    def _trim(self, needed):
+        """Remove the least recently used entries so that `needed` more
+        bytes fit in.
+        """
+
+        if self._size is not None and self._size + needed <= self.max_size:
+            return
+
+        entries = []
+        for name in self._list_dir():
+            if not name.endswith(".data"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except EnvironmentError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(e[1] for e in entries)
+        if size + needed > self.max_size:
+            entries.sort()
+            removed = 0
+            for mtime, entry_size, path in entries:
+                if size + needed <= self.max_size:
+                    break
+                for p in (path, path[:-len(".data")] + ".json"):
+                    try:
+                        os.remove(p)
+                    except EnvironmentError:
+                        pass
+                size -= entry_size
+                removed += 1
+            print_d("Removed %d entries from the HTTP cache" % removed)
+        self._size = size
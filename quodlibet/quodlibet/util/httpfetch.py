@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Caching and sharing of HTTP requests.
+
+HTTPFetcher answers GET requests from an HTTPCache where possible, lets
+identical GET requests running at the same time share one request and
+limits the number of requests per host. It doesn't depend on a HTTP
+library, the requests are sent by a transport function::
+
+    transport(request, cancellable, callback, failure_callback)
+
+which has to call callback(status, headers, data), with a dict of lower
+case header names to values, or failure_callback(exception), in the
+main loop.
+"""
+
+from collections import deque
+
+from gi.repository import Gio, GLib
+
+from quodlibet.compat import parse_qs, urlparse
+
+
+CREDENTIAL_PARAMS = frozenset([
+    "oauth_token", "access_token", "client_secret", "password", "token"])
+"""Query parameters carrying credentials, requests using them aren't
+cached"""
+
+CREDENTIAL_HEADERS = frozenset(["authorization", "cookie"])
+"""Request headers carrying credentials (lower case)"""
+
+INVALIDATING_METHODS = frozenset(["POST", "PUT", "PATCH", "DELETE"])
+"""Methods which likely change the resource, cached responses for their
+URL get removed"""
+
+NOT_MODIFIED = 304
+
+
+def is_cacheable(url, headers):
+    """If the response for a GET request for `url` with the request
+    `headers` (dict) can be shared with other requests for the same URL.
+    """
+
+    if any(name.lower() in CREDENTIAL_HEADERS for name in headers):
+        return False
+
+    parts = urlparse(url)
+    if parts.username or parts.password:
+        return False
+
+    params = parse_qs(parts.query, keep_blank_values=True)
+    return not any(k.lower() in CREDENTIAL_PARAMS for k in params)
+
+
+def _get_host(url):
+    return urlparse(url).netloc.rpartition("@")[-1].lower()
+
+
+class Request(object):
+    """A HTTP request. Transports can subclass it to keep their own
+    request object around.
+    """
+
+    def __init__(self, method, url, headers=None, body=None):
+        self.method = method
+        self.url = url
+        self.headers = dict(headers or {})
+        self.body = body
+
+
+class _SharedFetch(object):
+    """A GET request for one URL which all callers asking for that URL
+    while it's running are waiting for.
+    """
+
+    def __init__(self, fetcher, request, entry):
+        self.fetcher = fetcher
+        self.url = request.url
+        self.entry = entry
+        self.cancellable = Gio.Cancellable()
+        self._waiters = []
+
+        headers = dict(request.headers)
+        if entry is not None:
+            headers.update(entry.get_validators())
+        self.request = fetcher.request_type("GET", self.url, headers)
+
+    def add(self, cancellable, callback, failure_callback):
+        self._waiters.append((cancellable, callback, failure_callback))
+        if cancellable is not None:
+            cancellable.connect(self._waiter_cancelled, None)
+
+    def _waiter_cancelled(self, *args):
+        for cancellable, callback, failure in self._waiters:
+            if cancellable is None or not cancellable.is_cancelled():
+                return
+        # nobody is interested anymore
+        self.cancellable.cancel()
+        self._done()
+
+    def send(self):
+        self.fetcher._send(
+            self.request, self.cancellable, self._received, self._fail)
+
+    def _received(self, status, headers, data):
+        cache = self.fetcher.cache
+        if status == NOT_MODIFIED and self.entry is not None:
+            data = self.entry.read()
+            if data is None:
+                self._fail(Exception("Cache entry for %s is gone" % self.url))
+                return
+            cache.revalidated += 1
+            entry = cache.refresh(self.entry, headers) or self.entry
+            self._finish(entry.status, entry.headers, data)
+            return
+
+        cache.store(self.url, status, headers, data)
+        self._finish(status, headers, data)
+
+    def _done(self):
+        in_flight = self.fetcher._in_flight
+        if in_flight.get(self.url) is self:
+            del in_flight[self.url]
+        waiters = self._waiters
+        self._waiters = []
+        return [w for w in waiters if w[0] is None or not w[0].is_cancelled()]
+
+    def _finish(self, status, headers, data):
+        for cancellable, callback, failure in self._done():
+            callback(status, headers, data)
+
+    def _fail(self, exception):
+        for cancellable, callback, failure in self._done():
+            if failure is not None:
+                failure(exception)
+
+
+class HTTPFetcher(object):
+    """Sends requests using `transport`, caching GET responses in `cache`
+    (an HTTPCache) and running at most `max_per_host` requests per host
+    at the same time.
+
+    `request_type` is used for creating the GET requests shared by
+    several callers.
+    """
+
+    def __init__(self, transport, cache, request_type=Request,
+                 max_per_host=4):
+        self.transport = transport
+        self.cache = cache
+        self.request_type = request_type
+        self.max_per_host = max_per_host
+        self._in_flight = {}
+        # host -> number of running requests
+        self._active = {}
+        # host -> deque of requests waiting for a free slot
+        self._queued = {}
+
+    def fetch(self, request, cancellable, callback, failure_callback=None):
+        """Send `request` and call callback(status, headers, data) or
+        failure_callback(exception).
+
+        GET requests are answered from the cache if possible and identical
+        ones running at the same time share one request. Requests
+        carrying credentials always go to the server and POST, PUT, PATCH
+        and DELETE requests remove the cached response for their URL.
+        """
+
+        cache = self.cache
+        url = request.url
+
+        if request.method in INVALIDATING_METHODS:
+            # also after the response, a GET might have been running
+            cache.remove(url)
+
+            def invalidate(status, headers, data):
+                cache.remove(url)
+                callback(status, headers, data)
+
+            self._send(request, cancellable, invalidate, failure_callback)
+            return
+
+        if request.method != "GET" or \
+                not is_cacheable(url, request.headers):
+            self._send(request, cancellable, callback, failure_callback)
+            return
+
+        shared = self._in_flight.get(url)
+        if shared is not None and not shared.cancellable.is_cancelled():
+            cache.coalesced += 1
+            shared.add(cancellable, callback, failure_callback)
+            return
+
+        entry = cache.lookup(url)
+        if entry is not None and entry.fresh:
+            data = entry.read()
+            if data is not None:
+                cache.hits += 1
+
+                def deliver():
+                    if cancellable is None or not cancellable.is_cancelled():
+                        callback(entry.status, entry.headers, data)
+                    return False
+
+                # like a real request, call back from the main loop
+                GLib.idle_add(deliver)
+                return
+            entry = None
+
+        cache.misses += 1
+        shared = self._in_flight[url] = _SharedFetch(self, request, entry)
+        shared.add(cancellable, callback, failure_callback)
+        shared.send()
+
+    def _send(self, request, cancellable, callback, failure_callback):
+        """Pass `request` to the transport once the host has a free slot"""
+
+        host = _get_host(request.url)
+
+        def release():
+            queued = self._queued.get(host)
+            if queued:
+                start = queued.popleft()
+                if not queued:
+                    del self._queued[host]
+                start()
+            else:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+
+        def done(*args):
+            release()
+            callback(*args)
+
+        def failed(exception):
+            release()
+            if failure_callback is not None:
+                failure_callback(exception)
+
+        def start():
+            self.transport(request, cancellable, done, failed)
+
+        if self._active.get(host, 0) < self.max_per_host:
+            self._active[host] = self._active.get(host, 0) + 1
+            start()
+        else:
+            self._queued.setdefault(host, deque()).append(start)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Opt-in timing of hot code paths.
+
+    with instrument.measure("signal", "SongLibrary.changed"):
+        ...
+
+Records the number of calls and a latency histogram per category and
+name. Disabled by default, enable it with enable() or by setting
+QUODLIBET_INSTRUMENT. The results can be viewed in the instrumentation
+window (in debug mode under Help), or printed as JSON with
+"quodlibet --print-instrumentation".
+"""
+
+import os
+import json
+import time
+import bisect
+
+from quodlibet.compat import iteritems
+
+
+BUCKETS = [0.0001, 0.001, 0.004, 0.016, 0.064]
+"""Upper bounds of the histogram buckets in seconds, the last bucket
+contains everything above"""
+
+BUCKET_LABELS = [u"<0.1ms", u"<1ms", u"<4ms", u"<16ms", u"<64ms", u">=64ms"]
+
+_timer = getattr(time, "perf_counter", time.time)
+
+_enabled = "QUODLIBET_INSTRUMENT" in os.environ
+_stats = {}
+
+
+class _Stat(object):
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "histogram": dict(zip(BUCKET_LABELS, self.buckets)),
+        }
+
+
+class _Measure(object):
+
+    __slots__ = ("category", "name", "start")
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.start = _timer()
+        return self
+
+    def __exit__(self, *args):
+        record(self.category, self.name, _timer() - self.start)
+
+
+class _NullMeasure(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_MEASURE = _NullMeasure()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(value=True):
+    """Start or stop recording, keeps what was recorded so far"""
+
+    global _enabled
+
+    _enabled = bool(value)
+
+
+def reset():
+    """Forget all recorded values"""
+
+    _stats.clear()
+
+
+def record(category, name, seconds):
+    """Record a call which took `seconds`, if enabled"""
+
+    if not _enabled:
+        return
+
+    key = (category, name)
+    try:
+        stat = _stats[key]
+    except KeyError:
+        stat = _stats[key] = _Stat()
+    stat.add(seconds)
+
+
+def measure(category, name):
+    """Returns a context manager recording the time spent in it"""
+
+    if not _enabled:
+        return _NULL_MEASURE
+    return _Measure(category, name)
+
+
+def get_stats():
+    """Returns a dict of category -> name -> dict of values"""
+
+    result = {}
+    for (category, name), stat in iteritems(_stats):
+        result.setdefault(category, {})[name] = stat.to_dict()
+    return result
+
+
+def dump_json():
+    """Returns the current state and all values as JSON text"""
+
+    data = {"enabled": _enabled, "stats": get_stats()}
+    return json.dumps(data, indent=2, sort_keys=True) + u"\n"
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Bulk access to stored numeric song values.
+
+Summing a value over a large selection with a generator expression runs
+Python bytecode for every song. The functions here look the values up
+with map() and dict.get, so the whole column gets read in C, which is
+about twice as fast for hundreds of thousands of songs.
+
+Only values stored in the songs are used, computed tags (like ~#rating
+without a set rating) aren't supported.
+"""
+
+from itertools import repeat
+
+from quodlibet.compat import PY2
+
+if PY2:
+    from itertools import imap
+else:
+    imap = map
+
+
+def get_column(key, songs, default=0):
+    """Returns an iterator over the stored values of `key` for all
+    `songs`, or `default` if a song has no value.
+    """
+
+    count = len(songs)
+    return imap(dict.get, songs, repeat(key, count), repeat(default, count))
+
+
+def get_sum(key, songs):
+    """Returns the sum of the stored values of `key` for all `songs`"""
+
+    return sum(get_column(key, songs))
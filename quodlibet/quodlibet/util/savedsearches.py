@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Materialised saved searches.
+
+The saved searches of the search bar (lists/queries.saved) can be turned
+into read-only playlists containing all matching library songs. They get
+filled once and are then kept up to date using the library signals, so
+only added and changed songs have to be matched against the query.
+Checking whether a library song matches is a set lookup.
+
+Queries with results that can change without the songs changing, like
+"#(added < 2 weeks ago)" or ones using query plugins (including other
+saved searches), don't get materialised.
+"""
+
+import os
+
+from quodlibet import _
+from quodlibet import get_user_dir
+from quodlibet.query import Query
+from quodlibet.util.collection import Playlist
+from quodlibet.util.collections import HashedList
+from quodlibet.util.dprint import print_d
+from quodlibet.compat import itervalues
+
+
+def get_saved_searches_path():
+    return os.path.join(get_user_dir(), "lists", "queries.saved")
+
+
+def parse_saved_searches(path):
+    """Returns a list of (name, query text) tuples read from a file
+    containing the query text and name on alternating lines.
+
+    A missing file or a trailing line without a name are ignored.
+    """
+
+    try:
+        with open(path, "r", encoding="utf-8") as h:
+            lines = h.read().splitlines()
+    except EnvironmentError:
+        return []
+
+    result = []
+    for i in range(0, len(lines) - 1, 2):
+        result.append((lines[i + 1].strip(), lines[i].strip()))
+    return result
+
+
+class SearchPlaylist(Playlist):
+    """A read-only playlist containing all songs of `library` matching
+    `query`, sorted like the library.
+    """
+
+    read_only = True
+
+    def __init__(self, name, query, library):
+        # Don't pass the library, we never emit changes for our songs
+        super(SearchPlaylist, self).__init__(name)
+        # Not a real playlist, so it shouldn't show up in ~playlists
+        self._unregister()
+        self.__list = None
+        self.query = query
+        self.__library = library
+        self.__songs = set(query.filter(itervalues(library)))
+        self.__sigs = [
+            library.connect("added", self.__changed),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+
+    @property
+    def _list(self):
+        if self.__list is None:
+            self.__list = HashedList(sorted(self.__songs))
+        return self.__list
+
+    @_list.setter
+    def _list(self, value):
+        self.__list = value
+
+    def __invalidate(self):
+        self.__list = None
+        self.finalize()
+
+    def __changed(self, library, songs):
+        search = self.query.search
+        members = self.__songs
+        dirty = False
+        for song in songs:
+            if search(song):
+                # also for members, as the sort order might have changed
+                members.add(song)
+                dirty = True
+            elif song in members:
+                members.discard(song)
+                dirty = True
+        if dirty:
+            self.__invalidate()
+
+    def __removed(self, library, songs):
+        count = len(self.__songs)
+        self.__songs.difference_update(songs)
+        if len(self.__songs) != count:
+            self.__invalidate()
+
+    def search(self, song):
+        """Returns whether the song matches the query, like Query.search()
+        but only a set lookup for songs in the library.
+        """
+
+        if song in self.__songs:
+            return True
+        if self.__library.get(song.key) is song:
+            return False
+        return self.query.search(song)
+
+    def has_songs(self, songs):
+        members = self.__songs
+        found = [song in members for song in songs]
+        return any(found), all(found)
+
+    def add_songs(self, filenames, library):
+        # We follow the library ourselves
+        return False
+
+    def remove_songs(self, songs, leave_dupes=False):
+        return False
+
+    def __read_only(self, *args, **kwargs):
+        raise TypeError("%r is read-only" % self)
+
+    extend = append = clear = shuffle = __setitem__ = __read_only
+
+    def rename(self, new_name):
+        raise ValueError(_("Saved searches can't be renamed"))
+
+    def write_later(self):
+        pass
+
+    def delete(self):
+        for id_ in self.__sigs:
+            self.__library.disconnect(id_)
+        self.__sigs = []
+        self.__songs.clear()
+        self.__invalidate()
+        self._unregister()
+
+
+class SavedSearches(object):
+    """Provides a SearchPlaylist for each saved search.
+
+    The playlists get created on first access and all of them get
+    recreated once the saved searches file changes.
+    """
+
+    def __init__(self, library, path=None):
+        self.library = library
+        self.path = path or get_saved_searches_path()
+        self.__stat = None
+        self.__queries = {}
+        self.__playlists = {}
+        self.__creating = set()
+        self.generation = 0
+        """Gets increased every time the saved searches get re-read"""
+
+    def __reload(self):
+        try:
+            stat = os.stat(self.path)
+            stat = (stat.st_mtime, stat.st_size)
+        except EnvironmentError:
+            stat = None
+
+        if stat == self.__stat:
+            return
+        self.__stat = stat
+
+        self.__delete_playlists()
+        queries = {}
+        for name, text in parse_saved_searches(self.path):
+            # the first one wins in case of duplicates
+            queries.setdefault(name.lower(), (name, text))
+        self.__queries = queries
+        self.generation += 1
+        print_d("Loaded %d saved searches" % len(queries))
+
+    def __delete_playlists(self):
+        for playlist in itervalues(self.__playlists):
+            playlist.delete()
+        self.__playlists.clear()
+
+    def __get(self, key, star):
+        playlist = self.__playlists.get((key, star))
+        if playlist is not None:
+            return playlist
+
+        # In case it includes itself through the query plugin
+        if key not in self.__queries or (key, star) in self.__creating:
+            return None
+
+        name, text = self.__queries[key]
+        self.__creating.add((key, star))
+        try:
+            query = Query(text, star=list(star))
+        finally:
+            self.__creating.discard((key, star))
+        if not query.is_parsable or query.is_dynamic:
+            return None
+
+        playlist = SearchPlaylist(name, query, self.library)
+        self.__playlists[(key, star)] = playlist
+        return playlist
+
+    def reload(self):
+        """Re-read the saved searches if the file has changed, in which
+        case all previously returned playlists get deleted.
+        """
+
+        self.__reload()
+
+    def get(self, name):
+        """Returns the SearchPlaylist for the saved search with the given
+        name (case insensitive) or None, also in case it can't be
+        materialised.
+        """
+
+        self.__reload()
+        return self.__get(name.strip().lower(), tuple(Query.STAR))
+
+    def lookup(self, text, star=None):
+        """Returns a SearchPlaylist for the saved search with the query
+        `text` or None. `star` is passed to Query().
+        """
+
+        self.__reload()
+        text = text.strip()
+        star = tuple(Query.STAR if star is None else star)
+        for key, (name, saved_text) in self.__queries.items():
+            if saved_text == text:
+                return self.__get(key, star)
+        return None
+
+    def playlists(self):
+        """Returns a list of SearchPlaylists for all saved searches which
+        can be materialised
+        """
+
+        self.__reload()
+        playlists = []
+        for key in self.__queries:
+            playlist = self.__get(key, tuple(Query.STAR))
+            if playlist is not None:
+                playlists.append(playlist)
+        return sorted(playlists)
+
+    def destroy(self):
+        self.__delete_playlists()
+        self.__queries.clear()
+        self.__stat = None
+
+
+_saved_searches = None
+
+
+def get_saved_searches(library):
+    """Returns the shared SavedSearches instance for `library`"""
+
+    global _saved_searches
+
+    if _saved_searches is None or _saved_searches.library is not library:
+        if _saved_searches is not None:
+            _saved_searches.destroy()
+        _saved_searches = SavedSearches(library)
+    return _saved_searches
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Line based Unix domain socket server and client using the GLib main loop.
+
+In contrast to the FIFO a connection can stay open and be used for any
+number of messages in both directions.
+"""
+
+import os
+import errno
+import socket
+
+from gi.repository import GLib
+
+from quodlibet.util.path import mkdir
+from quodlibet.util import print_d
+
+SOCKET_TIMEOUT = 10
+"""time in seconds until the client gives up waiting for a response"""
+
+_ERRNO_AGAIN = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+
+class UnixSocketError(Exception):
+    pass
+
+
+def socket_exists(path):
+    """Returns whether something accepts connections at path.
+
+    Args:
+        path (pathlike)
+    Returns:
+        bool
+    """
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        return False
+    else:
+        return True
+    finally:
+        sock.close()
+
+
+class LineConnection(object):
+    """A non-blocking connection which passes received lines to
+    `on_line` and buffers written data until the socket is writable.
+
+    For writing large amounts of data call resume(): as long as the
+    output buffer isn't full `produce` gets called to write more and
+    should return True until it has nothing more to write.
+    """
+
+    BUFFER_SIZE = 64 * 1024
+    """Don't ask for more data once this many bytes are waiting"""
+
+    def __init__(self, sock, on_line, produce, on_close):
+        """
+        Args:
+            sock (socket.socket)
+            on_line (Callable[[LineConnection, bytes], None])
+            produce (Callable[[LineConnection], bool])
+            on_close (Callable[[LineConnection], None])
+        """
+
+        sock.setblocking(False)
+        self._sock = sock
+        self._on_line = on_line
+        self._produce = produce
+        self._on_close = on_close
+        self._inbuf = b""
+        self._outbuf = bytearray()
+        self._more = False
+        self._out_id = None
+        self._in_id = GLib.io_add_watch(
+            sock.fileno(), GLib.PRIORITY_DEFAULT,
+            GLib.IO_IN | GLib.IO_ERR | GLib.IO_HUP, self._on_in)
+
+    @property
+    def closed(self):
+        return self._sock is None
+
+    def write(self, data):
+        """Queue data for sending"""
+
+        assert isinstance(data, bytes)
+
+        if self.closed:
+            return
+        self._outbuf.extend(data)
+        self._watch_out()
+
+    def resume(self):
+        """Call `produce` once there is room in the output buffer"""
+
+        if self.closed:
+            return
+        self._more = True
+        self._watch_out()
+
+    def close(self):
+        """Close the connection, can be called multiple times"""
+
+        if self.closed:
+            return
+
+        for id_ in (self._in_id, self._out_id):
+            if id_ is not None:
+                GLib.source_remove(id_)
+        self._in_id = self._out_id = None
+
+        try:
+            self._sock.close()
+        except socket.error:
+            pass
+        self._sock = None
+        self._on_close(self)
+
+    def _watch_out(self):
+        if self._out_id is None:
+            self._out_id = GLib.io_add_watch(
+                self._sock.fileno(), GLib.PRIORITY_DEFAULT,
+                GLib.IO_OUT | GLib.IO_ERR | GLib.IO_HUP, self._on_out)
+
+    def _on_in(self, fd, condition):
+        while True:
+            try:
+                data = self._sock.recv(4096)
+            except socket.error as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno in _ERRNO_AGAIN:
+                    return True
+                data = b""
+            break
+
+        if not data:
+            self._in_id = None
+            self.close()
+            return False
+
+        lines = (self._inbuf + data).split(b"\n")
+        self._inbuf = lines.pop()
+        for line in lines:
+            if self.closed:
+                break
+            self._on_line(self, line.rstrip(b"\r"))
+        return not self.closed
+
+    def _on_out(self, fd, condition):
+        if condition & (GLib.IO_ERR | GLib.IO_HUP):
+            self._out_id = None
+            self.close()
+            return False
+
+        while self._more and len(self._outbuf) < self.BUFFER_SIZE:
+            self._more = self._produce(self)
+            if self.closed:
+                return False
+
+        if self._outbuf:
+            try:
+                sent = self._sock.send(self._outbuf)
+            except socket.error as e:
+                if e.errno not in _ERRNO_AGAIN:
+                    self._out_id = None
+                    self.close()
+                    return False
+            else:
+                del self._outbuf[:sent]
+
+        if self._outbuf or self._more:
+            return True
+        self._out_id = None
+        return False
+
+
+class UnixSocketServer(object):
+    """Listens on a Unix domain socket and passes each new connection
+    to `on_connect`.
+    """
+
+    def __init__(self, path, on_connect):
+        """
+        Args:
+            path (pathlike)
+            on_connect (Callable[[socket.socket], None])
+        """
+
+        self._path = path
+        self._on_connect = on_connect
+        self._sock = None
+        self._id = None
+
+    def start(self):
+        """Create the socket and start listening.
+
+        Raises:
+            UnixSocketError: in case another process is using it or the
+                socket couldn't be created.
+        """
+
+        if socket_exists(self._path):
+            raise UnixSocketError("socket already in use")
+
+        mkdir(os.path.dirname(self._path))
+        try:
+            # a leftover from a crashed instance
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self._path)
+            os.chmod(self._path, 0o600)
+            sock.listen(5)
+        except (socket.error, OSError) as e:
+            sock.close()
+            raise UnixSocketError(e)
+        sock.setblocking(False)
+
+        self._sock = sock
+        self._id = GLib.io_add_watch(
+            sock.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, self._accept)
+
+    def stop(self):
+        """Stop listening and remove the socket. Existing connections
+        stay open. Can be called multiple times.
+        """
+
+        if self._id is not None:
+            GLib.source_remove(self._id)
+            self._id = None
+
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self._path)
+            except EnvironmentError:
+                pass
+
+    def _accept(self, fd, condition):
+        try:
+            conn = self._sock.accept()[0]
+        except socket.error as e:
+            print_d("accept failed: %r" % e)
+            return True
+
+        self._on_connect(conn)
+        return True
+
+
+class UnixSocketClient(object):
+    """A blocking line based client connection"""
+
+    def __init__(self, path, timeout=SOCKET_TIMEOUT):
+        """
+        Raises:
+            EnvironmentError
+        """
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(path)
+        except EnvironmentError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile("rb")
+
+    def send_line(self, line):
+        """
+        Args:
+            line (bytes)
+        Raises:
+            EnvironmentError
+        """
+
+        assert isinstance(line, bytes)
+
+        self._sock.sendall(line + b"\n")
+
+    def read_line(self):
+        """Returns the next line without the line ending.
+
+        Raises:
+            EnvironmentError: in case of a timeout or the connection
+                got closed.
+        """
+
+        line = self._file.readline()
+        if not line.endswith(b"\n"):
+            raise EnvironmentError("connection closed")
+        return line[:-1]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
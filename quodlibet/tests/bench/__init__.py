@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Performance benchmarks for hot code paths.
+
+Run with "./setup.py bench". All benchmarks work on a deterministic
+synthetic library, so results of different runs (and revisions) can be
+compared using --save and --compare.
+"""
+
+import os
+import gc
+import bisect
+import sys
+import json
+import time
+import random
+import shutil
+import tracemalloc
+
+from senf import fsnative
+
+from tests import mkdtemp
+from quodlibet import config
+from quodlibet.formats import AudioFile
+from quodlibet.util.dprint import print_
+
+
+GENRES = ["Rock", "Pop", "Jazz", "Classical", "Electronic", "Hip-Hop",
+          "Folk", "Metal", "Blues", "Soundtrack", "Ambient", "Reggae"]
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "su", "vo", "dan", "el", "qui",
+             "mor", "zet", "pa", "ni", "ho", "ur", "bel", "sa", "tri", "go"]
+
+
+def _word(rand, min_len=1, max_len=3):
+    count = rand.randint(min_len, max_len)
+    return u"".join(rand.choice(SYLLABLES) for i in range(count))
+
+
+def _words(rand, min_count=1, max_count=4):
+    count = rand.randint(min_count, max_count)
+    return u" ".join(_word(rand).capitalize() for i in range(count))
+
+
+def generate_songs(count, seed=0, artists=None, album_size=(5, 16),
+                   genre_skew=1.5, multi_value=0.1):
+    """Returns a list of `count` AudioFiles with synthetic tags.
+
+    The result only depends on the arguments, so two calls with the same
+    arguments create the same library.
+
+    artists -- number of distinct artists (default: count / 50)
+    album_size -- (min, max) number of tracks per album
+    genre_skew -- exponent of the Zipf-like genre distribution
+    multi_value -- probability of a song having multiple artists/genres
+    """
+
+    rand = random.Random(seed)
+
+    if artists is None:
+        artists = max(1, count // 50)
+    artist_names = [_words(rand, 1, 3) for i in range(artists)]
+    cum_weights = []
+    for i in range(len(GENRES)):
+        weight = 1.0 / (i + 1) ** genre_skew
+        cum_weights.append(weight + (cum_weights[-1] if cum_weights else 0))
+
+    songs = []
+    base_time = 1262304000  # 2010-01-01, fixed for reproducibility
+    while len(songs) < count:
+        artist = rand.choice(artist_names)
+        album = _words(rand, 1, 4)
+        date = u"%d" % rand.randint(1950, 2018)
+        genre = GENRES[bisect.bisect(
+            cum_weights, rand.random() * cum_weights[-1])]
+        total = rand.randint(*album_size)
+        discs = 2 if rand.random() < 0.05 else 1
+        albumartist = u"Various Artists" if rand.random() < 0.05 else None
+        for track in range(1, total + 1):
+            if len(songs) >= count:
+                break
+            title = _words(rand)
+            filename = os.path.join(
+                fsnative(u"/music"), artist, album,
+                fsnative(u"%02d - %s.ogg" % (track, title)))
+            song = AudioFile({
+                "~filename": filename,
+                "~mountpoint": fsnative(u"/music"),
+                "artist": artist,
+                "album": album,
+                "title": title,
+                "date": date,
+                "genre": genre,
+                "tracknumber": u"%d/%d" % (track, total),
+                "~#length": rand.randint(60, 600),
+                "~#filesize": rand.randint(10 ** 6, 2 * 10 ** 7),
+                "~#bitrate": rand.choice([128, 192, 256, 320]),
+                "~#added": base_time + rand.randint(0, 10 ** 8),
+                "~#mtime": base_time + rand.randint(0, 10 ** 8),
+                "~#playcount": int(rand.expovariate(0.2)),
+                "~#skipcount": int(rand.expovariate(1)),
+            })
+            if discs > 1:
+                song["discnumber"] = u"%d/%d" % (
+                    1 + track * discs // (total + 1), discs)
+            if albumartist is not None:
+                song["albumartist"] = albumartist
+                song["artist"] = rand.choice(artist_names)
+            if rand.random() < multi_value:
+                song["artist"] += u"\n" + rand.choice(artist_names)
+            if rand.random() < multi_value:
+                song["genre"] += u"\n" + rand.choice(GENRES)
+            if rand.random() < 0.3:
+                song["~#rating"] = rand.choice([0.2, 0.4, 0.6, 0.8, 1.0])
+                song["~#lastplayed"] = base_time + rand.randint(0, 10 ** 8)
+            songs.append(song)
+
+    return songs
+
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """Register a benchmark.
+
+    The function gets passed the list of songs and has to return a callable
+    which runs the measured code. Everything done before returning is setup
+    and not measured.
+    """
+
+    BENCHMARKS.append(func)
+    return func
+
+
+@benchmark
+def library_save(songs):
+    from quodlibet.library.libraries import SongLibrary
+
+    temp = mkdtemp()
+    lib = SongLibrary()
+    lib.add(songs)
+
+    def run():
+        lib.save(os.path.join(temp, "songs"))
+        lib.dirty = True
+
+    run.cleanup = lambda: shutil.rmtree(temp)
+    return run
+
+
+@benchmark
+def library_load(songs):
+    from quodlibet.library.libraries import SongLibrary
+
+    temp = mkdtemp()
+    path = os.path.join(temp, "songs")
+    lib = SongLibrary()
+    lib.add(songs)
+    lib.save(path)
+    lib.destroy()
+
+    def run():
+        SongLibrary().load(path)
+
+    run.cleanup = lambda: shutil.rmtree(temp)
+    return run
+
+
+@benchmark
+def query_search(songs):
+    from quodlibet.query import Query
+
+    queries = [Query(q) for q in [
+        u"ka mi", u"artist=ka", u"#(playcount > 5)",
+        u"&(genre=rock, #(date < 1990))", u"#(added < 5 years ago)",
+        u"|(album=/^Su/, title=\"Lo\"c)"]]
+
+    def run():
+        for query in queries:
+            query.filter(songs)
+
+    return run
+
+
+@benchmark
+def album_library(songs):
+    from quodlibet.library.libraries import SongLibrary, AlbumLibrary
+
+    lib = SongLibrary()
+    lib.add(songs)
+
+    def run():
+        # drop the cached album keys, they are part of the work
+        for song in songs:
+            song.__dict__.pop("album_key", None)
+        AlbumLibrary(lib).destroy()
+
+    return run
+
+
+@benchmark
+def pane_add_songs(songs):
+    from quodlibet.browsers.paned.models import PaneModel
+    from quodlibet.browsers.paned.util import PaneConfig
+    from quodlibet.pattern import format_cache
+
+    configs = [PaneConfig(p) for p in [
+        u"genre", u"~people", u"<album|<album> (<date>)>"]]
+
+    def run():
+        format_cache.clear()
+        for pane_config in configs:
+            PaneModel(pane_config).add_songs(songs)
+
+    return run
+
+
+@benchmark
+def songlist_sort(songs):
+    from quodlibet.library.libraries import SongLibrary
+    from quodlibet.qltk.songlist import SongList
+
+    songlist = SongList(SongLibrary())
+    songlist.set_sort_orders([
+        (u"~people", False), (u"~album~discsubtitle", False),
+        (u"~#track", False)])
+
+    def run():
+        songlist._sort_songs(list(songs))
+
+    run.cleanup = songlist.destroy
+    return run
+
+
+def _songlist_set_songs(songs, update_cost, refill_cost):
+    from quodlibet.library.libraries import SongLibrary
+    from quodlibet.qltk import songlist as module
+
+    costs = (module._UPDATE_COST, module._REFILL_COST)
+    module._UPDATE_COST = module._RowCost(update_cost)
+    module._REFILL_COST = module._RowCost(refill_cost)
+
+    songlist = module.SongList(SongLibrary())
+    songlist.set_sort_orders([(u"artist", False), (u"~#track", False)])
+    # switch between all songs and all but every 100th one
+    lists = [songs, [s for i, s in enumerate(songs) if i % 100]]
+    songlist.set_songs(list(lists[0]))
+
+    def run():
+        lists.reverse()
+        songlist.set_songs(list(lists[0]), scroll=False)
+
+    def cleanup():
+        songlist.destroy()
+        module._UPDATE_COST, module._REFILL_COST = costs
+
+    run.cleanup = cleanup
+    return run
+
+
+@benchmark
+def songlist_update(songs):
+    # set_songs() only inserting and removing the changed rows
+    return _songlist_set_songs(songs, 0, 1)
+
+
+@benchmark
+def songlist_refill(songs):
+    # set_songs() sorting all songs and filling the model again
+    return _songlist_set_songs(songs, 1, 0)
+
+
+@benchmark
+def pattern_format(songs):
+    from quodlibet.pattern import Pattern
+
+    patterns = [Pattern(p) for p in [
+        u"<artist> - <album> - <~#track> <title>",
+        u"<~people|<~people>|Unknown> <date|(<date>)>",
+        u"<albumartist|<albumartist>|<artist>>/<album>/"
+        u"<discnumber|<discnumber>-><tracknumber>"]]
+
+    def run():
+        for pattern in patterns:
+            for song in songs:
+                pattern.format(song)
+
+    return run
+
+
+def _measure(func, songs, repeat):
+    run = func(songs)
+    try:
+        times = []
+        for i in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        cleanup = getattr(run, "cleanup", None)
+        if cleanup is not None:
+            cleanup()
+
+    return {
+        "best": min(times),
+        "mean": sum(times) / len(times),
+        "peak_memory": peak,
+    }
+
+
+def run_benchmarks(size=10000, repeat=3, seed=0, names=None):
+    """Returns a dict of benchmark name -> result dict"""
+
+    songs = generate_songs(size, seed=seed)
+
+    # widgets like the song list read their settings from the config
+    config.init()
+    try:
+        results = {}
+        for func in BENCHMARKS:
+            name = func.__name__
+            if names and name not in names:
+                continue
+            results[name] = _measure(func, songs, repeat)
+    finally:
+        config.quit()
+    return results
+
+
+def print_results(results, baseline=None, file=None):
+    """Print a result table, compared to a baseline if given"""
+
+    if file is None:
+        file = sys.stdout
+
+    header = u"%-16s %10s %10s %10s" % (
+        u"benchmark", u"best (ms)", u"mean (ms)", u"peak (KiB)")
+    if baseline is not None:
+        header += u" %10s %10s" % (u"time", u"memory")
+    print_(header, file=file)
+    print_(u"-" * len(header), file=file)
+
+    for name, result in sorted(results.items()):
+        line = u"%-16s %10.2f %10.2f %10d" % (
+            name, result["best"] * 1000, result["mean"] * 1000,
+            result["peak_memory"] // 1024)
+        if baseline is not None and name in baseline:
+            old = baseline[name]
+            line += u" %+9.1f%% %+9.1f%%" % (
+                _change(old["best"], result["best"]),
+                _change(old["peak_memory"], result["peak_memory"]))
+        print_(line, file=file)
+
+
+def _change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) * 100.0 / old
+
+
+def main(size=10000, repeat=3, names=None, save=None, compare=None):
+    """Run benchmarks, print the results and optionally save them to
+    or compare them with a JSON file.
+    """
+
+    baseline = None
+    if compare is not None:
+        with open(compare, "r") as h:
+            baseline = json.load(h)["results"]
+
+    results = run_benchmarks(size=size, repeat=repeat, names=names)
+    print_results(results, baseline)
+
+    if save is not None:
+        with open(save, "w") as h:
+            json.dump({"size": size, "results": results}, h, indent=4,
+                      sort_keys=True)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from collections import defaultdict
+
+from quodlibet.formats import AudioFile
+from quodlibet.qltk.songmodel import PlaylistModel
+
+from tests.plugin import PluginTestCase
+
+
+class TPlaycountEqualizer(PluginTestCase):
+
+    def setUp(self):
+        self.mod = self.modules["playcounteq"]
+
+    def test_sampler(self):
+        sampler = self.mod.PlaycountSampler([0, 5, 5, 10, 2])
+        self.assertEqual(len(sampler), 5)
+        chosen = defaultdict(int)
+        for i in range(500):
+            chosen[sampler.choose()] += 1
+        self.assertFalse(3 in chosen)
+        self.assertTrue(chosen[0] > chosen[1])
+
+        sampler.remove(3)
+        sampler.remove(3)
+        self.assertEqual(len(sampler), 4)
+        # the most played remaining ones have no weight
+        for i in range(100):
+            self.assertTrue(sampler.choose() in (0, 4))
+
+        sampler.remove(0)
+        sampler.remove(4)
+        # all equal
+        self.assertEqual(
+            set(sampler.choose() for i in range(100)), set([1, 2]))
+        sampler.remove(1)
+        sampler.remove(2)
+        self.assertTrue(sampler.choose() is None)
+        self.assertTrue(self.mod.PlaycountSampler([]).choose() is None)
+
+    def test_order(self):
+        songs = [AudioFile({"~#playcount": i % 3}) for i in range(10)]
+        pl = PlaylistModel()
+        pl.set(songs)
+        order = self.mod.PlaycountEqualizer()
+        played = []
+        cur = None
+        for i in range(len(songs)):
+            cur = order.next_explicit(pl, cur)
+            played.append(pl.get_path(cur).get_indices()[0])
+        self.assertTrue(order.next_explicit(pl, cur) is None)
+        self.assertEqual(sorted(played), list(range(len(songs))))
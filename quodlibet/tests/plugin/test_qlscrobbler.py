@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+import threading
+
+from senf import fsnative
+
+from quodlibet import config
+from quodlibet.formats import AudioFile
+from quodlibet.compat import PY2, parse_qs
+
+from tests import mkdtemp
+from tests.plugin import PluginTestCase
+
+if PY2:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+else:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+
+class AudioScrobblerHandler(BaseHTTPRequestHandler):
+    """A minimal stand-in for the AudioScrobbler 1.2 endpoint"""
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, text):
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        base = "http://%s:%d" % self.server.server_address
+        self._respond(u"OK\nsession\n%s/np\n%s/submit\n" % (base, base))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path == "/submit":
+            if self.server.fail:
+                self.server.fail -= 1
+                self._respond(u"FAILED\n")
+                return
+            titles = [data["t[%d]" % i][0] for i in range(len(data))
+                      if "t[%d]" % i in data]
+            self.server.batches.append(titles)
+        self._respond(u"OK\n")
+
+
+class TQLScrobbler(PluginTestCase):
+
+    def setUp(self):
+        config.init()
+        self.mod = self.modules["QLScrobbler"]
+        self.temp = mkdtemp()
+        self.Queue = self.mod.QLSubmitQueue
+        self.paths = (self.Queue.JOURNAL, self.Queue.DUMP)
+        self.Queue.JOURNAL = os.path.join(self.temp, fsnative(u"journal"))
+        self.Queue.DUMP = os.path.join(self.temp, fsnative(u"dump"))
+        self.Queue.journal = None
+        self.Queue.queue[:] = []
+
+        self.server = HTTPServer(("127.0.0.1", 0), AudioScrobblerHandler)
+        self.server.batches = []
+        self.server.fail = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        config.set("plugins", "scrobbler_service", "Other")
+        config.set("plugins", "scrobbler_url",
+                   "http://%s:%d" % self.server.server_address)
+        config.set("plugins", "scrobbler_username", "user")
+        config.set("plugins", "scrobbler_password", "pass")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.Queue.journal = None
+        self.Queue.queue[:] = []
+        self.Queue.JOURNAL, self.Queue.DUMP = self.paths
+        shutil.rmtree(self.temp)
+        config.quit()
+
+    def _submit(self, queue, count):
+        for i in range(count):
+            song = AudioFile({"artist": u"a", "title": u"t%d" % i})
+            queue.submit(song, 1000 + i)
+
+    def _start(self, queue):
+        thread = threading.Thread(target=queue.run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _stop(self, queue, thread):
+        queue.stop()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+
+    def test_journal(self):
+        journal = self.mod.ScrobbleJournal(self.Queue.JOURNAL)
+        self.assertEqual(journal.load(), [])
+        journal.append([{"t": u"1"}, {"t": u"2"}, {"t": u"3"}])
+        journal.ack(1, [{"t": u"2"}, {"t": u"3"}])
+        # a partially written record after a crash
+        with open(self.Queue.JOURNAL, "ab") as h:
+            h.write(b'{"id": 3, "so')
+
+        journal = self.mod.ScrobbleJournal(self.Queue.JOURNAL)
+        self.assertEqual(journal.load(), [{"t": u"2"}, {"t": u"3"}])
+        journal.append([{"t": u"4"}])
+        journal.ack(3, [])
+        self.assertEqual(
+            self.mod.ScrobbleJournal(self.Queue.JOURNAL).load(), [])
+
+    def test_journal_rewrite_atomic(self):
+        journal = self.mod.ScrobbleJournal(self.Queue.JOURNAL)
+        journal.append([{"t": u"1"}, {"t": u"2"}])
+
+        # the pending scrobbles get written together with the truncation,
+        # not appended afterwards
+        def fail(records):
+            raise AssertionError
+        journal._write = fail
+        journal._rewrite([{"t": u"2"}])
+
+        self.assertEqual(
+            self.mod.ScrobbleJournal(self.Queue.JOURNAL).load(),
+            [{"t": u"2"}])
+
+    def test_queue_persistent(self):
+        queue = self.Queue()
+        self._submit(queue, 3)
+        self.Queue.journal = None
+        self.Queue.queue[:] = []
+        queue = self.Queue()
+        self.assertEqual(
+            [s["t"] for s in queue.queue], [u"t0", u"t1", u"t2"])
+
+    def test_drain_batches(self):
+        queue = self.Queue()
+        self._submit(queue, 120)
+        thread = self._start(queue)
+        try:
+            self.assertTrue(queue.drain(10))
+        finally:
+            self._stop(queue, thread)
+
+        self.assertEqual(
+            [len(b) for b in self.server.batches], [50, 50, 20])
+        self.assertEqual(self.server.batches[2][-1], u"t119")
+        self.Queue.journal = None
+        self.assertEqual(
+            self.mod.ScrobbleJournal(self.Queue.JOURNAL).load(), [])
+
+    def test_backoff(self):
+        old_delay = self.Queue.MAX_SUBMIT_DELAY
+        self.Queue.MAX_SUBMIT_DELAY = 0
+        try:
+            queue = self.Queue()
+            self.server.fail = 2
+            self._submit(queue, 3)
+            thread = self._start(queue)
+            try:
+                self.assertTrue(queue.drain(10))
+            finally:
+                self._stop(queue, thread)
+        finally:
+            self.Queue.MAX_SUBMIT_DELAY = old_delay
+        self.assertEqual(self.server.batches, [[u"t0", u"t1", u"t2"]])
+
+    def test_drain_offline(self):
+        config.set("plugins", "scrobbler_offline", "true")
+        queue = self.Queue()
+        self._submit(queue, 1)
+        self.assertFalse(queue.drain(0))
@@ -15,6 +15,7 @@ from quodlibet.plugins import Plugin
 from quodlibet.plugins.query import QueryPlugin, QueryPluginError
 from quodlibet.plugins.query import QUERY_HANDLER
 from quodlibet.formats import AudioFile
+from quodlibet.query import Query
 
 
 class FakeQueryPlugin(QueryPlugin):
@@ -29,6 +30,28 @@ class FakeQueryPlugin(QueryPlugin):
 fake_plugin = Plugin(FakeQueryPlugin)
 
 
+class FakeBatchQueryPlugin(QueryPlugin):
+    PLUGIN_ID = 'fake_batch_query_plugin'
+    PLUGIN_NAME = 'fake_batch_query'
+
+    key = 'fake_batch'
+
+    batches = []
+
+    def parse_body(self, body):
+        return body.strip()
+
+    def search(self, data, body):
+        return data("title") == body
+
+    def filter(self, songs, body):
+        songs = list(songs)
+        self.batches.append(len(songs))
+        return [s for s in songs if s("title") == body]
+
+fake_batch_plugin = Plugin(FakeBatchQueryPlugin)
+
+
 class TQueryPlugins(PluginTestCase):
 
     def test_handler(self):
@@ -39,6 +62,23 @@ class TQueryPlugins(PluginTestCase):
         QUERY_HANDLER.plugin_disable(fake_plugin)
         self.failUnlessRaises(KeyError, QUERY_HANDLER.get_plugin, 'fake')
 
+    def test_handler_filter(self):
+        QUERY_HANDLER.plugin_enable(fake_batch_plugin)
+        try:
+            songs = [AudioFile({'title': t, 'artist': u'x'})
+                     for t in [u'a', u'b', u'a']]
+            query = Query(u"@(fake_batch: a)")
+            self.failUnlessEqual(query.filter(songs), [songs[0], songs[2]])
+            self.failUnlessEqual(FakeBatchQueryPlugin.batches, [3])
+            query = Query(u"&(artist=x, @(fake_batch: b))")
+            self.failUnlessEqual(query.filter(songs), [songs[1]])
+            self.failUnlessEqual(FakeBatchQueryPlugin.batches, [3, 3])
+            self.failUnless(query.search(songs[1]))
+            self.failIf(query.search(songs[0]))
+        finally:
+            QUERY_HANDLER.plugin_disable(fake_batch_plugin)
+            del FakeBatchQueryPlugin.batches[:]
+
     def test_conditional(self):
         if 'conditional_query' not in self.plugins:
             return
@@ -127,3 +167,17 @@ class TQueryPlugins(PluginTestCase):
         self.failIf(plugin.search(song2, body1))
         self.failUnless(plugin.search(song2, body2))
         self.failUnless(plugin.search(song2, body3))
+
+        self.failUnlessEqual(plugin.filter([song1, song2], body1), [song1])
+        self.failUnlessEqual(plugin.filter([song1, song2], body3), [song2])
+
+        # a trailing comment doesn't break the compiled function
+        body = plugin.parse_body("s('title') == 'baz' # comment")
+        self.failUnlessEqual(plugin.filter([song1, song2], body), [song2])
+
+        # errors only exclude the failing songs
+        body = plugin.parse_body("1 / s('~#rating') > 2")
+        song3 = AudioFile({'title': 'zero', '~#rating': 0.0})
+        self.failUnlessEqual(
+            plugin.filter([song1, song2, song3], body), [song2])
+        self.failIf(plugin.search(song3, body))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from quodlibet.formats import AudioFile
+from quodlibet.qltk.songmodel import PlaylistModel
+
+from tests.plugin import PluginTestCase
+
+
+def _song(grouping, album=u"a"):
+    song = AudioFile({"album": album})
+    if grouping:
+        song["grouping"] = grouping
+    return song
+
+
+class TShuffleByGrouping(PluginTestCase):
+
+    def setUp(self):
+        self.mod = self.modules["Shuffle by Grouping"]
+        self.songs = [_song(u"x"), _song(u"x"), _song(u"y"), _song(u""),
+                      _song(u""), _song(u"x")]
+
+    def test_group_index(self):
+        index = self.mod.GroupIndex(self.songs, "grouping", "grouping")
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index.starts, [0, 2, 3, 4, 5])
+        self.assertEqual(index.group_of, [0, 0, 1, 2, 3, 4])
+        self.assertTrue(index.same_group(0, 1))
+        self.assertFalse(index.same_group(3, 4))
+
+        index.mark_played(1)
+        index.mark_played(0)
+        index.mark_played(5)
+        self.assertEqual(index.unplayed, 3)
+        for i in range(20):
+            self.assertTrue(index.choose() in (2, 3, 4))
+        for i in (2, 3, 4):
+            index.mark_played(i)
+        self.assertEqual(index.unplayed, 0)
+        self.assertTrue(index.choose() is None)
+
+    def test_group_index_no_filter(self):
+        index = self.mod.GroupIndex(self.songs, "album", "")
+        self.assertEqual(index.starts, [0])
+
+    def test_order(self):
+        self.mod.pconfig.set("grouping", "grouping")
+        self.mod.pconfig.set("grouping_filter", "grouping")
+        try:
+            pl = PlaylistModel()
+            pl.set(self.songs)
+            order = self.mod.ShuffleByGrouping()
+            played = []
+            cur = None
+            for i in range(len(self.songs)):
+                cur = order.next_explicit(pl, cur)
+                played.append(pl.get_path(cur).get_indices()[0])
+            self.assertTrue(order.next_explicit(pl, cur) is None)
+        finally:
+            self.mod.pconfig.reset("grouping")
+            self.mod.pconfig.reset("grouping_filter")
+
+        self.assertEqual(sorted(played), list(range(len(self.songs))))
+        self.assertEqual(played.index(1), played.index(0) + 1)
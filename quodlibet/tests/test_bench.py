@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+
+from tests import TestCase, mkstemp
+from .helper import capture_output
+
+from tests import bench
+
+
+class TBench(TestCase):
+
+    def test_generate_deterministic(self):
+        a = bench.generate_songs(200, seed=42)
+        b = bench.generate_songs(200, seed=42)
+        self.assertEqual(len(a), 200)
+        self.assertEqual([dict(s) for s in a], [dict(s) for s in b])
+        c = bench.generate_songs(200, seed=43)
+        self.assertNotEqual([dict(s) for s in a], [dict(s) for s in c])
+
+    def test_generate_multi_value(self):
+        songs = bench.generate_songs(500, multi_value=1.0)
+        self.assertTrue(all(len(s.list("artist")) == 2 for s in songs))
+        songs = bench.generate_songs(500, multi_value=0.0)
+        self.assertTrue(all(len(s.list("genre")) == 1 for s in songs))
+
+    def test_run_all(self):
+        results = bench.run_benchmarks(size=50, repeat=1)
+        self.assertEqual(
+            sorted(results), sorted(f.__name__ for f in bench.BENCHMARKS))
+        for result in results.values():
+            self.assertTrue(result["best"] >= 0)
+            self.assertTrue(result["peak_memory"] >= 0)
+
+    def test_save_compare(self):
+        fd, path = mkstemp(".json")
+        os.close(fd)
+        try:
+            with capture_output() as (out, err):
+                bench.main(size=20, repeat=1, names=["pattern_format"],
+                           save=path)
+                bench.main(size=20, repeat=1, names=["pattern_format"],
+                           compare=path)
+            lines = out.getvalue().splitlines()
+            self.assertTrue(lines[-1].startswith("pattern_format"))
+            self.assertTrue(lines[-1].endswith("%"))
+        finally:
+            os.unlink(path)
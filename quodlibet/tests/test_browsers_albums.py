@@ -7,6 +7,7 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import time
 from functools import cmp_to_key
 
 from gi.repository import Gtk
@@ -19,10 +20,11 @@ from .helper import realized
 from quodlibet import config
 
 from quodlibet.browsers.albums import AlbumList
-from quodlibet.browsers.albums.models import AlbumItem
+from quodlibet.browsers.albums.models import AlbumItem, AlbumModel
 from quodlibet.browsers.albums.prefs import Preferences, DEFAULT_PATTERN_TEXT
 from quodlibet.browsers.albums.main import (compare_title, compare_artist,
-    compare_genre, compare_rating, compare_date)
+    compare_genre, compare_rating, compare_date, get_title_key,
+    get_artist_key)
 from quodlibet.formats import AudioFile
 from quodlibet.library import SongLibrary, SongLibrarian
 from quodlibet.util.collection import Album
@@ -126,6 +128,55 @@ class TAlbumSort(TestCase):
         self.assertOrder(compare_rating, [AlbumItem(None), a, b, c, n])
 
 
+class TAlbumModel(TestCase):
+
+    def setUp(self):
+        self.library = SongLibrary()
+        for af in SONGS:
+            af.sanitize()
+        self.library.add(SONGS)
+        self.model = AlbumModel(self.library)
+
+    def tearDown(self):
+        self.model.destroy()
+        self.library.destroy()
+
+    def _titles(self):
+        return [i.album and i.album.title for i in self.model.itervalues()]
+
+    def test_sort_key(self):
+        self.model.set_sort_key(get_title_key)
+        self.assertEqual(self._titles(), [None, "one", "three", "two"])
+        self.model.set_sort_key(get_artist_key)
+        self.assertEqual(self._titles(), [None, "three", "two", "one"])
+
+    def test_add_change(self):
+        self.model.set_sort_key(get_artist_key)
+        song = AudioFile({"album": "four", "artist": "a",
+                          "~filename": fsnative(u"/a")})
+        self.library.add([song])
+        self.assertEqual(
+            self._titles(), [None, "four", "three", "two", "one"])
+        song["artist"] = "zzz"
+        self.library.changed([song])
+        self.assertEqual(
+            self._titles(), [None, "three", "two", "one", "four"])
+
+        changes = [i.changes for i in self.model.itervalues()]
+        self.library.changed([song])
+        self.assertEqual(
+            [i.changes for i in self.model.itervalues()],
+            changes[:-1] + [changes[-1] + 1])
+
+        self.library.remove([song])
+        self.assertEqual(self._titles(), [None, "three", "two", "one"])
+        self.library.remove([SONGS[0]])
+        self.assertEqual(self._titles(), [None, "three", "two"])
+        song["artist"] = "a"
+        self.library.add([song])
+        self.assertEqual(self._titles(), [None, "four", "three", "two"])
+
+
 class TAlbumBrowser(TestCase):
 
     def setUp(self):
@@ -182,6 +233,21 @@ class TAlbumBrowser(TestCase):
             self._wait()
             self.failUnlessEqual(set(self.songs), set(SONGS))
 
+    def test_filter_background(self):
+        self.bar.FILTER_THREAD_MIN = 0
+        search = self.bar._AlbumList__search
+        with realized(self.bar):
+            search.set_text("artist=piman")
+            search.emit("query-changed", "artist=piman")
+            view = self.bar.view
+            for i in range(1000):
+                if len(view.get_model()) == 2:
+                    break
+                Gtk.main_iteration_do(False)
+                time.sleep(0.005)
+            self.failUnlessEqual(len(view.get_model()), 2)
+            self.failUnlessEqual(view.get_model()[1][0].album.title, "one")
+
     def test_filter_album(self):
         with realized(self.bar):
             self.bar.filter_text("dsagfsag")
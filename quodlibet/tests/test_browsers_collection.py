@@ -85,6 +85,45 @@ class TCollectionAlbums(TestCase):
         model.remove_albums(self.albums)
         self.failUnlessEqual(len(model), 0)
 
+    def test_model_change_moves_album(self):
+        model = CollectionTreeStore()
+        model.set_albums([("~people", 0)], self.albums)
+        album = [a for a in listvalues(self.albums) if a.title == "one"][0]
+        path = model.get_path_for_album(album)
+        self.failUnlessEqual(model[path.get_indices()[0]][0], "piman")
+
+        song = list(album.songs)[0]
+        song["artist"] = "quux"
+        try:
+            album.finalize()
+            model.change_albums([album])
+            # old container is gone, new one was created
+            self.failUnlessEqual(
+                sorted(r[0] for r in model if r[0] is not UnknownNode),
+                ["boris", "mu", "quux"])
+            path = model.get_path_for_album(album)
+            self.failUnlessEqual(model[path.get_indices()[0]][0], "quux")
+            self.failUnlessEqual(model.get_album(model.get_iter(path)), album)
+        finally:
+            song["artist"] = "piman"
+            album.finalize()
+
+    def test_model_multi_value_paths(self):
+        model = CollectionTreeStore()
+        model.set_albums([("~people", 0)], self.albums)
+        album = [a for a in listvalues(self.albums) if a.title == "two"][0]
+        paths = model.get_paths_for_album(album)
+        self.failUnlessEqual(len(paths), 2)
+        first = min(paths, key=lambda p: p.get_indices())
+        self.failUnlessEqual(model.get_path_for_album(album), first)
+
+        model.add_albums([album])
+        self.failUnlessEqual(len(model.get_paths_for_album(album)), 2)
+        model.remove_albums([album])
+        self.failUnlessEqual(model.get_paths_for_album(album), [])
+        self.failIf("mu" in [r[0] for r in model])
+        self.failUnless("boris" in [r[0] for r in model])
+
     def test_utils(self):
         model = CollectionTreeStore()
         model.set_albums([("~people", 0)], self.albums)
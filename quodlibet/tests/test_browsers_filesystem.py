@@ -4,10 +4,18 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from tests import TestCase
+import os
+import shutil
 
-from quodlibet.browsers.filesystem import FileSystem
+from senf import fsnative
+
+from tests import TestCase, mkdtemp, get_data_path
+from tests.helper import capture_output
+
+from quodlibet.browsers.filesystem import FileSystem, _list_directory, \
+    _load_files, _get_prefetch_dirs
 from quodlibet.library import SongLibrary
+from quodlibet.util.path import normalize_path
 import quodlibet.config
 
 
@@ -24,3 +32,65 @@ class TFileSystem(TestCase):
     def tearDown(self):
         self.bar.destroy()
         quodlibet.config.quit()
+
+
+class TFileSystemLoading(TestCase):
+
+    def setUp(self):
+        self.temp = normalize_path(mkdtemp(), canonicalise=True)
+        self.dirs = []
+        for name in [u"a", u"b", u"c"]:
+            path = os.path.join(self.temp, fsnative(name))
+            os.mkdir(path)
+            self.dirs.append(path)
+        os.mkdir(os.path.join(self.dirs[1], fsnative(u"sub")))
+        for name in [u"2.ogg", u"1.ogg"]:
+            shutil.copy(get_data_path("empty.ogg"),
+                        os.path.join(self.dirs[1], fsnative(name)))
+        with open(os.path.join(self.dirs[1], fsnative(u"foo.txt")), "w"):
+            pass
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_list_directory(self):
+        self.assertEqual(
+            [os.path.basename(p) for p in _list_directory(self.dirs[1])],
+            [fsnative(u"1.ogg"), fsnative(u"2.ogg")])
+        self.assertEqual(
+            _list_directory(os.path.join(self.temp, fsnative(u"nope"))), [])
+
+    def test_load_files(self):
+        paths = _list_directory(self.dirs[1])
+        result = _load_files(paths, {}, {})
+        self.assertEqual([r[0] for r in result], paths)
+        self.assertTrue(all(r[2] for r in result))
+        songs = [r[1] for r in result]
+        self.assertEqual([s("~filename") for s in songs], paths)
+
+        # known songs get reused, cached ones only if unchanged
+        library = {paths[0]: songs[0]}
+        cache = {paths[1]: songs[1]}
+        result = _load_files(paths, library, cache)
+        self.assertEqual(result, [(paths[0], songs[0], False),
+                                  (paths[1], songs[1], False)])
+
+        songs[1]["~#mtime"] = 0
+        result = _load_files(paths, library, cache)
+        self.assertTrue(result[1][2])
+        self.assertFalse(result[1][1] is songs[1])
+
+    def test_load_files_invalid(self):
+        path = os.path.join(self.dirs[0], fsnative(u"broken.ogg"))
+        with open(path, "wb") as h:
+            h.write(b"nope")
+        with capture_output():
+            result = _load_files([path], {}, {})
+        self.assertEqual(result, [(path, None, True)])
+
+    def test_prefetch_dirs(self):
+        sub = os.path.join(self.dirs[1], fsnative(u"sub"))
+        self.assertEqual(_get_prefetch_dirs([self.dirs[1]]),
+                         [self.dirs[2], sub, self.dirs[0]])
+        self.assertEqual(_get_prefetch_dirs([self.dirs[0], self.dirs[1]]),
+                         [self.dirs[2], sub])
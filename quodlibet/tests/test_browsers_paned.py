@@ -523,6 +523,41 @@ class TPaneModel(TestCase):
             m.remove_songs([song], True)
             self._verify_model(m)
 
+    def test_remove_songs_only_changes_affected(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        changed = []
+        m.connect("row-changed", lambda m, path, iter_: changed.append(
+            m.get_value(iter_).key))
+        m.remove_songs([SONGS[2]], False)
+        self.assertEqual(changed, ["piman"])
+        del changed[:]
+        m.remove_songs([SONGS[4]], True)
+        self.assertEqual(changed, [""])
+        self._verify_model(m)
+        self.assertFalse(isinstance(m[-1][0], UnknownEntry))
+
+    def test_remove_readd_keeps_order(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        keys = [e.key for e in m.itervalues()]
+        for song in SONGS:
+            m.remove_songs([song], True)
+            m.add_songs([song])
+            self._verify_model(m)
+            self.assertEqual([e.key for e in m.itervalues()], keys)
+
+    def test_clear_resets(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        m.add_songs(SONGS)
+        m.clear()
+        m.add_songs(SONGS[:2])
+        self._verify_model(m)
+        self.assertEqual(m.list("artist"), {"boris", "mu"})
+
     def test_matches(self):
         conf = PaneConfig("artist")
         m = PaneModel(conf)
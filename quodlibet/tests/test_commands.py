@@ -16,7 +16,7 @@ from quodlibet import config
 from quodlibet import app
 from quodlibet.compat import text_type
 
-from quodlibet.commands import registry
+from quodlibet.commands import registry, CommandRegistry, CommandError
 
 
 class TCommands(TestCase):
@@ -94,3 +94,71 @@ class TCommands(TestCase):
         self.__send("enqueue-files "
                     "one,two\\, please,slash\\\\.mp3,four")
         self.assertEquals(app.window.playlist.q.get(), songs)
+
+    def test_print_query(self):
+        songs = [AudioFile({"~filename": fsnative(fn), "title": fn})
+                 for fn in [u"/one", u"/two"]]
+        app.library.add(songs)
+        self.assertEqual(self.__send(u"print-query title=one"), u"/one\n")
+        lines = list(registry.run_lines(app, "print-query", u"title=t"))
+        self.assertEqual(lines, [u"/two"])
+
+    def test_instrumentation(self):
+        from quodlibet.util import instrument
+
+        enabled = instrument.is_enabled()
+        try:
+            self.__send("instrumentation on")
+            self.assertTrue(instrument.is_enabled())
+            self.assertTrue(u'"enabled": true' in
+                            self.__send("instrumentation"))
+            self.__send("instrumentation reset")
+            self.__send("instrumentation off")
+            self.assertFalse(instrument.is_enabled())
+        finally:
+            instrument.enable(enabled)
+
+
+class TCommandRegistry(TestCase):
+
+    def setUp(self):
+        self.registry = CommandRegistry()
+
+        @self.registry.register("text", optional=1)
+        def text(app, value=None):
+            return value
+
+        @self.registry.register("lines")
+        def lines(app):
+            yield fsnative(u"a")
+            yield fsnative(u"b")
+
+        @self.registry.register("broken")
+        def broken(app):
+            yield fsnative(u"a")
+            raise CommandError("foo")
+
+    def test_parse_line(self):
+        self.assertEqual(self.registry.parse_line(fsnative(u"foo")),
+                         (u"foo", []))
+        self.assertEqual(self.registry.parse_line(fsnative(u"foo a b")),
+                         (u"foo", [u"a b"]))
+
+    def test_run(self):
+        self.assertEqual(self.registry.run(None, "text"), None)
+        self.assertEqual(
+            self.registry.run(None, "text", fsnative(u"x\n")), u"x\n")
+        self.assertEqual(self.registry.run(None, "lines"), u"a\nb\n")
+        self.assertRaises(CommandError, self.registry.run, None, "broken")
+        self.assertRaises(CommandError, self.registry.run, None, "nope")
+
+    def test_run_lines(self):
+        self.assertEqual(list(self.registry.run_lines(None, "text")), [])
+        self.assertEqual(
+            list(self.registry.run_lines(None, "text", fsnative(u"x\ny"))),
+            [u"x", u"y"])
+        self.assertEqual(
+            list(self.registry.run_lines(None, "lines")), [u"a", u"b"])
+        lines = self.registry.run_lines(None, "broken")
+        self.assertEqual(next(lines), u"a")
+        self.assertRaises(CommandError, next, lines)
@@ -68,12 +68,19 @@ class TRatingsPrefs(TestCase):
         # Read it back, and it's fine
         self.failUnlessEqual(self.prefs.number, 10)
         self.failUnlessEqual(self.prefs.default, 0.1)
-        # .. but modify behind the scenes (unsupported)...
+        # .. and modifying behind the scenes invalidates the cache
         config.reset("settings", "ratings")
         config.reset("settings", "default_rating")
-        # ...and caching will return the old one
-        self.failUnlessEqual(self.prefs.number, 10)
-        self.failUnlessEqual(self.prefs.default, 0.1)
+        self.failUnlessEqual(self.prefs.number, self.initial_number)
+        self.failUnlessEqual(
+            self.prefs.default,
+            float(config.INITIAL["settings"]["default_rating"]))
+
+    def test_caching_init(self):
+        self.prefs.number = 10
+        config.quit()
+        config.init()
+        self.failUnlessEqual(self.prefs.number, self.initial_number)
 
     def test_all(self):
         self.prefs.number = 5
@@ -125,6 +125,27 @@ class TPickle(TestCase):
         assert i["int"] == 42
         assert i["float"] == 1.25
 
+    def test_shared_values(self):
+        items = []
+        for i in range(2):
+            i = AudioFile.__new__(list(formats.types)[0])
+            dict.__init__(i, {
+                "".join(["gen", "re"]): "".join(["Ro", "ck"]),
+                "title": "".join(["Ti", "tle"]),
+                "~#bitrate": int("320"),
+            })
+            items.append(i)
+        items = load_audio_files(pickle_dumps(items, 2))
+
+        if not PY3:
+            return
+
+        a, b = items
+        assert a["genre"] is b["genre"]
+        assert a["~#bitrate"] is b["~#bitrate"]
+        keys_a = {k: k for k in a.keys()}
+        assert all(keys_a[k] is k for k in b.keys())
+
     def test_sanitize_py2_normal(self):
         if PY3:
             return
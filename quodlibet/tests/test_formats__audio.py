@@ -966,6 +966,49 @@ class TAudioFile(TestCase):
         self.assertEqual(audio["title"], u"foo")
 
 
+class Tshare_tag(TestCase):
+
+    def test_shared(self):
+        if not PY3:
+            return
+
+        a = AudioFile({"genre": u"".join([u"Ja", u"zz"]), "~#rating": 0.75,
+                       "title": u"".join([u"fo", u"o"])})
+        b = AudioFile({"genre": u"".join([u"Ja", u"zz"]), "~#rating": 0.75,
+                       "title": u"".join([u"fo", u"o"])})
+        self.assertTrue(a["genre"] is b["genre"])
+        self.assertTrue(a["~#rating"] is b["~#rating"])
+
+    def test_types_preserved(self):
+        a = AudioFile({"~#playcount": 1})
+        b = AudioFile({"~#playcount": 1.0})
+        c = AudioFile({"~#playcount": True})
+        self.assertTrue(isinstance(a["~#playcount"], int))
+        self.assertTrue(isinstance(b["~#playcount"], float))
+        self.assertTrue(c["~#playcount"] is True)
+
+    def test_shared_numbers_bounded(self):
+        if not PY3:
+            return
+
+        from quodlibet.formats import _audio
+
+        old = _audio.MAX_SHARED_NUMBERS, dict(_audio._shared_numbers)
+        _audio._shared_numbers.clear()
+        _audio.MAX_SHARED_NUMBERS = 2
+        try:
+            songs = [AudioFile({"~#length": 1000.5 + i}) for i in range(5)]
+            self.assertEqual(len(_audio._shared_numbers), 2)
+            other = AudioFile({"~#length": 1000.0 + 0.5})
+            self.assertTrue(other["~#length"] is songs[0]["~#length"])
+            other = AudioFile({"~#length": 1000.0 + 4.5})
+            self.assertEqual(other["~#length"], songs[4]["~#length"])
+        finally:
+            _audio.MAX_SHARED_NUMBERS = old[0]
+            _audio._shared_numbers.clear()
+            _audio._shared_numbers.update(old[1])
+
+
 class TAudioFormats(TestCase):
 
     def setUp(self):
@@ -13,6 +13,7 @@ from senf import fsnative
 from quodlibet.formats import AudioFileError
 from quodlibet import config
 from quodlibet.util import connect_obj, is_windows
+from quodlibet.util.path import find_mount_point, escape_filename
 from quodlibet.formats import AudioFile
 from quodlibet.compat import text_type, iteritems, iterkeys, itervalues
 
@@ -546,6 +547,125 @@ class TSongFileLibrary(TSongLibrary):
         config.quit()
 
 
+class TFileLibraryShards(TestCase):
+
+    UNMOUNTED = fsnative(u"/quodlibet_test_not_mounted")
+
+    def setUp(self):
+        self.temp = mkdtemp()
+        self.filename = os.path.join(self.temp, fsnative(u"songs"))
+        self.mounted = find_mount_point(self.temp)
+
+        self.library = SongFileLibrary()
+        self.local = self._song(self.mounted, u"local")
+        self.remote = self._song(self.UNMOUNTED, u"remote")
+        self.library.add([self.local])
+        self.library._load_init([self.remote])
+        self.assertTrue(self.library.masked(self.remote))
+        self.library.save(self.filename)
+
+    def tearDown(self):
+        self.library.destroy()
+        shutil.rmtree(self.temp)
+
+    def _song(self, point, name):
+        return AudioFile({
+            "~filename": os.path.join(point, fsnative(name)),
+            "~mountpoint": point,
+        })
+
+    def _load(self):
+        library = SongFileLibrary()
+        library.load(self.filename)
+        return library
+
+    def test_save_shards(self):
+        shard_dir = self.filename + fsnative(u".shards")
+        self.assertEqual(
+            os.listdir(shard_dir), [escape_filename(self.UNMOUNTED)])
+
+    def test_load_lazy(self):
+        library = self._load()
+        try:
+            self.assertEqual(list(library.keys()), [self.local.key])
+            self.assertFalse(library._masked)
+            self.assertEqual(library.masked_mount_points, [self.UNMOUNTED])
+            self.assertEqual(
+                [s.key for s in library.get_masked(self.UNMOUNTED)],
+                [self.remote.key])
+            self.assertTrue(library._masked)
+        finally:
+            library.destroy()
+
+    def test_masked_key_loads(self):
+        library = self._load()
+        try:
+            self.assertTrue(library.masked(self.remote.key))
+            self.assertFalse(library.masked(self.local.key))
+        finally:
+            library.destroy()
+
+    def test_unmask_loads(self):
+        library = self._load()
+        try:
+            library.unmask(self.UNMOUNTED)
+            self.assertTrue(self.remote.key in library)
+            self.assertFalse(library.masked_mount_points)
+        finally:
+            library.destroy()
+
+    def test_save_keeps_unloaded(self):
+        library = self._load()
+        try:
+            library.save()
+        finally:
+            library.destroy()
+        library = self._load()
+        try:
+            self.assertEqual(
+                len(library.get_masked(self.UNMOUNTED)), 1)
+            library.remove_masked(self.UNMOUNTED)
+            library.save()
+        finally:
+            library.destroy()
+        library = self._load()
+        try:
+            self.assertFalse(library.masked_mount_points)
+        finally:
+            library.destroy()
+
+    def test_save_add_to_unloaded(self):
+        library = self._load()
+        try:
+            other = self._song(self.UNMOUNTED, u"other")
+            other["~#playcount"] = 3
+            library.add([other])
+            library.save()
+        finally:
+            library.destroy()
+        library = self._load()
+        try:
+            self.assertEqual(
+                sorted(s.key for s in library.get_masked(self.UNMOUNTED)),
+                sorted([self.remote.key, other.key]))
+        finally:
+            library.destroy()
+
+    def test_load_all_mounted(self):
+        library = SongFileLibrary()
+        try:
+            library.add([self._song(self.mounted, u"other")])
+            library.save(self.filename)
+        finally:
+            library.destroy()
+        library = self._load()
+        try:
+            self.assertEqual(len(library), 1)
+            self.assertEqual(library.masked_mount_points, [])
+        finally:
+            library.destroy()
+
+
 class TAlbumLibrary(TestCase):
     Fake = FakeSong
     Frange = staticmethod(ASrange)
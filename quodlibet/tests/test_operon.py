@@ -8,6 +8,8 @@
 
 import os
 import sys
+import json
+import shutil
 
 from senf import fsnative, path2fsn, environ
 
@@ -15,9 +17,10 @@ from tests import TestCase, get_data_path, mkstemp
 from .helper import capture_output, get_temp_copy
 
 from quodlibet import config
-from quodlibet.formats import MusicFile
+from quodlibet.formats import MusicFile, dump_audio_files
 from quodlibet.operon.main import main as operon_main
 from quodlibet.compat import listkeys
+from quodlibet.util.path import escape_filename
 
 
 def call(args):
@@ -78,8 +81,8 @@ class TOperonMain(TOperonBase):
 
         # TODO: "image-extract", "rename", "fill", "fill-tracknumber", "edit"
         # "load"
-        for sub in ["help", "copy", "set", "clear",
-                    "remove", "add", "list", "print", "info", "tags"]:
+        for sub in ["help", "copy", "set", "clear", "remove", "add",
+                    "list", "print", "info", "tags", "query"]:
             self.check_true(["help", sub], True, False)
 
         self.check_true(["help", "-h"], True, False)
@@ -162,6 +165,95 @@ class TOperonPrint(TOperonBase):
                          False, True)
 
 
+class TOperonQuery(TOperonBase):
+    # [-l <library>] [-j <jobs>] [-k <keys>] [-p <pattern>] <query> [<cmd>]
+
+    def setUp(self):
+        super(TOperonQuery, self).setUp()
+        fd, self.lib = mkstemp(".lib")
+        os.write(fd, dump_audio_files([self.s, self.s2]))
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.lib)
+        super(TOperonQuery, self).tearDown()
+
+    def test_misc(self):
+        self.check_false(["query"], False, True)
+        self.check_false(["query", "-l", self.lib, "&(foo"], False, True)
+        self.check_false(["query", "-l", self.f3, "foo"], False, True)
+        self.check_false(["query", "-j", "0", "-l", self.lib, "foo"],
+                         False, True)
+        self.check_true(["query", "-l", self.lib, "nothing_matches"],
+                        False, False)
+
+    def test_json(self):
+        o, e = self.check_true(["query", "-l", self.lib, "silence"],
+                               True, False)
+        lines = [json.loads(l) for l in o.splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["title"], "Silence")
+        self.assertTrue("~filename" in lines[0])
+
+    def test_shards(self):
+        with open(self.lib, "wb") as h:
+            h.write(dump_audio_files([self.s]))
+        shard_dir = self.lib + fsnative(u".shards")
+        os.mkdir(shard_dir)
+        shard = os.path.join(shard_dir, escape_filename(fsnative(u"/other")))
+        try:
+            with open(shard, "wb") as h:
+                h.write(dump_audio_files([self.s2]))
+            o, e = self.check_true(
+                ["query", "-l", self.lib, "-k", "title", "silence"],
+                True, False)
+            filenames = [json.loads(l)["~filename"] for l in o.splitlines()]
+            self.assertEqual(
+                sorted(filenames), sorted([self.s("~filename"),
+                                           self.s2("~filename")]))
+        finally:
+            shutil.rmtree(shard_dir)
+
+    def test_keys(self):
+        o, e = self.check_true(
+            ["query", "-l", self.lib, "-k", "title,~#length", "silence"],
+            True, False)
+        data = json.loads(o.splitlines()[0])
+        self.assertEqual(
+            sorted(data.keys()), ["title", "~#length", "~filename"])
+        self.assertEqual(data["~#length"], self.s("~#length"))
+
+    def test_pattern(self):
+        o, e = self.check_true(
+            ["query", "-l", self.lib, "-p", "<title>", "silence"],
+            True, False)
+        self.assertEqual(o.splitlines(), ["Silence", "Silence"])
+
+    def test_command(self):
+        o, e = self.check_true(
+            ["query", "-l", self.lib, "-j", "2", "silence",
+             "add", "foo", "bar"], True, False)
+        lines = [json.loads(l) for l in o.splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertFalse(any("error" in l for l in lines))
+        self.s.reload()
+        self.s2.reload()
+        self.assertEqual(self.s("foo"), "bar")
+        self.assertEqual(self.s2("foo"), "bar")
+
+    def test_command_error(self):
+        self.check_false(
+            ["query", "-l", self.lib, "silence", "foobar"], False, True)
+        for name in ["print", "info", "edit", "query", "help", "fill"]:
+            self.check_false(
+                ["query", "-l", self.lib, "silence", name], False, True)
+        o, e = self.check_false(
+            ["query", "-l", self.lib, "silence", "add", "playcount", "1"],
+            True, True)
+        lines = [json.loads(l) for l in o.splitlines()]
+        self.assertTrue(all("error" in l for l in lines))
+
+
 class TOperonRemove(TOperonBase):
     # [--dry-run] <tag> [-e <pattern> | <value>] <file> [<files>]
 
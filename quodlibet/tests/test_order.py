@@ -7,9 +7,9 @@
 from collections import defaultdict
 
 from quodlibet.formats import AudioFile
-from quodlibet.order import OrderInOrder
+from quodlibet.order import Order, OrderInOrder
 from quodlibet.order.reorder import OrderWeighted, OrderShuffle
-from quodlibet.order.repeat import OneSong
+from quodlibet.order.repeat import OneSong, RepeatSongForever
 from quodlibet.qltk.songmodel import PlaylistModel
 from tests import TestCase
 
@@ -61,3 +61,40 @@ class TOrderOneSong(TestCase):
         pl.set([r0, r1])
         for i in range(2):
             self.failUnlessEqual(order.next(pl, pl.current_iter), None)
+
+
+class CountingOrder(Order):
+    deterministic = True
+
+    def __init__(self):
+        super(CountingOrder, self).__init__()
+        self.count = 0
+
+    def next(self, playlist, iter):
+        self.count += 1
+        return iter
+
+
+class TOrderPeek(TestCase):
+
+    def test_default_no_state_change(self):
+        order = CountingOrder()
+        self.failUnless(order.peek_implicit(None, None) is None)
+        self.failUnlessEqual(order.count, 0)
+
+    def test_in_order(self):
+        pl = PlaylistModel(OrderInOrder)
+        pl.set([r0, r1])
+        order = OrderInOrder()
+        first = pl.get_iter_first()
+        self.failUnlessEqual(
+            pl.get_path(order.peek_implicit(pl, first)),
+            pl.get_path(order.next_implicit(pl, first)))
+        self.failUnless(order.peek_implicit(pl, pl.iter_next(first)) is None)
+
+    def test_repeat(self):
+        order = RepeatSongForever(CountingOrder())
+        self.failUnlessEqual(order.peek_implicit(None, 42), 42)
+        order = OneSong(CountingOrder())
+        self.failUnless(order.peek_implicit(None, 42) is None)
+        self.failUnlessEqual(order.wrapped.count, 0)
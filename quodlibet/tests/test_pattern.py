@@ -13,6 +13,7 @@ from tests import TestCase
 from quodlibet.formats import AudioFile
 from quodlibet.pattern import (FileFromPattern, XMLFromPattern, Pattern,
     XMLFromMarkupPattern, ArbitraryExtensionFileFromPattern)
+from quodlibet.pattern._pattern import FormatCache, format_cache
 
 
 class _TPattern(TestCase):
@@ -581,3 +582,43 @@ class TPatternFormatList(_TPattern):
     def test_string(s):
         pat = Pattern('display')
         s.assertEqual(pat.format_list(s.a), {("display", "display")})
+
+
+class TFormatCache(_TPattern):
+
+    def test_cached(self):
+        pat = Pattern("<artist> - <title>")
+        format_cache.invalidate([self.a])
+        self.assertEqual(pat.format_cached(self.a), "Artist - Title5")
+        self.a["title"] = u"Changed"
+        self.assertEqual(pat.format_cached(self.a), "Artist - Title5")
+        format_cache.invalidate([self.a])
+        self.assertEqual(pat.format_cached(self.a), "Artist - Changed")
+
+    def test_list_cached(self):
+        pat = Pattern("<artist>")
+        self.assertEqual(
+            pat.format_list_cached(self.h), pat.format_list(self.h))
+
+    def test_stats(self):
+        cache = FormatCache()
+        func = Pattern("<title>").format
+        cache.get(func, self.a)
+        cache.get(func, self.a)
+        cache.get(func, self.b)
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["size"], 2)
+        self.assertAlmostEqual(stats["hit_rate"], 1.0 / 3)
+        cache.clear()
+        self.assertEqual(cache.get_stats()["size"], 0)
+
+    def test_bounded(self):
+        cache = FormatCache(max_size=2)
+        func = Pattern("<title>").format
+        for song in [self.a, self.b, self.c]:
+            cache.get(func, song)
+        self.assertEqual(cache.get_stats()["size"], 2)
+        cache.invalidate([self.a, self.b, self.c])
+        self.assertEqual(cache.get_stats()["size"], 0)
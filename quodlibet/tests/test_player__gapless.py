@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import threading
+
+from tests import TestCase
+
+from quodlibet.player._gapless import GaplessState
+
+
+class TGaplessState(TestCase):
+
+    def setUp(self):
+        self.state = GaplessState()
+
+    def test_lookahead(self):
+        state = self.state
+        state.set_lookahead("a", "b", "uri-b")
+        self.assertEqual(state.take_lookahead("a"), ("b", "uri-b"))
+        self.assertTrue(state.in_transition)
+        self.assertTrue(state.is_pending("b"))
+        # this can trigger twice, see issue 987
+        self.assertEqual(state.take_lookahead("a"), None)
+        self.assertTrue(state.end("b"))
+        self.assertFalse(state.is_pending("b"))
+        state.reset()
+        self.assertFalse(state.in_transition)
+
+    def test_lookahead_other_song(self):
+        state = self.state
+        self.assertEqual(state.take_lookahead("a"), None)
+        state.set_lookahead("a", "b", "uri-b")
+        self.assertEqual(state.take_lookahead("x"), None)
+        self.assertFalse(state.in_transition)
+        state.set_lookahead(None)
+        self.assertEqual(state.take_lookahead("a"), None)
+
+    def test_no_next_song(self):
+        state = self.state
+        state.set_lookahead("a")
+        self.assertEqual(state.take_lookahead("a"), (None, None))
+        self.assertFalse(state.in_transition)
+
+    def test_running_transition(self):
+        state = self.state
+        self.assertTrue(state.start())
+        self.assertFalse(state.start())
+        state.set_lookahead("a", "b", "uri-b")
+        self.assertEqual(state.take_lookahead("a"), (None, None))
+        self.assertFalse(state.is_pending("b"))
+        self.assertTrue(state.end("c"))
+
+    def test_outdated(self):
+        state = self.state
+        state.set_lookahead("a", "b", "uri-b")
+        state.take_lookahead("a")
+        # the source changed before the new stream started
+        self.assertFalse(state.end("c"))
+        self.assertFalse(state.in_transition)
+
+    def test_reset(self):
+        state = self.state
+        state.set_lookahead("a", "b", "uri-b")
+        state.take_lookahead("a")
+        state.reset()
+        self.assertFalse(state.in_transition)
+        self.assertFalse(state.is_pending("b"))
+        self.assertTrue(state.start())
+
+    def test_threads(self):
+        state = self.state
+        for i in range(20):
+            state.reset()
+            state.set_lookahead("a", "b", "uri-b")
+            results = []
+            barrier = threading.Event()
+
+            def about_to_finish():
+                barrier.wait()
+                results.append(state.take_lookahead("a"))
+
+            threads = [threading.Thread(target=about_to_finish)
+                       for j in range(4)]
+            for thread in threads:
+                thread.start()
+            barrier.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results.count(("b", "uri-b")), 1)
+            self.assertTrue(state.is_pending("b"))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from tests import TestCase
+
+from quodlibet.qltk.instrumentation import InstrumentationWindow
+from quodlibet.util import instrument
+
+
+class TInstrumentationWindow(TestCase):
+
+    def setUp(self):
+        self._enabled = instrument.is_enabled()
+        instrument.reset()
+        instrument.enable()
+
+    def tearDown(self):
+        instrument.enable(self._enabled)
+        instrument.reset()
+
+    def test_ctr(self):
+        instrument.record("foo", "bar", 0.5)
+        win = InstrumentationWindow(None)
+        self.assertEqual(len(win._model), 1)
+        instrument.record("foo", "baz", 0.5)
+        win._InstrumentationWindow__refresh()
+        self.assertEqual(len(win._model), 2)
+        win._InstrumentationWindow__reset()
+        self.assertEqual(len(win._model), 0)
+        win.destroy()
@@ -10,8 +10,9 @@ from senf import fsnative
 from tests import TestCase
 
 from quodlibet.library import SongLibrary
+from quodlibet.qltk import songlist
 from quodlibet.qltk.songlist import SongList, set_columns, get_columns, \
-    header_tag_split, get_sort_tag
+    header_tag_split, get_sort_tag, _RowCost
 from quodlibet.formats import AudioFile
 from quodlibet import config
 
@@ -22,6 +23,10 @@ class TSongList(TestCase):
 
     def setUp(self):
         config.init()
+        # don't depend on what other tests measured
+        self._costs = (songlist._UPDATE_COST, songlist._REFILL_COST)
+        songlist._UPDATE_COST = _RowCost(1e-4)
+        songlist._REFILL_COST = _RowCost(5e-6)
         self.songlist = SongList(SongLibrary())
 
         self.orders_changed = 0
@@ -141,6 +146,69 @@ class TSongList(TestCase):
         self.songlist.set_songs([song], scroll_select=True)
         self.assertEqual(self.songlist.get_selected_songs(), [])
 
+    def test_set_songs_incremental(self):
+        songs = [AudioFile({"~filename": fsnative(u"/dev/%d" % i),
+                            "title": u"%02d" % (i % 7),
+                            "artist": u"%d" % (i % 3)})
+                 for i in range(100)]
+        self.songlist.set_column_headers(["title", "artist"])
+        self.songlist.set_sort_orders([("title", True), ("artist", False)])
+
+        def sort(songs):
+            songs = list(songs)
+            self.songlist._sort_songs(songs)
+            return songs
+
+        self.songlist.set_songs(list(songs))
+        self.assertEqual(self.songlist.get_songs(), sort(songs))
+        model = self.songlist.get_model()
+        first = model.get_iter_first()
+        kept = model[first][0]
+        sel = self.songlist.get_selection()
+        sel.select_iter(first)
+
+        # refine, rows of kept songs stay
+        subset = songs[:]
+        subset.remove(songs[5])
+        subset.remove(songs[17])
+        new_songs = list(subset)
+        self.songlist.set_songs(new_songs, scroll=False)
+        self.assertEqual(new_songs, sort(subset))
+        self.assertEqual(self.songlist.get_songs(), sort(subset))
+        self.assertEqual(self.songlist.get_selected_songs(), [kept])
+
+        # relax
+        self.songlist.set_songs(list(songs), scroll=False)
+        self.assertEqual(self.songlist.get_songs(), sort(songs))
+        self.assertEqual(self.songlist.get_selected_songs(), [kept])
+
+        # different sort order, everything gets sorted again
+        self.songlist.set_sort_orders([("artist", False)])
+        self.songlist.set_songs(list(songs))
+        self.assertEqual(self.songlist.get_songs(), sort(songs))
+
+        # completely different
+        self.songlist.set_songs(songs[:3])
+        self.assertEqual(self.songlist.get_songs(), sort(songs[:3]))
+
+    def test_set_songs_after_change(self):
+        library = SongLibrary()
+        library.librarian = None
+        songlist = SongList(library)
+        songs = [AudioFile({"~filename": fsnative(u"/dev/%d" % i),
+                            "title": u"%02d" % i}) for i in range(100)]
+        songlist.set_column_headers(["title"])
+        songlist.set_sort_orders([("title", False)])
+        songlist.set_songs(list(songs))
+
+        # changed rows don't get moved, the next update has to sort again
+        songs[0]["title"] = u"99"
+        library.emit("changed", [songs[0]])
+        songlist.set_songs(songs[:-1])
+        self.assertEqual(
+            songlist.get_songs(), songs[1:-1] + [songs[0]])
+        songlist.destroy()
+
     def test_get_selected_songs(self):
         song = AudioFile({"~filename": "/dev/null"})
         self.songlist.add_songs([song])
@@ -226,4 +294,26 @@ class TSongList(TestCase):
 
     def tearDown(self):
         self.songlist.destroy()
+        songlist._UPDATE_COST, songlist._REFILL_COST = self._costs
         config.quit()
+
+
+class TRowCost(TestCase):
+
+    def test_prior(self):
+        cost = _RowCost(1e-4)
+        self.assertAlmostEqual(cost.estimate(10), 1e-3)
+        self.assertEqual(cost.estimate(0), 0)
+
+    def test_add(self):
+        cost = _RowCost(1e-4, rows=10)
+        cost.add(0, 0)
+        self.assertAlmostEqual(cost.estimate(1), 1e-4)
+        cost.add(1e-5 * 1000, 1000)
+        self.assertTrue(1e-5 < cost.estimate(1) < 1.1e-5)
+
+    def test_adapts(self):
+        cost = _RowCost(1e-4)
+        for i in range(100):
+            cost.add(1e-6 * 100, 100)
+        self.assertAlmostEqual(cost.estimate(1), 1e-6)
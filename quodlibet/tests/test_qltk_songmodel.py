@@ -103,6 +103,36 @@ class TPlaylistModel(TestCase):
         self.failUnless(8 in self.pl)
         self.failIf(22 in self.pl)
 
+    def test_find_first_duplicate(self):
+        self.pl.set([1, 2, 1])
+        self.assertEqual(self.pl.get_path(self.pl.find(1)).get_indices(), [0])
+        self.pl.remove(self.pl.find(1))
+        self.assertEqual(self.pl.get_path(self.pl.find(1)).get_indices(), [1])
+        self.assertEqual(len(self.pl.find_all([1])), 1)
+
+    def test_find_inserted_moved(self):
+        self.pl.set([1, 2, 3])
+        self.pl.insert(0, row=[7])
+        self.pl.append(row=[8])
+        self.assertEqual(self.pl.get_path(self.pl.find(7)).get_indices(), [0])
+        self.assertEqual(self.pl.get_path(self.pl.find(3)).get_indices(), [3])
+        self.assertEqual(self.pl.get_path(self.pl.find(8)).get_indices(), [4])
+        self.pl.move_before(self.pl.find(3), self.pl.find(7))
+        self.assertEqual(self.pl.get_path(self.pl.find(3)).get_indices(), [0])
+        self.assertEqual(
+            [self.pl[i][0] for i in self.pl.find_all([8, 3, 1])], [3, 1, 8])
+
+    def test_find_changed(self):
+        self.pl.set_value(self.pl.find(2), 0, 42)
+        self.assertTrue(self.pl.find(2) is None)
+        self.assertFalse(2 in self.pl)
+        self.assertEqual(self.pl.get_path(self.pl.find(42)).get_indices(), [2])
+
+    def test_find_removed_elsewhere(self):
+        Gtk.ListStore.remove(self.pl, self.pl.find(3))
+        self.assertTrue(self.pl.find(3) is None)
+        self.assertEqual(self.pl.get_path(self.pl.find(4)).get_indices(), [3])
+
     def test_removal(self):
         self.pl.go_to(8)
         for i in range(3, 8):
@@ -165,6 +195,42 @@ class TPlaylistModel(TestCase):
             self.pl.next_ended()
         self.failUnlessEqual(self.pl.current, 3)
 
+    def test_peek_next_ended(self):
+        self.pl.go_to(3)
+        self.failUnlessEqual(self.pl.peek_next_ended(), 4)
+        self.failUnlessEqual(self.pl.current, 3)
+        self.pl.go_to(9)
+        self.failUnless(self.pl.peek_next_ended() is None)
+
+    def test_peek_next_ended_repeat(self):
+        self.pl.order = RepeatListForever(OrderInOrder())
+        self.pl.go_to(9)
+        self.failUnlessEqual(self.pl.peek_next_ended(), 0)
+        self.pl.order = RepeatSongForever(OrderShuffle())
+        self.failUnlessEqual(self.pl.peek_next_ended(), 9)
+        self.pl.next_ended()
+        self.failUnlessEqual(self.pl.current, 9)
+
+    def test_peek_next_ended_shuffle(self):
+        self.pl.order = OrderShuffle()
+        self.assertRaises(ValueError, self.pl.peek_next_ended)
+        self.pl.order = RepeatListForever(OrderShuffle())
+        self.assertRaises(ValueError, self.pl.peek_next_ended)
+
+    def test_connect_changed(self):
+        events = []
+        handlers = self.pl.connect_changed(lambda: events.append(1))
+        self.pl.order = OrderShuffle()
+        self.failUnlessEqual(len(events), 1)
+        self.pl.set(range(10))
+        self.failUnlessEqual(len(events), 2)
+        self.pl.append(row=[10])
+        self.failUnless(len(events) > 2)
+        self.pl.disconnect_changed(handlers)
+        del events[:]
+        self.pl.order = OrderInOrder()
+        self.failIf(events)
+
     def test_previous(self):
         self.pl.go_to(2)
         self.failUnlessEqual(self.pl.current, 2)
@@ -289,6 +355,14 @@ class TPlaylistMux(TestCase):
         self.next()
         self.failUnless(self.mux.current is None)
 
+    def test_peek_next_ended(self):
+        self.pl.set(range(5, 10))
+        self.failUnlessEqual(self.mux.peek_next_ended(), 5)
+        self.q.set(range(2))
+        self.failUnlessEqual(self.mux.peek_next_ended(), 0)
+        self.failUnlessEqual(self.next(), 0)
+        self.failUnlessEqual(self.mux.peek_next_ended(), 1)
+
     def test_newplaylist(self):
         self.pl.set(range(5, 10))
         do_events()
@@ -8,9 +8,11 @@ import time
 
 from senf import fsnative
 
+from quodlibet import app
 from quodlibet import config
 from quodlibet.compat import xrange
 from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
 from quodlibet.query import Query, QueryType
 from quodlibet.query import _match as match
 from tests import TestCase, skip
@@ -500,6 +502,15 @@ class TQuery(TestCase):
         self.failUnless(Query("#(date > 0004)").search(self.s1))
         self.failUnless(Query("#(date > 0000)").search(self.s1))
 
+    def test_is_dynamic(self):
+        self.failUnless(Query("#(added < 1 day)").is_dynamic)
+        self.failUnless(Query("&(a=b, !#(lastplayed > 2 weeks ago))")
+                        .is_dynamic)
+        self.failUnless(Query("#(length < today)").is_dynamic)
+        self.failIf(Query("#(length < 3)").is_dynamic)
+        self.failIf(Query("|(a=b, #(date > 2005-07-19))").is_dynamic)
+        self.failIf(Query("foo").is_dynamic)
+
 
 class TQuery_get_type(TestCase):
     def test_red(self):
@@ -513,3 +524,93 @@ class TQuery_get_type(TestCase):
     def test_green(self):
         for p in ["a = /b/", "&(a = b, c = d)", "/abc/", "!x", "!&(abc, def)"]:
             self.failUnlessEqual(QueryType.VALID, Query(p).type)
+
+
+class TQueryNumericIndex(TestCase):
+
+    def setUp(self):
+        config.init()
+        self.library = SongLibrary()
+        self._old_library = app.library
+        app.library = self.library
+        now = time.time()
+        songs = []
+        for i in xrange(40):
+            song = AudioFile({
+                "~filename": fsnative(u"/dir/%d.ogg" % i),
+                "title": u"title%d" % (i % 3),
+                "~#length": i * 10,
+                "~#added": now - i * 24 * 60 * 60 - 60,
+                "date": u"%d-01-02" % (1970 + i),
+            })
+            if i % 4:
+                song["~#playcount"] = i % 5
+            if i % 3:
+                song["~#rating"] = (i % 5) / 4.0
+            songs.append(song)
+        self.library.add(songs)
+        self.songs = songs
+
+    def tearDown(self):
+        app.library = self._old_library
+        self.library.destroy()
+        config.quit()
+
+    def _check(self, text, songs=None):
+        if songs is None:
+            songs = self.songs
+        query = Query(text)
+        expected = [s for s in songs if query.search(s)]
+        self.assertEqual(query.filter(songs), expected)
+        return expected
+
+    def test_indexed(self):
+        for text in ["#(length < 100)", "#(length <= 100)",
+                     "#(length > 100)", "#(length >= 100)",
+                     "#(length = 100)", "#(length != 100)",
+                     "#(100 > length)", "#(1:40 = length)",
+                     "#(added < 2 weeks ago)", "#(added > 5 days)",
+                     "#(added > 10 days)", "#(playcount = 0)",
+                     "#(playcount > 2)",
+                     "#(rating >= 0.5)", "#(rating < 0.75)",
+                     "#(date < 1990)", "#(date >= 1980-01-02)",
+                     "#(year != 1975)", "#(skipcount = 0)"]:
+            self.assertTrue(Query(text)._match._is_indexed(), msg=text)
+            self.assertTrue(self._check(text), msg=text)
+
+    def test_not_indexed(self):
+        for text in ["#(length < playcount)", "#(length:avg < 3)",
+                     "#(track < 3)"]:
+            self.assertFalse(Query(text)._match._is_indexed(), msg=text)
+            self._check(text)
+
+    def test_intersection(self):
+        self.assertEqual(len(self._check("&(title=title1, #(length < 200))")),
+                         7)
+        self._check("#(10 < length < 200)")
+        self._check("|(#(length < 30), #(playcount > 3))")
+        self._check("!#(length < 30)")
+
+    def test_default_rating(self):
+        config.RATINGS.default = 0.25
+        self.assertTrue(self._check("#(rating = 0.25)"))
+        config.RATINGS.default = 0.0
+        self.assertTrue(self._check("#(rating = 0)"))
+
+    def test_not_in_library(self):
+        other = AudioFile({"~filename": fsnative(u"/other.ogg"),
+                           "~#length": 5})
+        songs = self.songs + [other]
+        self.assertTrue(other in self._check("#(length < 10)", songs))
+
+    def test_library_changes(self):
+        query = Query("#(length >= 390)")
+        self.assertEqual(query.filter(self.songs), self.songs[39:])
+        song = self.songs[0]
+        song["~#length"] = 1000
+        self.library.changed([song])
+        self.assertEqual(query.filter(self.songs), [song] + self.songs[39:])
+        self.library.remove([self.songs[39]])
+        self.assertEqual(query.filter(self.songs), [song, self.songs[39]])
+        self.library.changed(self.songs[1:])
+        self._check("#(length >= 390)")
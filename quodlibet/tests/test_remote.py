@@ -4,12 +4,19 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from senf import fsn2bytes, bytes2fsn
+import os
+import time
+import socket
 
-from . import TestCase, skipIf
+from gi.repository import GLib, GObject
+from senf import fsn2bytes, bytes2fsn, fsnative
+
+from . import TestCase, skipIf, mkdtemp
 from .helper import temp_filename
 
-from quodlibet.remote import QuodLibetUnixRemote
+from quodlibet.remote import QuodLibetUnixRemote, QuodLibetSocketRemote, \
+    RemoteError
+from quodlibet.commands import CommandRegistry, CommandError
 from quodlibet.util import is_windows
 
 
@@ -42,3 +49,123 @@ class TUnixRemote(TestCase):
             self.assertEqual(mock.lines, [bytes2fsn(b"foo", None)])
             with open(fn, "rb") as h:
                 self.assertEqual(h.read(), b"resp")
+
+
+class FakePlayer(GObject.Object):
+    __gsignals__ = {
+        'song-started': (GObject.SignalFlags.RUN_LAST, None, (object,)),
+        'song-ended': (GObject.SignalFlags.RUN_LAST, None, (object, bool)),
+        'seek': (GObject.SignalFlags.RUN_LAST, None, (object, int)),
+        'paused': (GObject.SignalFlags.RUN_LAST, None, ()),
+        'unpaused': (GObject.SignalFlags.RUN_LAST, None, ()),
+    }
+
+    volume = GObject.Property(type=float, default=1.0)
+
+
+class FakeApp(object):
+
+    def __init__(self):
+        self.player = FakePlayer()
+
+
+@skipIf(is_windows(), "unix only")
+class TSocketRemote(TestCase):
+
+    def setUp(self):
+        self.temp = mkdtemp()
+        self.registry = registry = CommandRegistry()
+
+        @registry.register("echo", args=1)
+        def echo(app, value):
+            return value
+
+        @registry.register("count", args=1)
+        def count(app, value):
+            for i in range(int(value)):
+                yield fsnative(u"%d" % i)
+
+        @registry.register("fail")
+        def fail(app):
+            raise CommandError("nope")
+
+        self.app = FakeApp()
+        self._orig_path = QuodLibetSocketRemote._PATH
+        QuodLibetSocketRemote._PATH = os.path.join(self.temp, "control.sock")
+        self.remote = QuodLibetSocketRemote(self.app, registry)
+        self.remote.start()
+
+    def tearDown(self):
+        self.remote.stop()
+        QuodLibetSocketRemote._PATH = self._orig_path
+        os.rmdir(self.temp)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.remote._PATH)
+        sock.setblocking(False)
+        return sock
+
+    def _read(self, sock, count):
+        """Read until `count` lines are received"""
+
+        data = b""
+        context = GLib.MainContext.default()
+        end = time.time() + 5
+        while data.count(b"\n") < count and time.time() < end:
+            context.iteration(False)
+            try:
+                data += sock.recv(4096)
+            except socket.error:
+                pass
+        return data.splitlines()
+
+    def test_exists(self):
+        self.assertTrue(QuodLibetSocketRemote.remote_exists())
+        other = QuodLibetSocketRemote(self.app, self.registry)
+        self.assertRaises(RemoteError, other.start)
+
+    def test_pipelined(self):
+        sock = self._connect()
+        sock.sendall(b"echo foo\nfail\ncount 3\nnope\n")
+        lines = self._read(sock, 8)
+        sock.close()
+        self.assertEqual(lines[:2], [b"D foo", b"OK"])
+        self.assertEqual(lines[2], b"ERR fail: nope")
+        self.assertEqual(lines[3:7], [b"D 0", b"D 1", b"D 2", b"OK"])
+        self.assertTrue(lines[7].startswith(b"ERR "))
+
+    def test_large_response(self):
+        sock = self._connect()
+        sock.sendall(b"count 50000\n")
+        lines = self._read(sock, 50001)
+        sock.close()
+        self.assertEqual(len(lines), 50001)
+        self.assertEqual(lines[-2:], [b"D 49999", b"OK"])
+
+    def test_subscribe(self):
+        sock = self._connect()
+        sock.sendall(b"subscribe\n")
+        self.assertEqual(self._read(sock, 1), [b"OK"])
+        self.app.player.emit("paused")
+        self.app.player.emit("seek", None, 42)
+        self.app.player.volume = 0.5
+        self.assertEqual(
+            self._read(sock, 3),
+            [b"EVENT paused", b"EVENT seek 42", b"EVENT volume 0.500"])
+        sock.sendall(b"unsubscribe\n")
+        self.assertEqual(self._read(sock, 1), [b"OK"])
+        self.assertFalse(self.remote._player_ids)
+        sock.close()
+
+    def test_disconnect(self):
+        sock = self._connect()
+        sock.sendall(b"subscribe\n")
+        self.assertEqual(self._read(sock, 1), [b"OK"])
+        sock.close()
+        context = GLib.MainContext.default()
+        end = time.time() + 5
+        while self.remote._clients and time.time() < end:
+            context.iteration(False)
+        self.assertFalse(self.remote._clients)
+        self.assertFalse(self.remote._player_ids)
@@ -14,6 +14,9 @@ from tests import TestCase
 from quodlibet.unisearch import compile
 from quodlibet.unisearch.db import diacritic_for_letters
 from quodlibet.unisearch.parser import re_replace_literals, re_add_variants
+from quodlibet.unisearch.shadow import get_shadow
+from quodlibet.util import re_escape
+from quodlibet.compat import unichr, xrange
 
 
 class TUniSearch(TestCase):
@@ -160,9 +163,65 @@ class TCompileMatch(TestCase):
         assert compile(u"\u00C5", asym=True)(u"\u212B")
         assert compile(u"\u212B", asym=True)(u"\u00C5")
 
+    def test_asym_shadow(self):
+        assert compile(u"fohn", asym=True)(u"F\xf6hn")
+        assert compile(u"Fohn", ignore_case=False, asym=True)(u"F\xf6hn")
+        assert not compile(u"Fohn", ignore_case=False, asym=True)(u"f\xf6hn")
+        assert compile(u"st", asym=True)(u"\ufb06")
+        assert compile(u"ss", asym=True)(u"\xdf")
+        assert compile(u"ae", asym=True)(u"\xc6")
+        # not ascii, no shadow but still works
+        assert not compile(u"\xf6", asym=True)(u"o")
+        assert compile(u"\xf6", asym=True)(u"\xf6")
+        # "H" doesn't match "ẖ", "h" does
+        assert compile(u"h", asym=True)(u"\u1e96")
+        assert not compile(u"H", asym=True)(u"\u1e96")
+
     def test_invalid(self):
         with self.assertRaises(ValueError):
             compile(u"(F", asym=False)
 
         with self.assertRaises(ValueError):
             compile(u"(F", asym=True)
+
+
+class TShadow(TestCase):
+
+    def test_fold(self):
+        self.assertEqual(get_shadow(True).fold(u"F\xf6hn"), u"fohn")
+        self.assertEqual(get_shadow(False).fold(u"F\xf6hn"), u"Fohn")
+        self.assertEqual(get_shadow(False).fold(u"\ufb06"), u"st")
+
+    def test_get_search(self):
+        shadow = get_shadow(True)
+        self.assertTrue(shadow.get_search(u"foo"))
+        self.assertFalse(shadow.get_search(u"f\xf6o"))
+        self.assertFalse(shadow.get_search(u"`"))
+
+    def test_same_as_regex(self):
+        # Everything the regex matches has to match using the shadow,
+        # the other way around only for expanded sequences like "\ufb06"
+        text = u"".join(
+            c for c in map(unichr, xrange(0x10000))
+            if unicodedata.category(c) != "Cs" and
+            unicodedata.normalize("NFC", c) == c)
+
+        for ignore_case in [True, False]:
+            shadow = get_shadow(ignore_case)
+            flags = re.UNICODE
+            if ignore_case:
+                flags |= re.IGNORECASE
+            # folded char -> all chars containing it after folding
+            found_for = {}
+            for u in text:
+                for f in shadow.fold(u):
+                    found_for.setdefault(f, set()).add(u)
+
+            for c in shadow.safe:
+                reg = re.compile(re_add_variants(re_escape(c)), flags)
+                expected = set(reg.findall(text))
+                found = found_for[c.lower() if ignore_case else c]
+                self.assertFalse(expected - found, msg=c)
+                for u in found - expected:
+                    self.assertTrue(len(shadow.fold(u)) > 1, msg=(c, u))
+            shadow.clear()
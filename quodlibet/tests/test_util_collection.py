@@ -8,7 +8,8 @@ import shutil
 import os
 from collections import defaultdict
 
-from senf import fsnative
+from gi.repository import Gtk
+from senf import fsnative, fsn2bytes
 
 from quodlibet import config
 
@@ -17,7 +18,7 @@ from quodlibet.formats import AudioFile as Fakesong
 from quodlibet.formats._audio import NUMERIC_ZERO_DEFAULT, PEOPLE
 from quodlibet.util.collection import Album, Playlist, avg, bayesian_average, \
     FileBackedPlaylist
-from quodlibet.library.libraries import FileLibrary
+from quodlibet.library.libraries import FileLibrary, SongFileLibrary
 from quodlibet.util import format_rating
 from quodlibet.compat import long
 
@@ -258,6 +259,23 @@ class TAlbum(TestCase):
         s.failUnlessEqual(album.comma("c"), "cc3, cc1")
         s.failUnlessEqual(album.comma("~c~b"), "cc3, cc1 - bb1, bb4")
 
+    def test_snapshot(s):
+        songs = [Fakesong({"album": "a", "artist": "x"}),
+                 Fakesong({"album": "a", "artist": "y"})]
+        album = Album(songs[0])
+        album.songs = set(songs[:1])
+        s.failUnlessEqual(album("artist"), "x")
+
+        snapshot = album.snapshot()
+        s.failUnlessEqual(snapshot.key, album.key)
+        s.failUnlessEqual(snapshot("artist"), "x")
+
+        album.songs.add(songs[1])
+        album.finalize()
+        s.failUnlessEqual(album.list("artist"), ["x", "y"])
+        s.failUnlessEqual(snapshot.list("artist"), ["x"])
+        s.failUnlessEqual(snapshot.title, "a")
+
     def tearDown(self):
         config.quit()
 
@@ -564,6 +582,83 @@ class TFileBackedPlaylist(TPlaylist):
                 self.assertEqual(len(h.read().splitlines()),
                                  len(NUMERIC_SONGS) + 1)
 
+    def test_lazy_load(self):
+        with self.wrap("playlist") as pl:
+            pl.extend(NUMERIC_SONGS)
+            pl.write()
+
+            lib = FileLibrary("foobar")
+            lib.add(NUMERIC_SONGS)
+            pl = self.pl("playlist", lib)
+            self.assertFalse(pl.is_loaded)
+            other = Fakesong({"~filename": fsnative(u"/other")})
+            self.assertEqual(pl.has_songs([other]), (False, False))
+            self.assertFalse(pl.remove_songs([other]))
+            self.assertFalse(pl.is_loaded)
+            self.assertTrue(pl.has_songs(NUMERIC_SONGS[:1])[0])
+            self.assertTrue(pl.is_loaded)
+            self.assertEqual(pl.songs, NUMERIC_SONGS)
+            lib.destroy()
+
+    def test_rename_song_before_load(self):
+        songs = []
+        for name in ["a.mp3", "b.mp3"]:
+            path = os.path.join(self.temp2, fsnative(name))
+            open(path, "wb").close()
+            songs.append(Fakesong({"~filename": path}))
+
+        with self.wrap("playlist") as pl:
+            pl.extend(songs)
+            pl.write()
+
+            lib = SongFileLibrary()
+            lib.add(songs)
+            pl = self.pl("playlist", lib)
+            new_name = os.path.join(self.temp2, fsnative(u"c.mp3"))
+            lib.rename(songs[0], new_name)
+            self.assertFalse(pl.is_loaded)
+            self.assertEqual(pl.has_songs(songs[:1]), (True, True))
+            self.assertEqual(pl.songs, songs)
+
+            pl.write()
+            with open(pl.filename, "rb") as h:
+                self.assertTrue(
+                    h.read().startswith(fsn2bytes(new_name, "utf-8")))
+            lib.destroy()
+
+    def test_write_later(self):
+        with self.wrap("playlist") as pl:
+            pl.extend(NUMERIC_SONGS)
+            pl.write_later()
+            pl.write_later()
+            with open(pl.filename, "rb") as h:
+                self.assertEqual(h.read(), b"")
+
+            FileBackedPlaylist.flush_all()
+            with open(pl.filename, "rb") as h:
+                self.assertEqual(len(h.read().splitlines()),
+                                 len(NUMERIC_SONGS))
+
+    def test_write_later_background(self):
+        with self.wrap("playlist") as pl:
+            pl.WRITE_DELAY = 0
+            pl.extend(NUMERIC_SONGS)
+            pl.write_later()
+            while Gtk.events_pending():
+                Gtk.main_iteration()
+            pl.flush()
+            with open(pl.filename, "rb") as h:
+                self.assertEqual(len(h.read().splitlines()),
+                                 len(NUMERIC_SONGS))
+
+    def test_write_later_rename(self):
+        with self.wrap("foo") as pl:
+            pl.write_later()
+            pl.rename("bar")
+            FileBackedPlaylist.flush_all()
+            self.assertTrue(os.path.exists(os.path.join(self.temp, "bar")))
+            self.assertFalse(os.path.exists(os.path.join(self.temp, "foo")))
+
     def test_make_dup(self):
         p1 = FileBackedPlaylist.new(self.temp, "Does not exist")
         p2 = FileBackedPlaylist.new(self.temp, "Does not exist")
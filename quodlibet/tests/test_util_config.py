@@ -296,6 +296,74 @@ class TConfig(TestCase):
         conf.register_upgrade_function(func)
         conf.read(filename)
 
+    def test_cached(self):
+        conf = Config()
+        conf.defaults.add_section("foo")
+        conf.defaults.set("foo", "int", 1)
+        value = conf.cached("foo", "int", "getint")
+        self.assertEqual(value.value, 1)
+        conf.set("foo", "int", 2)
+        self.assertEqual(value.value, 2)
+        conf.reset("foo", "int")
+        self.assertEqual(value.value, 1)
+        conf.defaults.set("foo", "int", 3)
+        self.assertEqual(value.value, 3)
+        conf.clear()
+        conf.defaults.clear()
+        self.assertRaises(Error, getattr, value, "value")
+
+    def test_cached_default(self):
+        conf = Config()
+        value = conf.cached("foo", "bar", "getstringlist", [])
+        self.assertEqual(value.value, [])
+        conf.add_section("foo")
+        conf.setstringlist("foo", "bar", ["a", "b"])
+        self.assertEqual(value.value, ["a", "b"])
+        conf.remove_option("foo", "bar")
+        self.assertEqual(value.value, [])
+
+    def test_cached_invalidate_keeps_value(self):
+        conf = Config()
+        conf.add_section("foo")
+        conf.set("foo", "bar", "quux")
+        value = conf.cached("foo", "bar")
+        self.assertEqual(value.value, "quux")
+        conf.set("foo", "bar", "nope")
+        # readers racing with the change get the old value, not None
+        self.assertEqual(value._value, "quux")
+        self.assertEqual(value.value, "nope")
+
+    def test_cached_read(self):
+        conf = Config()
+        conf.add_section("foo")
+        with temp_filename() as filename:
+            conf.set("foo", "bar", "quux")
+            conf.write(filename)
+            conf.set("foo", "bar", "nope")
+            value = conf.cached("foo", "bar")
+            self.assertEqual(value.value, "nope")
+            conf.read(filename)
+        self.assertEqual(value.value, "quux")
+
+    def test_change_callback(self):
+        conf = Config()
+        conf.add_section("foo")
+        changes = []
+
+        def func(section, option):
+            changes.append((section, option))
+
+        conf.register_change_callback(func)
+        conf.set("foo", "bar", 1)
+        conf.defaults.add_section("foo")
+        conf.defaults.set("foo", "quux", 1)
+        conf.clear()
+        conf.unregister_change_callback(func)
+        conf.add_section("foo")
+        conf.set("foo", "bar", 2)
+        self.assertEqual(
+            changes, [("foo", "bar"), ("foo", "quux"), (None, None)])
+
 
 class TConfigProxy(TestCase):
 
@@ -334,3 +402,9 @@ class TConfigProxy(TestCase):
         self.assertEqual(self.proxy.get("bla"), "nope")
         self.proxy.reset("bla")
         self.assertEqual(self.proxy.get("bla"), "baz")
+
+    def test_cached(self):
+        value = self.proxy.cached("foo", "getint", 3)
+        self.assertEqual(value.value, 3)
+        self.proxy.set("foo", 4)
+        self.assertEqual(value.value, 4)
@@ -6,7 +6,7 @@
 
 from tests import TestCase
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 
 from quodlibet.util import copool
 
@@ -17,9 +17,13 @@ class Tcopool(TestCase):
             Gtk.main_iteration()
         self.buffer = None
         self.go = True
+        self._timer = copool._timer
+        self._budget = copool.FRAME_BUDGET
 
     def tearDown(self):
         copool.remove_all()
+        copool._timer = self._timer
+        copool.FRAME_BUDGET = self._budget
 
     def __set_buffer(self):
         while self.go:
@@ -130,3 +134,59 @@ class Tcopool(TestCase):
         copool.resume("test")
         copool.remove("test")
         self.assertRaises(ValueError, copool.step, "test")
+
+    def _fake_clock(self, budget):
+        clock = [0.0]
+        copool._timer = lambda: clock[0]
+        copool.FRAME_BUDGET = budget
+        return clock
+
+    def test_budget(self):
+        clock = self._fake_clock(5)
+
+        def routine():
+            while True:
+                clock[0] += 1
+                yield
+
+        copool.add(routine, funcid="test")
+        Gtk.main_iteration_do(False)
+        stats = copool.get_stats("test")
+        self.assertEqual(stats.steps, 5)
+        self.assertEqual(stats.time, 5)
+        self.assertEqual(stats.longest_step, 1)
+
+    def test_fair(self):
+        clock = self._fake_clock(100)
+
+        def routine(cost):
+            while True:
+                clock[0] += cost
+                yield
+
+        copool.add(routine, 3, funcid="slow")
+        copool.add(routine, 1, funcid="fast")
+        Gtk.main_iteration_do(False)
+        stats = copool.get_all_stats()
+        self.assertEqual(sorted(stats.keys()), ["fast", "slow"])
+        self.assertTrue(abs(stats["slow"].time - stats["fast"].time) <= 3)
+        self.assertTrue(stats["fast"].steps > stats["slow"].steps)
+
+    def test_priority(self):
+        self._fake_clock(100)
+        calls = []
+
+        def routine(name, count):
+            for i in range(count):
+                calls.append(name)
+                yield
+
+        copool.add(routine, "low", 1000, funcid="low",
+                   priority=GLib.PRIORITY_LOW)
+        copool.add(routine, "high", 10, funcid="high",
+                   priority=GLib.PRIORITY_DEFAULT_IDLE)
+        while "low" not in calls:
+            Gtk.main_iteration_do(False)
+        self.assertEqual(calls[:10], ["high"] * 10)
+        self.assertEqual(set(calls[10:]), {"low"})
+        self.assertRaises(ValueError, copool.get_stats, "high")
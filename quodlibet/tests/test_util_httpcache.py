@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import time
+import shutil
+
+from tests import TestCase, mkdtemp
+
+from quodlibet.util.httpcache import HTTPCache, parse_cache_control, \
+    get_expiry, parse_http_date
+
+
+class THTTPCacheHeaders(TestCase):
+
+    def test_parse_cache_control(self):
+        self.assertEqual(
+            parse_cache_control('Max-Age=60, no-cache, private="x"'),
+            {"max-age": "60", "no-cache": True, "private": "x"})
+        self.assertEqual(parse_cache_control(None), {})
+
+    def test_parse_http_date(self):
+        self.assertEqual(
+            parse_http_date("Thu, 01 Jan 1970 00:01:00 GMT"), 60)
+        self.assertTrue(parse_http_date("foo") is None)
+
+    def test_expiry(self):
+        now = 1000.0
+        self.assertEqual(get_expiry({"cache-control": "max-age=60"}, now),
+                         now + 60)
+        self.assertTrue(get_expiry({"cache-control": "no-store"}, now) is None)
+        self.assertTrue(get_expiry({}, now) is None)
+        self.assertEqual(get_expiry({"etag": "x"}, now), now)
+        self.assertEqual(
+            get_expiry({"cache-control": "no-cache, max-age=60",
+                        "etag": "x"}, now), now)
+        self.assertEqual(
+            get_expiry({"expires": "Thu, 01 Jan 1970 00:02:00 GMT",
+                        "date": "Thu, 01 Jan 1970 00:01:00 GMT"}, now),
+            now + 60)
+        self.assertEqual(
+            get_expiry({"last-modified": "Thu, 01 Jan 1970 00:00:00 GMT"},
+                       now), now + 100)
+
+
+class THTTPCache(TestCase):
+
+    def setUp(self):
+        self.temp = mkdtemp()
+        self.cache = HTTPCache(os.path.join(self.temp, "cache"), 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def test_store_lookup(self):
+        url = u"http://example.com/ä"
+        self.assertTrue(self.cache.lookup(url) is None)
+        headers = {"cache-control": "max-age=60", "x-foo": "bar",
+                   "content-type": "text/plain"}
+        self.cache.store(url, 200, headers, b"data")
+        entry = self.cache.lookup(url)
+        self.assertTrue(entry.fresh)
+        self.assertEqual(entry.read(), b"data")
+        self.assertEqual(entry.status, 200)
+        self.assertEqual(entry.headers, {"cache-control": "max-age=60",
+                                         "content-type": "text/plain"})
+
+        self.cache.remove(url)
+        self.assertTrue(self.cache.lookup(url) is None)
+
+    def test_not_stored(self):
+        self.assertTrue(self.cache.store(
+            u"http://a", 404, {"cache-control": "max-age=60"}, b"") is None)
+        self.assertTrue(self.cache.store(
+            u"http://a", 200, {"cache-control": "no-store"}, b"") is None)
+        self.assertTrue(self.cache.store(
+            u"http://a", 200, {"cache-control": "max-age=60"},
+            b"x" * 101) is None)
+        self.assertTrue(self.cache.lookup(u"http://a") is None)
+
+    def test_refresh(self):
+        url = u"http://example.com"
+        entry = self.cache.store(url, 200, {"etag": '"1"'}, b"data")
+        self.assertFalse(entry.fresh)
+        self.assertEqual(entry.get_validators(), {"If-None-Match": '"1"'})
+        entry = self.cache.refresh(entry, {"cache-control": "max-age=60"})
+        self.assertTrue(entry.fresh)
+        entry = self.cache.lookup(url)
+        self.assertTrue(entry.fresh)
+        self.assertEqual(entry.headers["etag"], '"1"')
+
+    def test_trim(self):
+        headers = {"cache-control": "max-age=60"}
+        for i in range(3):
+            self.cache.store(u"http://%d" % i, 200, headers, b"x" * 40)
+            # make sure the access times differ
+            os.utime(self.cache._get_paths(u"http://%d" % i)[1],
+                     (time.time() - 10 + i, time.time() - 10 + i))
+        self.assertTrue(self.cache.lookup(u"http://0") is None)
+
+        # looking it up makes 1 the most recently used one
+        self.assertTrue(self.cache.lookup(u"http://1") is not None)
+        self.cache.store(u"http://3", 200, headers, b"x" * 40)
+        self.assertTrue(self.cache.lookup(u"http://2") is None)
+        self.assertTrue(self.cache.lookup(u"http://1") is not None)
+
+    def test_clear(self):
+        self.cache.store(
+            u"http://a", 200, {"cache-control": "max-age=60"}, b"a")
+        self.cache.clear()
+        self.assertTrue(self.cache.lookup(u"http://a") is None)
+
+    def test_stats(self):
+        self.assertEqual(self.cache.get_stats()["hit_rate"], 0.0)
+        self.cache.hits = 2
+        self.cache.coalesced = 1
+        self.cache.misses = 1
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertEqual(stats["coalesced"], 1)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import time
+import shutil
+import socket
+import threading
+
+from gi.repository import Gio, GLib
+
+from quodlibet.compat import PY2
+from quodlibet.util.httpcache import HTTPCache
+from quodlibet.util.httpfetch import HTTPFetcher, Request, is_cacheable
+
+from tests import TestCase, mkdtemp
+
+if PY2:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urllib2 import Request as URLRequest, urlopen, HTTPError
+else:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.request import Request as URLRequest, urlopen
+    from urllib.error import HTTPError
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class CacheTestHandler(BaseHTTPRequestHandler):
+    """Answers /etag* with a response which needs revalidation and
+    everything else with one which stays fresh for a minute
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, data=b"", headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        # before responding, so the client can't reuse the slot earlier
+        with server.lock:
+            server.active -= 1
+
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"1"':
+                self._respond(304, headers=[("ETag", '"1"')])
+            else:
+                self._respond(200, b"etag", [
+                    ("ETag", '"1"'), ("Cache-Control", "no-cache")])
+        else:
+            self._respond(200, self.path.encode("ascii"),
+                          [("Cache-Control", "max-age=60")])
+
+    def do_POST(self):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond(200, b"ok")
+
+    do_PUT = do_DELETE = do_POST
+
+
+def send_urllib(request, cancellable, callback, failure_callback):
+    """A HTTPFetcher transport doing blocking requests in a thread"""
+
+    def run():
+        url_request = URLRequest(
+            request.url, data=request.body, headers=request.headers)
+        url_request.get_method = lambda: request.method
+        try:
+            try:
+                response = urlopen(url_request, timeout=5)
+            except HTTPError as e:
+                if e.code != 304:
+                    raise
+                response = e
+            result = (response.getcode(),
+                      dict((k.lower(), v) for k, v in response.info().items()),
+                      response.read())
+        except Exception as e:
+            GLib.idle_add(failure_callback, e)
+            return
+
+        def deliver():
+            if cancellable is not None and cancellable.is_cancelled():
+                failure_callback(Exception("cancelled"))
+            else:
+                callback(*result)
+            return False
+
+        GLib.idle_add(deliver)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+class TIsCacheable(TestCase):
+
+    def test_main(self):
+        url = "http://example.com/a"
+        self.assertTrue(is_cacheable(url, {}))
+        self.assertTrue(is_cacheable(url + "?q=token", {"Accept": "x"}))
+        self.assertFalse(is_cacheable(url, {"Authorization": "OAuth x"}))
+        self.assertFalse(is_cacheable(url, {"cookie": "a=b"}))
+        self.assertFalse(is_cacheable(url + "?oauth_token=x", {}))
+        self.assertFalse(is_cacheable(url + "?a=b&Password=", {}))
+        self.assertFalse(is_cacheable("http://user:pw@example.com/a", {}))
+
+
+class THTTPFetcher(TestCase):
+
+    def setUp(self):
+        self.temp = mkdtemp()
+        self.cache = HTTPCache(self.temp)
+        self.fetcher = HTTPFetcher(send_urllib, self.cache, max_per_host=2)
+
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), CacheTestHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.delay = 0
+        self.server.active = self.server.max_active = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.results = []
+        self.errors = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp)
+
+    def _url(self, path):
+        return "http://%s:%d%s" % (self.server.server_address + (path,))
+
+    def _fetch(self, path, method="GET", cancellable=None, headers=None):
+        body = b"x" if method in ("POST", "PUT") else None
+        request = Request(method, self._url(path), headers, body)
+
+        def callback(status, headers, data):
+            self.results.append((path, status, data))
+
+        def failure(exception):
+            self.errors.append((path, exception))
+
+        self.fetcher.fetch(request, cancellable, callback, failure)
+
+    def _wait(self, condition, timeout=5):
+        context = GLib.MainContext.default()
+        end = time.time() + timeout
+        while not condition():
+            self.assertTrue(time.time() < end, "timeout")
+            if not context.iteration(False):
+                time.sleep(0.005)
+
+    def _wait_results(self, count):
+        self._wait(lambda: len(self.results) + len(self.errors) >= count)
+        self.assertEqual(self.errors, [])
+
+    def _get_requests(self, method="GET"):
+        with self.server.lock:
+            return [p for m, p in self.server.requests if m == method]
+
+    def test_cached(self):
+        self._fetch("/a")
+        self._wait_results(1)
+        self._fetch("/a")
+        self._wait_results(2)
+        self.assertEqual(self.results, [("/a", 200, b"/a")] * 2)
+        self.assertEqual(self._get_requests(), ["/a"])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_coalesce(self):
+        self.server.delay = 0.2
+        for i in range(3):
+            self._fetch("/a")
+        self._fetch("/b")
+        self._wait_results(4)
+        self.assertEqual(sorted(self._get_requests()), ["/a", "/b"])
+        self.assertEqual(self.results.count(("/a", 200, b"/a")), 3)
+        self.assertEqual(self.cache.coalesced, 2)
+        self.assertFalse(self.fetcher._in_flight)
+
+    def test_revalidate(self):
+        self._fetch("/etag")
+        self._wait_results(1)
+        self._fetch("/etag")
+        self._wait_results(2)
+        self.assertEqual(self.results, [("/etag", 200, b"etag")] * 2)
+        self.assertEqual(self._get_requests(), ["/etag", "/etag"])
+        self.assertEqual(self.cache.revalidated, 1)
+
+    def test_cancel_waiter(self):
+        self.server.delay = 0.2
+        first = Gio.Cancellable()
+        self._fetch("/a", cancellable=first)
+        self._fetch("/a")
+        first.cancel()
+        self._wait_results(1)
+        self.assertEqual(self.results, [("/a", 200, b"/a")])
+        self.assertFalse(self.fetcher._in_flight)
+
+    def test_cancel_all_waiters(self):
+        self.server.delay = 0.2
+        cancellables = [Gio.Cancellable(), Gio.Cancellable()]
+        for cancellable in cancellables:
+            self._fetch("/a", cancellable=cancellable)
+        shared = self.fetcher._in_flight[self._url("/a")]
+        cancellables[0].cancel()
+        self.assertFalse(shared.cancellable.is_cancelled())
+        cancellables[1].cancel()
+        self.assertTrue(shared.cancellable.is_cancelled())
+        self.assertFalse(self.fetcher._in_flight)
+
+        # a new request doesn't join the cancelled one
+        self._fetch("/a")
+        self._wait_results(1)
+        self.assertEqual(self.results, [("/a", 200, b"/a")])
+        self._wait(lambda: not self.fetcher._active)
+
+    def test_per_host_limit(self):
+        self.server.delay = 0.1
+        count = self.fetcher.max_per_host * 3
+        for i in range(count):
+            self._fetch("/%d" % i)
+        self._wait_results(count)
+        self.assertEqual(len(self._get_requests()), count)
+        self.assertTrue(
+            0 < self.server.max_active <= self.fetcher.max_per_host)
+        self.assertFalse(self.fetcher._active)
+        self.assertFalse(self.fetcher._queued)
+
+    def test_credentials_not_cached(self):
+        path = "/a?oauth_token=secret"
+        self._fetch(path)
+        self._wait_results(1)
+        self._fetch(path)
+        self._wait_results(2)
+        self.assertEqual(self._get_requests(), [path, path])
+        self.assertTrue(self.cache.lookup(self._url(path)) is None)
+
+        headers = {"Authorization": "OAuth secret"}
+        self._fetch("/b", headers=headers)
+        self._wait_results(3)
+        self._fetch("/b", headers=headers)
+        self._wait_results(4)
+        self.assertEqual(self._get_requests()[2:], ["/b", "/b"])
+
+    def test_invalidate(self):
+        self._fetch("/a")
+        self._wait_results(1)
+        self.assertTrue(self.cache.lookup(self._url("/a")))
+        for i, method in enumerate(["POST", "PUT", "DELETE"]):
+            self._fetch("/a", method)
+            self._wait_results(2 + i * 2)
+            self.assertTrue(self.cache.lookup(self._url("/a")) is None)
+            self._fetch("/a")
+            self._wait_results(3 + i * 2)
+        self.assertEqual(self._get_requests(), ["/a"] * 4)
+        self.assertEqual(self.results[-1], ("/a", 200, b"/a"))
+
+    def test_failure(self):
+        # nothing listens on a port we just closed
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        url = "http://127.0.0.1:%d/a" % sock.getsockname()[1]
+        sock.close()
+
+        self.fetcher.fetch(
+            Request("GET", url), None, lambda *args: None,
+            lambda e: self.errors.append(e))
+        self._wait(lambda: self.errors)
+        self.assertFalse(self.fetcher._in_flight)
+        self.assertFalse(self.fetcher._active)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import json
+
+from tests import TestCase
+
+from quodlibet.util import instrument, copool
+from quodlibet.library import SongLibrary
+
+
+class Tinstrument(TestCase):
+
+    def setUp(self):
+        self._enabled = instrument.is_enabled()
+        instrument.reset()
+        instrument.enable()
+
+    def tearDown(self):
+        instrument.enable(self._enabled)
+        instrument.reset()
+
+    def test_disabled(self):
+        instrument.enable(False)
+        with instrument.measure("foo", "bar"):
+            pass
+        instrument.record("foo", "bar", 1.0)
+        self.assertEqual(instrument.get_stats(), {})
+
+    def test_record(self):
+        for seconds in [0.00001, 0.0005, 0.0005, 1.0]:
+            instrument.record("foo", "bar", seconds)
+        stats = instrument.get_stats()["foo"]["bar"]
+        self.assertEqual(stats["count"], 4)
+        self.assertAlmostEqual(stats["total"], 1.00101)
+        self.assertEqual(stats["max"], 1.0)
+        self.assertEqual(stats["histogram"], {
+            u"<0.1ms": 1, u"<1ms": 2, u"<4ms": 0, u"<16ms": 0, u"<64ms": 0,
+            u">=64ms": 1})
+
+        instrument.reset()
+        self.assertEqual(instrument.get_stats(), {})
+
+    def test_measure(self):
+        with instrument.measure("foo", "bar"):
+            pass
+        with instrument.measure("foo", "baz"):
+            pass
+        self.assertEqual(sorted(instrument.get_stats()["foo"]), ["bar", "baz"])
+
+    def test_dump_json(self):
+        instrument.record("foo", "bar", 0.5)
+        data = json.loads(instrument.dump_json())
+        self.assertTrue(data["enabled"])
+        self.assertEqual(data["stats"]["foo"]["bar"]["count"], 1)
+
+    def test_library_signal(self):
+        library = SongLibrary()
+        library.emit("changed", set())
+        library.destroy()
+        stats = instrument.get_stats()["signal"]
+        self.assertEqual(stats["SongLibrary.changed"]["count"], 1)
+
+    def test_copool(self):
+        def func():
+            yield
+
+        copool.add(func, funcid="instrumented")
+        copool.step("instrumented")
+        copool.remove_all()
+        self.assertEqual(
+            instrument.get_stats()["copool"]["instrumented"]["count"], 1)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from senf import fsnative
+
+from tests import TestCase
+
+from quodlibet.formats import AudioFile
+from quodlibet.util.numcolumns import get_column, get_sum
+
+
+def _song(name, **kwargs):
+    song = AudioFile({"~filename": fsnative(name)})
+    for key, value in kwargs.items():
+        song["~#" + key] = value
+    return song
+
+
+class TNumColumns(TestCase):
+
+    def setUp(self):
+        self.songs = [
+            _song(u"/a", length=10, filesize=100),
+            _song(u"/b", length=2.5),
+            _song(u"/c", filesize=1),
+        ]
+
+    def test_get_column(self):
+        self.assertEqual(
+            list(get_column("~#length", self.songs)), [10, 2.5, 0])
+        self.assertEqual(
+            list(get_column("~#filesize", self.songs, None)),
+            [100, None, 1])
+
+    def test_get_sum(self):
+        self.assertEqual(get_sum("~#length", self.songs), 12.5)
+        self.assertEqual(get_sum("~#filesize", self.songs), 101)
+        self.assertEqual(get_sum("~#playcount", self.songs), 0)
+        self.assertEqual(get_sum("~#length", []), 0)
+
+    def test_same_as_get(self):
+        songs = [_song(u"/%d" % i, length=i) for i in range(100)]
+        self.assertEqual(
+            get_sum("~#length", songs),
+            sum(song.get("~#length", 0) for song in songs))
+
+    def test_sequence(self):
+        songs = tuple(self.songs)
+        self.assertEqual(get_sum("~#length", songs), 12.5)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from senf import fsnative
+
+from tests import TestCase, mkdtemp
+
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from quodlibet.util.collection import Playlist
+from quodlibet.util.savedsearches import SavedSearches, parse_saved_searches
+
+
+def _song(name, artist):
+    return AudioFile({"~filename": fsnative(name), "artist": artist,
+                      "title": name})
+
+
+class TSavedSearches(TestCase):
+
+    def setUp(self):
+        self.temp = mkdtemp()
+        self.path = os.path.join(self.temp, fsnative(u"queries.saved"))
+        self._write(u"artist=a\nQuery A\n#(length > 1)\nLong\n")
+        self.library = SongLibrary()
+        self.a = _song(u"/a", u"a")
+        self.b = _song(u"/b", u"b")
+        self.library.add([self.a, self.b])
+        self.searches = SavedSearches(self.library, self.path)
+
+    def tearDown(self):
+        self.searches.destroy()
+        self.library.destroy()
+        shutil.rmtree(self.temp)
+
+    def _write(self, text):
+        with open(self.path, "w", encoding="utf-8") as h:
+            h.write(text)
+
+    def test_parse(self):
+        self._write(u"artist=a\nQuery A\ngenre=x\n")
+        self.assertEqual(
+            parse_saved_searches(self.path), [(u"Query A", u"artist=a")])
+        self.assertEqual(
+            parse_saved_searches(os.path.join(self.temp, "nope")), [])
+
+    def test_get(self):
+        playlist = self.searches.get(u" query a")
+        self.assertTrue(playlist.read_only)
+        self.assertEqual(playlist.name, u"Query A")
+        self.assertEqual(list(playlist), [self.a])
+        self.assertTrue(playlist.search(self.a))
+        self.assertFalse(playlist.search(self.b))
+        self.assertTrue(self.searches.get(u"Query A") is playlist)
+        self.assertTrue(self.searches.get(u"missing") is None)
+
+    def test_follow_library(self):
+        playlist = self.searches.get(u"Query A")
+        c = _song(u"/c", u"a")
+        self.library.add([c])
+        self.assertEqual(playlist.songs, [self.a, c])
+
+        self.b["artist"] = u"a"
+        self.a["artist"] = u"x"
+        self.library.changed([self.a, self.b])
+        self.assertEqual(playlist.songs, [self.b, c])
+        self.assertEqual(playlist.has_songs([self.a, self.b]), (True, False))
+
+        self.library.remove([c])
+        self.assertEqual(playlist.songs, [self.b])
+
+    def test_search_not_in_library(self):
+        playlist = self.searches.get(u"Query A")
+        self.assertTrue(playlist.search(_song(u"/x", u"a")))
+        self.assertFalse(playlist.search(_song(u"/x", u"b")))
+
+    def test_read_only(self):
+        playlist = self.searches.get(u"Query A")
+        self.assertRaises(TypeError, playlist.append, self.b)
+        self.assertRaises(TypeError, playlist.clear)
+        self.assertRaises(ValueError, playlist.rename, u"foo")
+        self.assertFalse(playlist.remove_songs([self.a]))
+        self.assertEqual(list(playlist), [self.a])
+
+    def test_reload(self):
+        playlist = self.searches.get(u"Query A")
+        generation = self.searches.generation
+
+        self._write(u"artist=b\nQuery A\n")
+        os.utime(self.path, (0, 0))
+        self.searches.reload()
+        self.assertNotEqual(self.searches.generation, generation)
+        self.assertFalse(self.searches.get(u"Query A") is playlist)
+        self.assertEqual(
+            [p.name for p in self.searches.playlists()], [u"Query A"])
+        self.assertEqual(list(self.searches.get(u"Query A")), [self.b])
+
+    def test_lookup(self):
+        playlist = self.searches.lookup(u"artist=a ")
+        self.assertEqual(list(playlist), [self.a])
+        self.assertTrue(self.searches.lookup(u"artist=b") is None)
+        other = self.searches.lookup(u"artist=a", star=["title"])
+        self.assertFalse(other is playlist)
+        self.assertEqual(other.query.star, ["title"])
+
+    def test_not_a_playlist(self):
+        playlist = self.searches.get(u"Query A")
+        self.assertFalse(playlist in Playlist.playlists_featuring(self.a))
+        self.assertFalse(self.a.list("~playlists"))
+
+    def test_dynamic_not_materialised(self):
+        self._write(u"#(added < 2 weeks ago)\nRecent\n"
+                    u"@(saved: query a)\nNested\n")
+        os.utime(self.path, (0, 0))
+        self.searches.reload()
+        self.assertTrue(self.searches.get(u"Recent") is None)
+        self.assertTrue(self.searches.get(u"Nested") is None)
+        self.assertTrue(self.searches.lookup(u"#(added < 1 day)") is None)
+        self.assertEqual(self.searches.playlists(), [])